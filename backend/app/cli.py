@@ -9,7 +9,8 @@ from app.permissions import (
     ROLE_TEMPLATES,
 )
 from app.db_crud import get_user_by_email
-from app.models import Role
+from app.models import Recipe, Role
+from app.recipe_nutrition import refresh_recipe_nutrition
 from sqlmodel import select
 from app.seed_food_data import seed_ingredients, seed_recipes
 
@@ -257,5 +258,15 @@ def init_recipes(
         )
 
 
+@app.command()
+def refresh_nutrition():
+    """Recompute stored nutrition totals and recipe cards for every recipe"""
+    with Session(engine) as session:
+        recipe_ids = session.exec(select(Recipe.id)).all()
+        refresh_recipe_nutrition(session, recipe_ids)
+        session.commit()
+        print(f"✅ Refreshed nutrition totals for {len(recipe_ids)} recipes")
+
+
 if __name__ == "__main__":
     app()
@@ -64,6 +64,8 @@ class Settings(BaseSettings):
 
     PROJECT_NAME: str
     OPENFOODFACTS_USER_AGENT: str | None = None
+    # Hard per-request budget for the keystroke-driven ingredient autocomplete.
+    INGREDIENT_AUTOCOMPLETE_TIMEOUT_MS: int = Field(default=200, ge=1)
     SENTRY_DSN: HttpUrl | None = None
     SENTRY_TRACES_SAMPLE_RATE: float = Field(default=0.1, ge=0, le=1)
     SENTRY_SEND_DEFAULT_PII: bool = False
@@ -78,6 +80,11 @@ class Settings(BaseSettings):
     CLOUDINARY_CLOUD_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
+    # "local" writes uploads to IMAGE_LOCAL_DIR and serves them from the API.
+    IMAGE_STORAGE_BACKEND: Literal["cloudinary", "local"] = "cloudinary"
+    IMAGE_LOCAL_DIR: str = "uploads"
+    IMAGE_LOCAL_BASE_URL: str = "/uploads"
+    RECIPE_IMAGE_MAX_BYTES: int = Field(default=10 * 1024 * 1024, ge=1)
 
     @computed_field
     @property
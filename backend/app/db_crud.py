@@ -5,6 +5,7 @@ from sqlmodel import Session, select
 
 from app.security import get_password_hash, verify_password
 from app.models import Item, ItemCreate, User, UserCreate, UserUpdate, RefreshToken
+from app.recipe_cards import sync_recipe_owner
 from hashlib import sha256
 from datetime import datetime, timezone
 
@@ -28,6 +29,8 @@ def update_user(session: Session, db_user: User, user_in: UserUpdate) -> Any:
         extra_data["hashed_password"] = hashed_password
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
+    if user_data.keys() - {"password"}:
+        sync_recipe_owner(session, db_user)
     session.commit()
     session.refresh(db_user)
     return db_user
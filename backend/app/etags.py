@@ -0,0 +1,26 @@
+import hashlib
+from datetime import datetime
+
+from fastapi import Response
+
+
+def make_etag(*parts: object) -> str:
+    """Build a strong ETag from the values a representation is derived from."""
+    raw = "|".join(
+        part.isoformat() if isinstance(part, datetime) else str(part) for part in parts
+    )
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Apply the weak comparison RFC 9110 prescribes for If-None-Match."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in {
+        candidate.removeprefix("W/") for candidate in candidates
+    }
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,263 @@
+"""
+Where uploaded images end up.
+
+Uploads are content addressed: the router hashes the bytes, looks the digest up
+in ImageAsset and only calls ImageStorage.save for content it has not stored
+before. Backends are async so a slow upload never holds a threadpool worker that
+the sync routes need.
+"""
+
+import hashlib
+import hmac
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Protocol
+
+import anyio
+import httpx
+from cloudinary.utils import api_sign_request, cloudinary_api_url, cloudinary_url
+from fastapi import Request
+from starlette.datastructures import UploadFile
+from starlette.types import Message
+
+from app.config import settings
+from app.models import ImageUploadTicketPublic, RecipeImageAttach
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundary and part headers around the image itself.
+MULTIPART_OVERHEAD = 16 * 1024
+CLOUDINARY_UPLOAD_TIMEOUT = 60
+# Cloudinary rejects signed requests whose timestamp is older than an hour.
+UPLOAD_TICKET_TTL = timedelta(hours=1)
+
+
+# Raster formats only, recognised by their leading bytes. The declared content
+# type is not trusted: served from the API origin, SVG or HTML could run scripts.
+IMAGE_SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/gif": (b"GIF87a", b"GIF89a"),
+}
+IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+class ImageTooLargeError(Exception):
+    pass
+
+
+class ImageStorageUnavailableError(Exception):
+    pass
+
+
+class InvalidUploadError(Exception):
+    pass
+
+
+class ImageStorage(Protocol):
+    async def save(self, content: bytes, *, key: str, content_type: str) -> str:
+        """Store the image under key and return its public URL."""
+        ...
+
+
+def capped_request(request: Request, max_bytes: int) -> Request:
+    """
+    The same request with its body limited to max_bytes.
+
+    A Content-Length over the limit is rejected before any of the body is read;
+    bodies without one raise ImageTooLargeError as soon as they pass it.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise ImageTooLargeError
+    received = 0
+
+    async def receive() -> Message:
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise ImageTooLargeError
+        return message
+
+    return Request(request.scope, receive)
+
+
+def image_content_type(content: bytes) -> str:
+    """
+    The content type of a JPEG, PNG, GIF or WebP image, read from its bytes.
+
+    Raises InvalidUploadError for anything else.
+    """
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    for content_type, signatures in IMAGE_SIGNATURES.items():
+        if content.startswith(signatures):
+            return content_type
+    raise InvalidUploadError("Image must be a JPEG, PNG, GIF or WebP file")
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> tuple[bytes, str]:
+    """
+    Read an upload in chunks, hashing as it goes and stopping past max_bytes.
+
+    Returns the content and its sha256 hex digest.
+    """
+    digest = hashlib.sha256()
+    chunks: list[bytes] = []
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise ImageTooLargeError
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+class CloudinaryImageStorage:
+    """Signed uploads to Cloudinary's REST API, with the content hash as public id."""
+
+    def __init__(
+        self,
+        *,
+        cloud_name: str,
+        api_key: str,
+        api_secret: str,
+        folder: str,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.folder = folder
+        self.client = client
+
+    async def save(self, content: bytes, *, key: str, content_type: str) -> str:
+        params = {
+            "folder": self.folder,
+            "overwrite": "false",
+            "public_id": key,
+            "timestamp": str(int(time.time())),
+        }
+        params["signature"] = api_sign_request(params, self.api_secret)
+        params["api_key"] = self.api_key
+        url = cloudinary_api_url(
+            "upload", resource_type="image", cloud_name=self.cloud_name
+        )
+
+        client = self.client or httpx.AsyncClient(timeout=CLOUDINARY_UPLOAD_TIMEOUT)
+        try:
+            response = await client.post(
+                url, data=params, files={"file": (key, content, content_type)}
+            )
+        except httpx.HTTPError as exc:
+            raise ImageStorageUnavailableError from exc
+        finally:
+            if self.client is None:
+                await client.aclose()
+
+        if response.status_code >= 400:
+            raise ImageStorageUnavailableError
+        try:
+            return response.json()["secure_url"]
+        except (KeyError, ValueError) as exc:
+            raise ImageStorageUnavailableError from exc
+
+    def upload_ticket(self, recipe_id: uuid.UUID) -> ImageUploadTicketPublic:
+        """
+        Signed parameters that let a browser upload one image of a recipe straight
+        to Cloudinary.
+
+        The signature pins the folder and a fresh public id that starts with the
+        recipe id, and Cloudinary refuses it once the timestamp is more than an
+        hour old.
+        """
+        issued_at = datetime.now(timezone.utc)
+        params = {
+            "folder": self.folder,
+            "overwrite": "false",
+            "public_id": f"{recipe_id.hex}-{uuid.uuid4().hex}",
+            "timestamp": str(int(issued_at.timestamp())),
+        }
+        return ImageUploadTicketPublic(
+            upload_url=cloudinary_api_url(
+                "upload", resource_type="image", cloud_name=self.cloud_name
+            ),
+            api_key=self.api_key,
+            signature=api_sign_request(params, self.api_secret),
+            expires_at=issued_at + UPLOAD_TICKET_TTL,
+            **params,
+        )
+
+    def uploaded_image_url(self, image: RecipeImageAttach, recipe_id: uuid.UUID) -> str:
+        """
+        Check the signature Cloudinary returned for a direct upload and build its URL.
+
+        Cloudinary signs public_id and version of every upload response with the
+        API secret, so a client cannot claim an image it did not upload here. The
+        public id must come from a ticket issued for this recipe, so an upload
+        meant for one recipe cannot be attached to another.
+        """
+        if not image.public_id.startswith(f"{self.folder}/{recipe_id.hex}-"):
+            raise InvalidUploadError("Image was not uploaded for this recipe")
+        expected = api_sign_request(
+            {"public_id": image.public_id, "version": image.version},
+            self.api_secret,
+            signature_version=1,
+        )
+        if not hmac.compare_digest(expected, image.signature):
+            raise InvalidUploadError("Invalid upload signature")
+        url, _ = cloudinary_url(
+            image.public_id,
+            version=image.version,
+            format=image.format,
+            secure=True,
+            cloud_name=self.cloud_name,
+        )
+        return url
+
+
+class LocalImageStorage:
+    """Write images to a directory; for local development and tests."""
+
+    def __init__(self, directory: Path, base_url: str) -> None:
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+
+    async def save(self, content: bytes, *, key: str, content_type: str) -> str:
+        # The static file server sends the content type of the extension, so only
+        # the raster types image_content_type accepts get one it will serve.
+        filename = key + IMAGE_EXTENSIONS[content_type]
+        directory = anyio.Path(self.directory)
+        await directory.mkdir(parents=True, exist_ok=True)
+        await (directory / filename).write_bytes(content)
+        return f"{self.base_url}/{filename}"
+
+
+_storage: ImageStorage | None = None
+
+
+def get_image_storage() -> ImageStorage:
+    """The configured backend, built once per process."""
+    global _storage
+    if _storage is None:
+        if settings.IMAGE_STORAGE_BACKEND == "local":
+            _storage = LocalImageStorage(
+                Path(settings.IMAGE_LOCAL_DIR), settings.IMAGE_LOCAL_BASE_URL
+            )
+        else:
+            _storage = CloudinaryImageStorage(
+                cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+                api_key=settings.CLOUDINARY_API_KEY,
+                api_secret=settings.CLOUDINARY_API_SECRET,
+                folder=f"{settings.ENVIRONMENT}/recipes",
+            )
+    return _storage
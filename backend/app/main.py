@@ -3,8 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
+from app.pagination import NEXT_CURSOR_HEADER
 from app.routers import (
     analytics,
     users,
@@ -45,6 +47,7 @@ if settings.all_cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", NEXT_CURSOR_HEADER],
     )
 
 
@@ -56,3 +59,10 @@ app.include_router(ingredients.router)
 app.include_router(game.router)
 app.include_router(roles.router)
 app.include_router(analytics.router)
+
+if settings.IMAGE_STORAGE_BACKEND == "local":
+    app.mount(
+        settings.IMAGE_LOCAL_BASE_URL,
+        StaticFiles(directory=settings.IMAGE_LOCAL_DIR, check_dir=False),
+        name="uploads",
+    )
@@ -0,0 +1,124 @@
+"""Add denormalized recipe cards
+
+Every existing recipe gets a card, with calories and protein per serving rounded
+from its stored nutrition like the API does. Recipes without a stored nutrition
+row yet read zero until revision e8a0c2d4f6b9 computes it.
+
+Revision ID: a4c6e8f0b2d5
+Revises: f3b5d7e9a1c4
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "a4c6e8f0b2d5"
+down_revision: Union[str, None] = "f3b5d7e9a1c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CARD_COLUMNS = [
+    "title",
+    "image",
+    "owner_name",
+    "calories_per_serving",
+    "protein_per_serving",
+]
+
+BACKFILL_CARDS = """
+INSERT INTO recipe_card (
+    id, title, image, owner_id, owner_name, is_hidden, created_at,
+    calories_per_serving, protein_per_serving
+)
+SELECT
+    recipe.id,
+    recipe.title,
+    recipe.image,
+    recipe.owner_id,
+    "user".full_name,
+    recipe.is_hidden,
+    recipe.created_at,
+    0,
+    0
+FROM recipe
+JOIN "user" ON "user".id = recipe.owner_id
+"""
+
+
+def _backfill_card_nutrition() -> None:
+    # Python's round() on the stored totals, exactly as RecipeNutritionSummary.
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT recipe.id, recipe.servings, recipe_nutrition.total_calories, "
+            "recipe_nutrition.total_protein FROM recipe_nutrition "
+            "JOIN recipe ON recipe.id = recipe_nutrition.recipe_id"
+        )
+    ).all()
+    if not rows:
+        return
+    bind.execute(
+        sa.text(
+            "UPDATE recipe_card SET calories_per_serving = :calories, "
+            "protein_per_serving = :protein WHERE id = :id"
+        ),
+        [
+            {
+                "id": row.id,
+                "calories": round(round(row.total_calories) / row.servings),
+                "protein": round(round(row.total_protein, 1) / row.servings, 1),
+            }
+            for row in rows
+        ],
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recipe_card",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "title", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False
+        ),
+        sa.Column(
+            "image", sqlmodel.sql.sqltypes.AutoString(length=1000), nullable=True
+        ),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "owner_name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+        sa.Column("is_hidden", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("calories_per_serving", sa.Integer(), nullable=False),
+        sa.Column("protein_per_serving", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["id"], ["recipe.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(BACKFILL_CARDS)
+    _backfill_card_nutrition()
+    op.create_index(
+        "ix_recipe_card_public_created_at_id",
+        "recipe_card",
+        ["created_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("NOT is_hidden"),
+        postgresql_include=CARD_COLUMNS,
+    )
+    op.create_index(
+        "ix_recipe_card_created_at_id",
+        "recipe_card",
+        ["created_at", "id"],
+        unique=False,
+        postgresql_include=[*CARD_COLUMNS, "is_hidden", "owner_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_recipe_card_created_at_id", table_name="recipe_card")
+    op.drop_index("ix_recipe_card_public_created_at_id", table_name="recipe_card")
+    op.drop_table("recipe_card")
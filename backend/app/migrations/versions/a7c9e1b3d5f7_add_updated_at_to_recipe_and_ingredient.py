@@ -0,0 +1,38 @@
+"""Add updated_at to recipe and ingredient
+
+Revision ID: a7c9e1b3d5f7
+Revises: f2a4c6e8b1d3
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a7c9e1b3d5f7"
+down_revision: Union[str, None] = "f2a4c6e8b1d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table_name in ("recipe", "ingredient"):
+        # The server default only backfills existing rows; the app sets the value.
+        op.add_column(
+            table_name,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+        )
+        op.alter_column(table_name, "updated_at", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("ingredient", "updated_at")
+    op.drop_column("recipe", "updated_at")
@@ -0,0 +1,100 @@
+"""Add per-serving and per-100g macro columns to recipe nutrition
+
+Existing rows are filled in from their stored totals and their recipe's
+servings, rounded the way the API rounds them.
+
+Revision ID: b5d7f9a1c3e6
+Revises: a4c6e8f0b2d5
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b5d7f9a1c3e6"
+down_revision: Union[str, None] = "a4c6e8f0b2d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MACRO_COLUMNS = [
+    ("calories_per_serving", sa.Integer()),
+    ("carbohydrates_per_serving", sa.Float()),
+    ("fat_per_serving", sa.Float()),
+    ("protein_per_serving", sa.Float()),
+    ("calories_per_100g", sa.Integer()),
+    ("carbohydrates_per_100g", sa.Float()),
+    ("fat_per_100g", sa.Float()),
+    ("protein_per_100g", sa.Float()),
+]
+
+
+def _macros(totals: sa.Row) -> dict[str, float]:
+    # Python's round() on the stored totals, exactly as RecipeNutritionSummary.
+    calories = round(totals.total_calories)
+    carbohydrates = round(totals.total_carbohydrates, 1)
+    fat = round(totals.total_fat, 1)
+    protein = round(totals.total_protein, 1)
+    weight = round(totals.total_grams)
+
+    def per_100g(total: float, decimals: int | None = None) -> float:
+        return round(total / weight * 100, decimals) if weight > 0 else 0
+
+    return {
+        "calories_per_serving": round(calories / totals.servings),
+        "carbohydrates_per_serving": round(carbohydrates / totals.servings, 1),
+        "fat_per_serving": round(fat / totals.servings, 1),
+        "protein_per_serving": round(protein / totals.servings, 1),
+        "calories_per_100g": per_100g(calories),
+        "carbohydrates_per_100g": per_100g(carbohydrates, 1),
+        "fat_per_100g": per_100g(fat, 1),
+        "protein_per_100g": per_100g(protein, 1),
+    }
+
+
+def _backfill_macros() -> None:
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT recipe_nutrition.recipe_id, recipe.servings, total_calories, "
+            "total_carbohydrates, total_fat, total_protein, total_grams "
+            "FROM recipe_nutrition JOIN recipe ON recipe.id = recipe_nutrition.recipe_id"
+        )
+    ).all()
+    if not rows:
+        return
+    assignments = ", ".join(f"{name} = :{name}" for name, _ in MACRO_COLUMNS)
+    bind.execute(
+        sa.text(
+            f"UPDATE recipe_nutrition SET {assignments} WHERE recipe_id = :recipe_id"
+        ),
+        [{"recipe_id": row.recipe_id, **_macros(row)} for row in rows],
+    )
+
+
+def upgrade() -> None:
+    for name, column_type in MACRO_COLUMNS:
+        op.add_column(
+            "recipe_nutrition",
+            sa.Column(name, column_type, nullable=False, server_default="0"),
+        )
+        op.alter_column("recipe_nutrition", name, server_default=None)
+    _backfill_macros()
+    for name, _ in MACRO_COLUMNS:
+        op.create_index(
+            f"ix_recipe_nutrition_{name}_recipe_id",
+            "recipe_nutrition",
+            [name, "recipe_id"],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    for name, _ in reversed(MACRO_COLUMNS):
+        op.drop_index(
+            f"ix_recipe_nutrition_{name}_recipe_id", table_name="recipe_nutrition"
+        )
+        op.drop_column("recipe_nutrition", name)
@@ -0,0 +1,49 @@
+"""Add full-text search vector to recipe
+
+Revision ID: b8d0f2a4c6e8
+Revises: a7c9e1b3d5f7
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "b8d0f2a4c6e8"
+down_revision: Union[str, None] = "a7c9e1b3d5f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "recipe",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(instructions, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_recipe_search_vector",
+        "recipe",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_recipe_search_vector", table_name="recipe", postgresql_using="gin"
+    )
+    op.drop_column("recipe", "search_vector")
@@ -0,0 +1,61 @@
+"""Add the flattened ingredient id set to recipe nutrition
+
+Existing rows take it from the ingredient ids in their stored total_ingredients,
+which already include ingredients pulled in through sub-recipes.
+
+Revision ID: c6e8a0b2d4f7
+Revises: b5d7f9a1c3e6
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "c6e8a0b2d4f7"
+down_revision: Union[str, None] = "b5d7f9a1c3e6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_INGREDIENT_IDS = """
+UPDATE recipe_nutrition
+SET ingredient_ids = ARRAY(
+    SELECT DISTINCT (item ->> 'ingredient_id')::uuid
+    FROM json_array_elements(recipe_nutrition.total_ingredients) AS item
+    ORDER BY 1
+)
+WHERE json_array_length(recipe_nutrition.total_ingredients) > 0
+"""
+
+
+def upgrade() -> None:
+    op.add_column(
+        "recipe_nutrition",
+        sa.Column(
+            "ingredient_ids",
+            postgresql.ARRAY(sa.Uuid()),
+            nullable=False,
+            server_default="{}",
+        ),
+    )
+    op.execute(BACKFILL_INGREDIENT_IDS)
+    op.create_index(
+        "ix_recipe_nutrition_ingredient_ids",
+        "recipe_nutrition",
+        ["ingredient_ids"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_recipe_nutrition_ingredient_ids",
+        table_name="recipe_nutrition",
+        postgresql_using="gin",
+    )
+    op.drop_column("recipe_nutrition", "ingredient_ids")
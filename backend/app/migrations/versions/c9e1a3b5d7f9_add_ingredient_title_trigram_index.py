@@ -0,0 +1,36 @@
+"""Add trigram index on ingredient title
+
+Revision ID: c9e1a3b5d7f9
+Revises: b8d0f2a4c6e8
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "c9e1a3b5d7f9"
+down_revision: Union[str, None] = "b8d0f2a4c6e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # pg_trgm is a trusted extension, so the database owner can create it.
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_ingredient_title_trgm",
+        "ingredient",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_ingredient_title_trgm", table_name="ingredient", postgresql_using="gin"
+    )
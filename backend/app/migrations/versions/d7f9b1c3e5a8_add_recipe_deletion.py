@@ -0,0 +1,40 @@
+"""Track recipe deletions for the in-memory recipe indexes
+
+Revision ID: d7f9b1c3e5a8
+Revises: c6e8a0b2d4f7
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d7f9b1c3e5a8"
+down_revision: Union[str, None] = "c6e8a0b2d4f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recipe_deletion",
+        sa.Column("recipe_id", sa.Uuid(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("recipe_id"),
+    )
+    op.create_index(
+        "ix_recipe_deletion_deleted_at",
+        "recipe_deletion",
+        ["deleted_at"],
+        unique=False,
+    )
+    op.create_index("ix_recipe_updated_at", "recipe", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_recipe_updated_at", table_name="recipe")
+    op.drop_index("ix_recipe_deletion_deleted_at", table_name="recipe_deletion")
+    op.drop_table("recipe_deletion")
@@ -0,0 +1,40 @@
+"""Add materialized recipe nutrition totals
+
+Revision ID: d8e2f4a6b0c1
+Revises: b4d9a6e3c8f2
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d8e2f4a6b0c1"
+down_revision: Union[str, None] = "b4d9a6e3c8f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows for existing recipes are computed by revision e8a0c2d4f6b9, once the
+    # rest of the stored nutrition schema exists.
+    op.create_table(
+        "recipe_nutrition",
+        sa.Column("recipe_id", sa.Uuid(), nullable=False),
+        sa.Column("total_ingredients", sa.JSON(), server_default="[]", nullable=False),
+        sa.Column("total_calories", sa.Float(), nullable=False),
+        sa.Column("total_carbohydrates", sa.Float(), nullable=False),
+        sa.Column("total_fat", sa.Float(), nullable=False),
+        sa.Column("total_protein", sa.Float(), nullable=False),
+        sa.Column("total_grams", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["recipe_id"], ["recipe.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("recipe_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("recipe_nutrition")
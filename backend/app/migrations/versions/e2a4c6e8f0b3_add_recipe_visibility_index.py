@@ -0,0 +1,47 @@
+"""Add user visibility version and partial recipe visibility indexes
+
+Revision ID: e2a4c6e8f0b3
+Revises: d1f3a5c7e9b2
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "e2a4c6e8f0b3"
+down_revision: Union[str, None] = "d1f3a5c7e9b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user",
+        sa.Column(
+            "visibility_version", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+    op.create_index(
+        "ix_recipe_public_created_at_id",
+        "recipe",
+        ["created_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("NOT is_hidden"),
+    )
+    op.create_index(
+        "ix_recipe_hidden_owner_id",
+        "recipe",
+        ["owner_id"],
+        unique=False,
+        postgresql_where=sa.text("is_hidden"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_recipe_hidden_owner_id", table_name="recipe")
+    op.drop_index("ix_recipe_public_created_at_id", table_name="recipe")
+    op.drop_column("user", "visibility_version")
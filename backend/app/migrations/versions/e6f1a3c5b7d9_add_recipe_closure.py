@@ -0,0 +1,60 @@
+"""Add recipe closure table for sub-recipe ancestry
+
+Revision ID: e6f1a3c5b7d9
+Revises: d8e2f4a6b0c1
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "e6f1a3c5b7d9"
+down_revision: Union[str, None] = "d8e2f4a6b0c1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recipe_closure",
+        sa.Column("ancestor_id", sa.Uuid(), nullable=False),
+        sa.Column("descendant_id", sa.Uuid(), nullable=False),
+        sa.Column("path_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ancestor_id"], ["recipe.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["descendant_id"], ["recipe.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+    )
+    op.create_index(
+        "ix_recipe_closure_descendant_id",
+        "recipe_closure",
+        ["descendant_id", "ancestor_id"],
+        unique=False,
+    )
+
+    # Existing links are acyclic (writes validate them), so the walk terminates.
+    op.execute(
+        """
+        WITH RECURSIVE chains(ancestor_id, descendant_id) AS (
+            SELECT parent_recipe_id, sub_recipe_id
+            FROM recipesubrecipelink
+            UNION ALL
+            SELECT chains.ancestor_id, link.sub_recipe_id
+            FROM chains
+            JOIN recipesubrecipelink AS link
+                ON link.parent_recipe_id = chains.descendant_id
+        )
+        INSERT INTO recipe_closure (ancestor_id, descendant_id, path_count)
+        SELECT ancestor_id, descendant_id, count(*)
+        FROM chains
+        GROUP BY ancestor_id, descendant_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_recipe_closure_descendant_id", table_name="recipe_closure")
+    op.drop_table("recipe_closure")
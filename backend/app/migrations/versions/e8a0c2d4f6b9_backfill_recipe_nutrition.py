@@ -0,0 +1,46 @@
+"""Compute stored nutrition for recipes that have none
+
+recipe_nutrition started out empty, and the later migrations only derive from
+rows that exist, so recipes created before it had no totals, macros, ingredient
+ids or card numbers. This runs app.recipe_nutrition.refresh_recipe_nutrition
+for them, which needs the schema as of this revision; it is the same step as
+`app-cli refresh-nutrition`, limited to the missing rows.
+
+Revision ID: e8a0c2d4f6b9
+Revises: d7f9b1c3e5a8
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from itertools import batched
+from typing import Sequence, Union
+
+from alembic import op
+from sqlmodel import Session, select
+
+from app.models import Recipe, RecipeNutrition
+from app.recipe_nutrition import REFRESH_BATCH_SIZE, refresh_recipe_nutrition
+
+
+revision: str = "e8a0c2d4f6b9"
+down_revision: Union[str, None] = "d7f9b1c3e5a8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    session = Session(bind=op.get_bind())
+    recipe_ids = session.exec(
+        select(Recipe.id)
+        .outerjoin(RecipeNutrition, RecipeNutrition.recipe_id == Recipe.id)
+        .where(RecipeNutrition.recipe_id.is_(None))
+    ).all()
+    for batch in batched(recipe_ids, REFRESH_BATCH_SIZE):
+        refresh_recipe_nutrition(session, batch)
+    session.flush()
+    session.close()
+
+
+def downgrade() -> None:
+    # The rows are derived data that the earlier schema holds just as well.
+    pass
@@ -0,0 +1,40 @@
+"""Add composite indexes for keyset pagination
+
+Revision ID: f2a4c6e8b1d3
+Revises: e6f1a3c5b7d9
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "f2a4c6e8b1d3"
+down_revision: Union[str, None] = "e6f1a3c5b7d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_recipe_created_at_id", "recipe", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_ingredient_title_id", "ingredient", ["title", "id"], unique=False
+    )
+    op.create_index(
+        "ix_gamesession_created_at_id",
+        "gamesession",
+        ["created_at", "id"],
+        unique=False,
+    )
+    op.create_index("ix_user_email_id", "user", ["email", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_email_id", table_name="user")
+    op.drop_index("ix_gamesession_created_at_id", table_name="gamesession")
+    op.drop_index("ix_ingredient_title_id", table_name="ingredient")
+    op.drop_index("ix_recipe_created_at_id", table_name="recipe")
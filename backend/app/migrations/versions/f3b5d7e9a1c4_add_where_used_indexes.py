@@ -0,0 +1,41 @@
+"""Add reverse lookup indexes on recipe link tables
+
+Revision ID: f3b5d7e9a1c4
+Revises: e2a4c6e8f0b3
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "f3b5d7e9a1c4"
+down_revision: Union[str, None] = "e2a4c6e8f0b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_recipeingredientlink_ingredient_id",
+        "recipeingredientlink",
+        ["ingredient_id", "recipe_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_recipesubrecipelink_sub_recipe_id",
+        "recipesubrecipelink",
+        ["sub_recipe_id", "parent_recipe_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_recipesubrecipelink_sub_recipe_id", table_name="recipesubrecipelink"
+    )
+    op.drop_index(
+        "ix_recipeingredientlink_ingredient_id", table_name="recipeingredientlink"
+    )
@@ -4,14 +4,24 @@ from enum import StrEnum
 from pydantic import (
     BaseModel,
     EmailStr,
+    PrivateAttr,
     StrictBool,
     computed_field,
     field_validator,
     model_validator,
 )
 from sqlmodel import Field, SQLModel, Relationship, Column, JSON
-from sqlalchemy import BigInteger, CheckConstraint, DateTime
-from typing import Optional
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    Computed,
+    DateTime,
+    Index,
+    Uuid,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from typing import Any, Optional
 from datetime import date, datetime, timezone
 # from permissions.roles import Role
 
@@ -46,6 +56,8 @@ class UserBase(SQLModel):
 
 
 class User(UserBase, table=True):
+    __table_args__ = (Index("ix_user_email_id", "email", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
     items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
@@ -59,6 +71,8 @@ class User(UserBase, table=True):
         description="List of custom scopes that this user has access to",
         sa_column=Column(JSON),
     )
+    # Bumped whenever the user's recipe viewer links change; keys cached grants.
+    visibility_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     # H.C game
     game_sessions: list["GameSession"] = Relationship(back_populates="owner")
@@ -103,6 +117,7 @@ class UserPublic(UserBase):
 class UsersPublic(SQLModel):
     data: list[UserPublic]
     count: int
+    next_cursor: str | None = None
 
 
 class UserMePublic(UserPublic):
@@ -200,6 +215,11 @@ class ItemsPublic(SQLModel):
 
 
 class RecipeIngredientLink(SQLModel, table=True):
+    # The primary key serves lookups by recipe; this one serves "where used".
+    __table_args__ = (
+        Index("ix_recipeingredientlink_ingredient_id", "ingredient_id", "recipe_id"),
+    )
+
     recipe_id: uuid.UUID | None = Field(
         default=None, foreign_key="recipe.id", primary_key=True
     )
@@ -229,12 +249,9 @@ class RecipeIngredientLink(SQLModel, table=True):
     ingredient: "Ingredient" = Relationship(back_populates="recipe_links")
 
 
-class RecipeIngredientLinkCreate(SQLModel):
-    """
-    Create a new recipe ingredient link.
-    """
+class RecipeIngredientAmount(SQLModel):
+    """How much of an ingredient a recipe uses; shared by link payloads."""
 
-    ingredient_id: uuid.UUID
     amount: float = Field(
         default=1.0, ge=0, description="Amount of the ingredient in the recipe"
     )
@@ -253,12 +270,20 @@ class RecipeIngredientLinkCreate(SQLModel):
     )
 
     @model_validator(mode="after")
-    def validate_consumed_amount(self) -> "RecipeIngredientLinkCreate":
+    def validate_consumed_amount(self) -> "RecipeIngredientAmount":
         if self.consumed_amount is not None and self.consumed_amount > self.amount:
             raise ValueError("Consumed amount cannot exceed the recipe amount")
         return self
 
 
+class RecipeIngredientLinkCreate(RecipeIngredientAmount):
+    """
+    Create a new recipe ingredient link.
+    """
+
+    ingredient_id: uuid.UUID
+
+
 class RecipeIngredientLinkPublic(SQLModel):
     """
     Public class for recipe ingredient link.
@@ -348,6 +373,27 @@ class RecipeSubRecipePublic(SQLModel):
     image: Optional[str] = None
 
 
+class RecipeUsagePublic(SQLModel):
+    """A recipe that uses an ingredient or sub-recipe, directly or through sub-recipes."""
+
+    id: uuid.UUID
+    title: str
+    image: Optional[str] = None
+    is_hidden: bool
+    created_at: datetime
+    # False when the recipe only reaches it through one of its sub-recipes.
+    direct: bool
+
+
+class RecipeSimilarPublic(SQLModel):
+    """A recipe close to another one in ingredients and macro profile."""
+
+    id: uuid.UUID
+    title: str
+    image: Optional[str] = None
+    similarity: float = Field(description="Weighted cosine similarity, 0 to 1.")
+
+
 class RecipeSubRecipeLinkPublic(SQLModel):
     sub_recipe: RecipeSubRecipePublic
     scale_factor: float
@@ -376,6 +422,48 @@ class RecipeCreate(RecipeBase):
     viewer_ids: list[uuid.UUID] | None = None
 
 
+class RecipeExportIngredient(RecipeIngredientAmount):
+    """
+    An ingredient line of an exported recipe.
+
+    Ingredient ids differ between databases, so the import resolves the ingredient
+    by barcode when there is one and by title otherwise.
+    """
+
+    ingredient_title: str = Field(max_length=255, min_length=1)
+    barcode: str | None = Field(default=None, max_length=32)
+
+
+class RecipeExport(RecipeBase):
+    """
+    One line of GET /recipes/export, and the line format of POST /recipes/import.
+
+    Ids are kept so sub-recipe links survive the round trip: a sub-recipe must
+    already exist or appear on an earlier line. Owners and viewers are not
+    exported; imported recipes belong to the importing user.
+    """
+
+    id: uuid.UUID
+    instructions: str | None = Field(default=None, max_length=9999)
+    created_at: datetime | None = None
+    ingredients: list[RecipeExportIngredient] = []
+    sub_recipes: list[RecipeSubRecipeLinkCreate] = []
+
+
+class RecipeImportError(SQLModel):
+    line: int
+    detail: str
+
+
+class RecipeImportResult(SQLModel):
+    created: int = 0
+    # Lines whose recipe id already exists.
+    skipped: int = 0
+    failed: int = 0
+    # The first failures, with their 1-based line numbers.
+    errors: list[RecipeImportError] = []
+
+
 class RecipePublic(RecipeBase):
     id: uuid.UUID
     owner: UserPublic
@@ -387,6 +475,8 @@ class RecipePublic(RecipeBase):
     # Required in public responses so OpenAPI/TS client do not mark it as optional.
     total_ingredients: list[RecipeIngredientTotalPublic]
 
+    _nutrition: "RecipeNutritionSummary | None" = PrivateAttr(default=None)
+
     def _ensure_aggregated_totals(self) -> None:
         if self.total_ingredients:
             return
@@ -396,83 +486,254 @@ class RecipePublic(RecipeBase):
                 "build_recipe_public before computing nutrition fields."
             )
 
-    def _sum_nutrient(self, nutrient_field: str) -> float:
-        """
-        Sum nutrient values from pre-aggregated total ingredients.
+    @property
+    def nutrition(self) -> "RecipeNutritionSummary":
         """
-        self._ensure_aggregated_totals()
-        return sum(
-            getattr(item, nutrient_field, 0.0) for item in self.total_ingredients
-        )
+        Recipe-level nutrition, computed from total_ingredients on first use.
 
-    def _per_serving(self, total_value: float) -> float:
-        if self.servings <= 0:
-            return 0.0
-        return total_value / self.servings
+        Builders set it up front; the computed fields below only read from it.
+        """
+        if self._nutrition is None:
+            self._ensure_aggregated_totals()
+            self._nutrition = RecipeNutritionSummary.from_total_ingredients(
+                self.total_ingredients, self.servings
+            )
+        return self._nutrition
 
     @computed_field
     @property
     def total_calories(self) -> int:
         """Calculate total calories for the entire recipe based on ingredients and their amounts."""
-        return round(self._sum_nutrient("calories"))
+        return self.nutrition.total_calories
 
     @computed_field
     @property
     def calories_per_serving(self) -> int:
         """Calculate calories per serving."""
-        return round(self._per_serving(self.total_calories))
+        return self.nutrition.calories_per_serving
 
     @computed_field
     @property
     def total_carbohydrates(self) -> float:
         """Calculate total carbohydrates for the entire recipe in grams."""
-        return round(self._sum_nutrient("carbohydrates"), 1)
+        return self.nutrition.total_carbohydrates
 
     @computed_field
     @property
     def total_fat(self) -> float:
         """Calculate total fat for the entire recipe in grams."""
-        return round(self._sum_nutrient("fat"), 1)
+        return self.nutrition.total_fat
 
     @computed_field
     @property
     def total_protein(self) -> float:
         """Calculate total protein for the entire recipe in grams."""
-        return round(self._sum_nutrient("protein"), 1)
+        return self.nutrition.total_protein
 
     @computed_field
     @property
     def carbohydrates_per_serving(self) -> float:
         """Calculate carbohydrates per serving in grams."""
-        return round(self._per_serving(self.total_carbohydrates), 1)
+        return self.nutrition.carbohydrates_per_serving
 
     @computed_field
     @property
     def fat_per_serving(self) -> float:
         """Calculate fat per serving in grams."""
-        return round(self._per_serving(self.total_fat), 1)
+        return self.nutrition.fat_per_serving
 
     @computed_field
     @property
     def protein_per_serving(self) -> float:
         """Calculate protein per serving in grams."""
-        return round(self._per_serving(self.total_protein), 1)
+        return self.nutrition.protein_per_serving
 
     @computed_field
     @property
     def calculated_weight(self) -> int:
         """The calculated weight of the recipe based on the ingredients and their amounts. Returns the total weight in grams."""
-        self._ensure_aggregated_totals()
-        return round(sum(item.grams for item in self.total_ingredients))
+        return self.nutrition.calculated_weight
 
     @computed_field
     @property
     def calories_per_100g(self) -> int:
         """Calculate calories per 100g of the recipe."""
-        total_weight = self.calculated_weight
-        if total_weight <= 0:
-            return 0
-        return round((self.total_calories / total_weight) * 100)
+        return self.nutrition.calories_per_100g
+
+    @computed_field
+    @property
+    def carbohydrates_per_100g(self) -> float:
+        """Calculate carbohydrates per 100g of the recipe in grams."""
+        return self.nutrition.carbohydrates_per_100g
+
+    @computed_field
+    @property
+    def fat_per_100g(self) -> float:
+        """Calculate fat per 100g of the recipe in grams."""
+        return self.nutrition.fat_per_100g
+
+    @computed_field
+    @property
+    def protein_per_100g(self) -> float:
+        """Calculate protein per 100g of the recipe in grams."""
+        return self.nutrition.protein_per_100g
+
+
+class RecipeNutritionSummary(BaseModel):
+    """Rounded recipe-level nutrition derived from aggregated ingredient totals."""
+
+    total_calories: int
+    calories_per_serving: int
+    total_carbohydrates: float
+    total_fat: float
+    total_protein: float
+    carbohydrates_per_serving: float
+    fat_per_serving: float
+    protein_per_serving: float
+    calculated_weight: int
+    calories_per_100g: int
+    carbohydrates_per_100g: float
+    fat_per_100g: float
+    protein_per_100g: float
+
+    @classmethod
+    def from_total_ingredients(
+        cls, total_ingredients: list[RecipeIngredientTotalPublic], servings: float
+    ) -> "RecipeNutritionSummary":
+        """Walk the totals once and derive every field from the five sums."""
+        columns = zip(
+            *(
+                (item.calories, item.carbohydrates, item.fat, item.protein, item.grams)
+                for item in total_ingredients
+            )
+        )
+        calories, carbohydrates, fat, protein, grams = (
+            (sum(column) for column in columns) if total_ingredients else (0,) * 5
+        )
+
+        def per_serving(total_value: float) -> float:
+            return total_value / servings if servings > 0 else 0.0
+
+        def per_100g(total_value: float) -> float:
+            return (
+                total_value / calculated_weight * 100 if calculated_weight > 0 else 0.0
+            )
+
+        total_calories = round(calories)
+        total_carbohydrates = round(carbohydrates, 1)
+        total_fat = round(fat, 1)
+        total_protein = round(protein, 1)
+        calculated_weight = round(grams)
+        return cls(
+            total_calories=total_calories,
+            calories_per_serving=round(per_serving(total_calories)),
+            total_carbohydrates=total_carbohydrates,
+            total_fat=total_fat,
+            total_protein=total_protein,
+            carbohydrates_per_serving=round(per_serving(total_carbohydrates), 1),
+            fat_per_serving=round(per_serving(total_fat), 1),
+            protein_per_serving=round(per_serving(total_protein), 1),
+            calculated_weight=calculated_weight,
+            calories_per_100g=round(per_100g(total_calories)),
+            carbohydrates_per_100g=round(per_100g(total_carbohydrates), 1),
+            fat_per_100g=round(per_100g(total_fat), 1),
+            protein_per_100g=round(per_100g(total_protein), 1),
+        )
+
+
+class RecipeSummaryPublic(SQLModel):
+    """
+    Lightweight recipe card for list views (`view=summary`).
+
+    Built from the recipe row and its stored nutrition totals only, so no links,
+    viewers or per-ingredient breakdowns are loaded. Rounding matches RecipePublic.
+    """
+
+    id: uuid.UUID
+    title: str
+    image: Optional[str] = None
+    servings: int
+    is_hidden: bool
+    created_at: datetime
+    total_calories: int
+    calories_per_serving: int
+    total_carbohydrates: float
+    total_fat: float
+    total_protein: float
+    carbohydrates_per_serving: float
+    fat_per_serving: float
+    protein_per_serving: float
+    calculated_weight: int
+    calories_per_100g: int
+    carbohydrates_per_100g: float
+    fat_per_100g: float
+    protein_per_100g: float
+
+
+class RecipeScaledPublic(SQLModel):
+    """
+    A recipe's aggregated ingredients and nutrition multiplied by a scale factor.
+
+    Amounts, sources and macros are scaled; per-serving values refer to the
+    scaled number of servings, so they match the unscaled recipe.
+    """
+
+    id: uuid.UUID
+    title: str
+    factor: float
+    servings: float
+    total_ingredients: list[RecipeIngredientTotalPublic]
+    total_calories: int
+    calories_per_serving: int
+    total_carbohydrates: float
+    total_fat: float
+    total_protein: float
+    carbohydrates_per_serving: float
+    fat_per_serving: float
+    protein_per_serving: float
+    calculated_weight: int
+    calories_per_100g: int
+    carbohydrates_per_100g: float
+    fat_per_100g: float
+    protein_per_100g: float
+
+
+class ShoppingListItem(SQLModel):
+    recipe_id: uuid.UUID
+    servings: int = Field(gt=0, description="Servings to shop for.")
+
+
+class ShoppingListCreate(SQLModel):
+    items: list[ShoppingListItem] = Field(min_length=1, max_length=100)
+
+
+class ShoppingListPublic(SQLModel):
+    """Merged ingredient totals for every recipe on a shopping list."""
+
+    total_ingredients: list[RecipeIngredientTotalPublic]
+
+
+class PantryMatchCreate(SQLModel):
+    ingredient_ids: list[uuid.UUID] = Field(
+        min_length=1, max_length=1000, description="Ingredients in the pantry."
+    )
+
+
+class PantryMissingIngredientPublic(SQLModel):
+    id: uuid.UUID
+    title: str
+
+
+class PantryMatchPublic(SQLModel):
+    """A recipe ranked by how much of its flattened ingredient set a pantry covers."""
+
+    id: uuid.UUID
+    title: str
+    image: Optional[str] = None
+    coverage: float = Field(description="Share of the recipe's ingredients covered.")
+    covered_count: int
+    ingredient_count: int
+    missing_ingredients: list[PantryMissingIngredientPublic]
 
 
 class Recipe(RecipeBase, table=True):
@@ -482,6 +743,36 @@ class Recipe(RecipeBase, table=True):
     Should have an owner and a list of ingredients. However a recipe for every ingredints, the ingredient should also have an amount of that ingredient and the unit of the amount
     """
 
+    __table_args__ = (
+        Index("ix_recipe_created_at_id", "created_at", "id"),
+        # Partial indexes for the two halves of the visibility filter: pages of
+        # public recipes, and the hidden recipes a user owns.
+        Index(
+            "ix_recipe_public_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("NOT is_hidden"),
+        ),
+        Index(
+            "ix_recipe_hidden_owner_id", "owner_id", postgresql_where=text("is_hidden")
+        ),
+        # The newest updated_at versions the in-memory recipe indexes.
+        Index("ix_recipe_updated_at", "updated_at"),
+        # Full-text search document, maintained by Postgres. It is deliberately left
+        # unmapped so recipe loads never fetch it; query it via RECIPE_SEARCH_VECTOR.
+        Column(
+            "search_vector",
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(instructions, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+        Index("ix_recipe_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     instructions: Optional[str] = Field(default=None, max_length=9999)
@@ -492,6 +783,16 @@ class Recipe(RecipeBase, table=True):
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
+    # Bumped whenever the recipe's public representation may change, including
+    # changes to its sub-recipes and ingredients; the ETag of recipe reads.
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(
+            DateTime(timezone=True),
+            nullable=False,
+            onupdate=lambda: datetime.now(timezone.utc),
+        ),
+    )
 
     # we will use this field to be able to scale the recipe, can not be less than 1
     servings: int = Field(default=1, ge=1)
@@ -517,11 +818,20 @@ class Recipe(RecipeBase, table=True):
     #     arbitrary_types_allowed = True
 
 
+RECIPE_SEARCH_VECTOR = Recipe.__table__.c.search_vector
+
+
 #####################################################################################
 # Recipe Sub-Recipe links
 
 
 class RecipeSubRecipeLink(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_recipesubrecipelink_sub_recipe_id", "sub_recipe_id", "parent_recipe_id"
+        ),
+    )
+
     parent_recipe_id: uuid.UUID | None = Field(
         default=None, foreign_key="recipe.id", primary_key=True
     )
@@ -559,6 +869,226 @@ class RecipeViewerLink(SQLModel, table=True):
     user: "User" = Relationship(back_populates="recipe_viewer_links")
 
 
+# Rounded per-serving and per-100g values stored on RecipeNutrition, so recipe
+# lists can filter and sort on them in SQL.
+RECIPE_MACRO_FIELDS = (
+    "calories_per_serving",
+    "carbohydrates_per_serving",
+    "fat_per_serving",
+    "protein_per_serving",
+    "calories_per_100g",
+    "carbohydrates_per_100g",
+    "fat_per_100g",
+    "protein_per_100g",
+)
+
+
+class RecipeNutrition(SQLModel, table=True):
+    """
+    Materialized nutrition totals for a recipe, including all of its sub-recipes.
+
+    Rows are rewritten by app.recipe_nutrition whenever the recipe, its links, one of
+    its sub-recipes or a linked ingredient changes, so reads never walk the graph.
+    The macro columns hold the same rounded values RecipePublic shows, each with a
+    (macro, recipe_id) index for keyset pagination. ingredient_ids is the flattened
+    set of ingredients reachable through sub-recipes, GIN indexed for containment.
+    """
+
+    __tablename__ = "recipe_nutrition"
+    __table_args__ = (
+        *(
+            Index(f"ix_recipe_nutrition_{field}_recipe_id", field, "recipe_id")
+            for field in RECIPE_MACRO_FIELDS
+        ),
+        Index(
+            "ix_recipe_nutrition_ingredient_ids",
+            "ingredient_ids",
+            postgresql_using="gin",
+        ),
+    )
+
+    recipe_id: uuid.UUID = Field(
+        foreign_key="recipe.id", primary_key=True, ondelete="CASCADE"
+    )
+    total_ingredients: list[dict[str, Any]] = Field(
+        default_factory=list,
+        description="Serialized RecipeIngredientTotalPublic rows for the recipe",
+        sa_column=Column(JSON, nullable=False, server_default="[]"),
+    )
+    total_calories: float = Field(default=0)
+    total_carbohydrates: float = Field(default=0)
+    total_fat: float = Field(default=0)
+    total_protein: float = Field(default=0)
+    total_grams: float = Field(default=0)
+    calories_per_serving: int = Field(default=0)
+    carbohydrates_per_serving: float = Field(default=0)
+    fat_per_serving: float = Field(default=0)
+    protein_per_serving: float = Field(default=0)
+    calories_per_100g: int = Field(default=0)
+    carbohydrates_per_100g: float = Field(default=0)
+    fat_per_100g: float = Field(default=0)
+    protein_per_100g: float = Field(default=0)
+    ingredient_ids: list[uuid.UUID] = Field(
+        default_factory=list,
+        sa_column=Column(ARRAY(Uuid), nullable=False, server_default="{}"),
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class RecipeCard(SQLModel, table=True):
+    """
+    Denormalized recipe card: what the home page shows, one row per recipe.
+
+    Rewritten by app.recipe_cards together with the stored nutrition totals, and
+    when a recipe's image or its owner's name changes, so GET /recipes/cards reads
+    this table alone. Both indexes include every card column, so a page is an
+    index-only scan.
+    """
+
+    __tablename__ = "recipe_card"
+    __table_args__ = (
+        Index(
+            "ix_recipe_card_public_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("NOT is_hidden"),
+            postgresql_include=[
+                "title",
+                "image",
+                "owner_name",
+                "calories_per_serving",
+                "protein_per_serving",
+            ],
+        ),
+        Index(
+            "ix_recipe_card_created_at_id",
+            "created_at",
+            "id",
+            postgresql_include=[
+                "title",
+                "image",
+                "owner_name",
+                "calories_per_serving",
+                "protein_per_serving",
+                "is_hidden",
+                "owner_id",
+            ],
+        ),
+    )
+
+    id: uuid.UUID = Field(foreign_key="recipe.id", primary_key=True, ondelete="CASCADE")
+    title: str = Field(max_length=255)
+    image: Optional[str] = Field(default=None, max_length=1000)
+    owner_id: uuid.UUID
+    owner_name: Optional[str] = Field(default=None, max_length=255)
+    is_hidden: bool = False
+    created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+    calories_per_serving: int = 0
+    protein_per_serving: float = 0
+
+
+class RecipeCardPublic(SQLModel):
+    id: uuid.UUID
+    title: str
+    image: Optional[str] = None
+    owner_name: Optional[str] = None
+    calories_per_serving: int
+    protein_per_serving: float
+    created_at: datetime
+
+
+class ImageAsset(SQLModel, table=True):
+    """
+    An uploaded image, keyed by the sha256 of its bytes.
+
+    Uploading content that is already here returns the stored URL instead of
+    pushing the same image to storage again.
+    """
+
+    __tablename__ = "image_asset"
+
+    sha256: str = Field(primary_key=True, min_length=64, max_length=64)
+    url: str
+    content_type: str = Field(max_length=100)
+    size_bytes: int
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class ImageUploadTicketPublic(SQLModel):
+    """
+    Form fields for uploading one image of a recipe directly to Cloudinary.
+
+    POST them with the file to upload_url, then pass public_id, version and
+    signature from Cloudinary's response to PUT /recipes/{recipe_id}/image of the
+    same recipe.
+    """
+
+    upload_url: str
+    api_key: str
+    folder: str
+    public_id: str
+    overwrite: str
+    timestamp: str
+    signature: str
+    expires_at: datetime
+
+
+class RecipeImageAttach(SQLModel):
+    public_id: str = Field(max_length=255)
+    version: int
+    signature: str = Field(max_length=128)
+    format: str | None = Field(default=None, max_length=10)
+
+
+class RecipeClosure(SQLModel, table=True):
+    """
+    Transitive closure of the sub-recipe graph.
+
+    One row per (ancestor, descendant) pair connected by at least one chain of
+    RecipeSubRecipeLink rows, with the number of distinct chains between them so a
+    removed link only drops pairs no other chain still connects. Maintained by
+    app.recipe_graph in the same transaction as the link changes.
+    """
+
+    __tablename__ = "recipe_closure"
+    __table_args__ = (
+        Index("ix_recipe_closure_descendant_id", "descendant_id", "ancestor_id"),
+    )
+
+    ancestor_id: uuid.UUID = Field(
+        foreign_key="recipe.id", primary_key=True, ondelete="CASCADE"
+    )
+    descendant_id: uuid.UUID = Field(
+        foreign_key="recipe.id", primary_key=True, ondelete="CASCADE"
+    )
+    path_count: int = Field(default=1, ge=1)
+
+
+class RecipeDeletion(SQLModel, table=True):
+    """
+    When a recipe was deleted, so in-memory indexes know to drop it.
+
+    app.recipe_index compares the newest deleted_at between syncs; older rows are
+    pruned as later deletions come in.
+    """
+
+    __tablename__ = "recipe_deletion"
+
+    recipe_id: uuid.UUID = Field(primary_key=True)
+    deleted_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True),
+    )
+
+
 #####################################################################################
 # Ingredients
 
@@ -629,6 +1159,15 @@ class IngredientPublic(IngredientBase):
     # recipes: list[RecipePublic]
 
 
+class IngredientAutocompletePublic(SQLModel):
+    """Compact ingredient payload for the recipe editor's type-ahead."""
+
+    id: uuid.UUID
+    title: str
+    calories: int
+    weight_per_piece: int
+
+
 class Ingredient(IngredientBase, table=True):
     """
     Ingredient model
@@ -636,6 +1175,16 @@ class Ingredient(IngredientBase, table=True):
     Should have a title (will later be the primary key) and a list of recipes that use this ingredient. Amount and unit of the amount will be handled in the RecipeIngredientLink model
     """
 
+    __table_args__ = (
+        Index("ix_ingredient_title_id", "title", "id"),
+        Index(
+            "ix_ingredient_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255, min_length=1)
     calories: int = Field(
@@ -672,6 +1221,14 @@ class Ingredient(IngredientBase, table=True):
         unique=True,
         description="Normalized product barcode, when imported from Open Food Facts",
     )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(
+            DateTime(timezone=True),
+            nullable=False,
+            onupdate=lambda: datetime.now(timezone.utc),
+        ),
+    )
 
     # recipes: list["Recipe"] = Relationship(back_populates="ingredients", link_model=RecipeIngredientLink)
     recipe_links: list["RecipeIngredientLink"] = Relationship(
@@ -745,6 +1302,8 @@ class GameSession(GameSessionBase, table=True):
     A game session that has an id, a user that created it (admin) and a list of players and their information (scores etc.)
     """
 
+    __table_args__ = (Index("ix_gamesession_created_at_id", "created_at", "id"),)
+
     title: str = Field(max_length=255, min_length=1, nullable=True)
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False)
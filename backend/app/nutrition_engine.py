@@ -0,0 +1,280 @@
+"""
+Vectorised nutrition maths for many recipes at once.
+
+The row-by-row engine in app.recipe_nutrition builds a RecipeIngredientTotalPublic
+per ingredient, which is what scaled recipes and shopping lists need. List pages,
+exports and the stored-nutrition refresh work on many recipes at once, so this
+module computes the same numbers with NumPy arrays and reproduces the row-by-row
+results exactly: contributions are accumulated in the same order, per-ingredient
+totals are rounded to 2 decimals and then added up with sum(), and every rounding
+step follows Python's round(). calculate_nutrition_rows also returns the
+per-ingredient breakdown as the plain dicts RecipeNutrition stores.
+"""
+
+import uuid
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+
+# Columns of a totals matrix, in the order RecipeNutrition stores them.
+TOTAL_COLUMNS = (
+    "total_calories",
+    "total_carbohydrates",
+    "total_fat",
+    "total_protein",
+    "total_grams",
+)
+_MACROS = ("calories", "carbohydrates", "fat", "protein")
+
+
+def round_half_even(values: np.ndarray, decimals: int = 0) -> np.ndarray:
+    """
+    Round like Python's round(), element-wise.
+
+    np.round scales by 10**decimals first, which can land on the other side of a
+    tie than the exact decimal value would. Elements whose scaled value is within
+    float noise of a tie are re-rounded with round() itself.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0**decimals
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [
+            round(value, decimals) for value in values[near_tie].tolist()
+        ]
+    return rounded
+
+
+def calculate_totals_matrix(
+    dag_rows: Sequence[Any], recipe_ids: Iterable[uuid.UUID]
+) -> tuple[list[uuid.UUID], np.ndarray]:
+    """
+    Turn load_recipe_dag rows into one row of TOTAL_COLUMNS per recipe.
+
+    Returns the recipe ids in matrix order and a float64 matrix with the same
+    values refresh_recipe_nutrition stores for those recipes.
+    """
+    recipe_order, totals, _ = _aggregate(dag_rows, recipe_ids, breakdowns=False)
+    return recipe_order, totals
+
+
+def calculate_nutrition_rows(
+    dag_rows: Sequence[Any], recipe_ids: Iterable[uuid.UUID]
+) -> tuple[list[uuid.UUID], np.ndarray, list[list[dict[str, Any]]]]:
+    """
+    Like calculate_totals_matrix, plus each recipe's ingredient breakdown.
+
+    A breakdown equals the serialized RecipeIngredientTotalPublic list the
+    row-by-row engine produces (without the computed fields), in display order.
+    """
+    return _aggregate(dag_rows, recipe_ids, breakdowns=True)
+
+
+def _aggregate(
+    dag_rows: Sequence[Any], recipe_ids: Iterable[uuid.UUID], *, breakdowns: bool
+) -> tuple[list[uuid.UUID], np.ndarray, list[list[dict[str, Any]]]]:
+    recipe_order = list(dict.fromkeys(recipe_ids))
+    recipe_index = {recipe_id: index for index, recipe_id in enumerate(recipe_order)}
+    totals = np.zeros((len(recipe_order), len(TOTAL_COLUMNS)))
+    items: list[list[dict[str, Any]]] = [[] for _ in recipe_order]
+
+    rows = [
+        row
+        for row in dag_rows
+        if row.ingredient_id is not None and row.root_id in recipe_index
+    ]
+    if not rows:
+        return recipe_order, totals, items
+
+    scale = np.array([row.scale for row in rows], dtype=np.float64)
+    amount = np.array([row.amount for row in rows], dtype=np.float64) * scale
+    has_consumed = np.array([row.consumed_amount is not None for row in rows])
+    consumed = np.where(
+        has_consumed,
+        np.array([row.consumed_amount or 0 for row in rows], dtype=np.float64) * scale,
+        amount,
+    )
+    units = np.array([row.unit for row in rows], dtype=object)
+    to_base_unit = (units == "kg") | (units == "L")
+    amount = np.where(to_base_unit, amount * 1000, amount)
+    consumed = np.where(to_base_unit, consumed * 1000, consumed)
+    normalized_units = np.where(units == "kg", "g", np.where(units == "L", "ml", units))
+    weight_per_piece = np.array(
+        [row.weight_per_piece for row in rows], dtype=np.float64
+    )
+    grams = np.where(normalized_units == "pcs", consumed * weight_per_piece, consumed)
+    macros = np.array(
+        [[getattr(row, macro) for macro in _MACROS] for row in rows],
+        dtype=np.float64,
+    )
+    # Same operation order as _add_ingredient_total: (per_100g * grams) / 100.
+    contributions = np.column_stack(
+        [(macros * grams[:, None]) / 100, grams]
+    )  # calories, carbohydrates, fat, protein, grams
+
+    # One cell per (recipe, ingredient, unit), numbered by first appearance so
+    # ties in the display order below resolve like the row-by-row dict does.
+    cell_keys = [
+        (row.root_id, row.ingredient_id, unit)
+        for row, unit in zip(rows, normalized_units.tolist())
+    ]
+    cell_index: dict[tuple, int] = {}
+    row_cells = np.array(
+        [cell_index.setdefault(key, len(cell_index)) for key in cell_keys]
+    )
+    cell_values = np.zeros((len(cell_index), len(TOTAL_COLUMNS)))
+    # ufunc.at is unbuffered and applies rows in order, matching the += loop.
+    np.add.at(cell_values, row_cells, contributions)
+    cell_values = round_half_even(cell_values, 2)
+
+    # Stored totals sum the cells in display order: overlapping ingredients
+    # first, then by title and unit.
+    cell_sources = {
+        (cell, row.recipe_id) for cell, row in zip(row_cells.tolist(), rows)
+    }
+    source_counts = np.zeros(len(cell_index), dtype=np.int64)
+    np.add.at(source_counts, [cell for cell, _ in cell_sources], 1)
+    first_rows = {}
+    for row_number, cell in enumerate(row_cells.tolist()):
+        first_rows.setdefault(cell, row_number)
+    cell_titles = [
+        rows[first_rows[cell]].ingredient_title.lower()
+        for cell in range(len(cell_index))
+    ]
+    cell_units = [
+        cell_keys[first_rows[cell]][2].lower() for cell in range(len(cell_index))
+    ]
+    title_rank = _rank(cell_titles)
+    unit_rank = _rank(cell_units)
+    cell_recipes = np.array(
+        [recipe_index[key[0]] for key in cell_index], dtype=np.int64
+    )
+    order = np.lexsort(
+        (
+            np.arange(len(cell_index)),
+            unit_rank,
+            title_rank,
+            source_counts <= 1,
+            cell_recipes,
+        )
+    )
+    # The final sum goes through sum() itself: it compensates rounding error
+    # (Python 3.12+), which a plain vectorised add would not reproduce.
+    ordered_recipes = cell_recipes[order]
+    bounds = np.flatnonzero(np.diff(ordered_recipes)) + 1
+    for recipe_cells in np.split(order, bounds):
+        recipe = cell_recipes[recipe_cells[0]]
+        totals[recipe] = [
+            sum(column) for column in cell_values[recipe_cells].T.tolist()
+        ]
+    if not breakdowns:
+        return recipe_order, totals, items
+
+    cell_amounts = np.zeros((len(cell_index), 2))
+    np.add.at(cell_amounts, row_cells, np.column_stack([amount, consumed]))
+    cell_amounts = round_half_even(cell_amounts, 2).tolist()
+
+    # Sources per cell, numbered by first appearance like the row-by-row dicts.
+    source_index: dict[tuple[int, uuid.UUID], int] = {}
+    row_sources = np.array(
+        [
+            source_index.setdefault((cell, row.recipe_id), len(source_index))
+            for cell, row in zip(row_cells.tolist(), rows)
+        ]
+    )
+    source_amounts = np.zeros((len(source_index), 2))
+    np.add.at(source_amounts, row_sources, np.column_stack([amount, consumed]))
+    source_amounts = round_half_even(source_amounts, 2).tolist()
+    source_rows: dict[int, int] = {}
+    for row_number, source in enumerate(row_sources.tolist()):
+        source_rows.setdefault(source, row_number)
+    cell_source_lists: list[list[dict[str, Any]]] = [[] for _ in cell_index]
+    for (cell, recipe_id), source in source_index.items():
+        row = rows[source_rows[source]]
+        cell_source_lists[cell].append(
+            {
+                "recipe_id": str(recipe_id),
+                "recipe_title": row.recipe_title,
+                "amount": source_amounts[source][0],
+                "consumed_amount": source_amounts[source][1],
+                "unit": cell_keys[first_rows[cell]][2],
+                "is_main_recipe": recipe_id == row.root_id,
+            }
+        )
+
+    values = cell_values.tolist()
+    for cell in order.tolist():
+        row = rows[first_rows[cell]]
+        calories, carbohydrates, fat, protein, grams = values[cell]
+        items[cell_recipes[cell]].append(
+            {
+                "ingredient_id": str(row.ingredient_id),
+                "title": row.ingredient_title,
+                "amount": cell_amounts[cell][0],
+                "consumed_amount": cell_amounts[cell][1],
+                "unit": cell_keys[first_rows[cell]][2],
+                "grams": grams,
+                "calories": calories,
+                "carbohydrates": carbohydrates,
+                "fat": fat,
+                "protein": protein,
+                "sources": sorted(
+                    cell_source_lists[cell],
+                    key=lambda source: (
+                        not source["is_main_recipe"],
+                        source["recipe_title"].lower(),
+                    ),
+                ),
+            }
+        )
+    return recipe_order, totals, items
+
+
+def _rank(values: list[str]) -> np.ndarray:
+    ranks = {value: rank for rank, value in enumerate(sorted(set(values)))}
+    return np.array([ranks[value] for value in values], dtype=np.int64)
+
+
+def derive_nutrition_fields(
+    totals: np.ndarray, servings: Sequence[int] | np.ndarray
+) -> dict[str, np.ndarray]:
+    """
+    Compute RecipePublic's rounded nutrition fields for every row of a totals matrix.
+
+    Integer fields come back as int64 arrays, the rest as float64.
+    """
+    totals = np.asarray(totals, dtype=np.float64).reshape(-1, len(TOTAL_COLUMNS))
+    servings = np.asarray(servings, dtype=np.float64)
+    total_calories = round_half_even(totals[:, 0])
+    total_carbohydrates = round_half_even(totals[:, 1], 1)
+    total_fat = round_half_even(totals[:, 2], 1)
+    total_protein = round_half_even(totals[:, 3], 1)
+    calculated_weight = round_half_even(totals[:, 4])
+
+    def per_100g(total: np.ndarray, decimals: int = 0) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(
+                calculated_weight > 0,
+                round_half_even(total / calculated_weight * 100, decimals),
+                0.0,
+            )
+
+    return {
+        "total_calories": total_calories.astype(np.int64),
+        "calories_per_serving": round_half_even(total_calories / servings).astype(
+            np.int64
+        ),
+        "total_carbohydrates": total_carbohydrates,
+        "total_fat": total_fat,
+        "total_protein": total_protein,
+        "carbohydrates_per_serving": round_half_even(total_carbohydrates / servings, 1),
+        "fat_per_serving": round_half_even(total_fat / servings, 1),
+        "protein_per_serving": round_half_even(total_protein / servings, 1),
+        "calculated_weight": calculated_weight.astype(np.int64),
+        "calories_per_100g": per_100g(total_calories).astype(np.int64),
+        "carbohydrates_per_100g": per_100g(total_carbohydrates, 1),
+        "fat_per_100g": per_100g(total_fat, 1),
+        "protein_per_100g": per_100g(total_protein, 1),
+    }
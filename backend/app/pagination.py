@@ -0,0 +1,87 @@
+import base64
+import binascii
+import json
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor was not produced by encode_cursor."""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Pack the sort key of the last row on a page into an opaque URL-safe token."""
+    raw = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else str(value)
+            for value in values
+        ]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[InstrumentedAttribute]) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursorError("Invalid cursor")
+        decoded = []
+        for column, value in zip(columns, values):
+            # String columns (AutoString reports `object`) keep the JSON value.
+            python_type = column.type.python_type
+            if python_type is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            elif python_type is uuid.UUID:
+                decoded.append(uuid.UUID(value))
+            elif python_type in (int, float):
+                decoded.append(python_type(value))
+            else:
+                decoded.append(str(value))
+        return decoded
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+
+
+def paginate(
+    statement,
+    columns: Sequence[InstrumentedAttribute],
+    *,
+    cursor: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+    descending: bool = False,
+):
+    """
+    Order a select by the given key columns and resume after a cursor.
+
+    The key must be unique (end it with the primary key) and backed by a composite
+    index in the same column order, so every page is an index range scan no matter
+    how deep it is. One extra row is fetched so split_page can tell whether another
+    page follows. skip still works for clients that page by offset.
+    """
+    if cursor is not None:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, columns))
+        statement = statement.where(key < values if descending else key > values)
+
+    order_by = [column.desc() if descending else column.asc() for column in columns]
+    return statement.order_by(*order_by).offset(skip).limit(limit + 1)
+
+
+def split_page(
+    rows: Sequence[Any], columns: Sequence[InstrumentedAttribute], limit: int
+) -> tuple[list[Any], str | None]:
+    """Drop the look-ahead row from paginate and build the cursor for the next page."""
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor([getattr(last, column.key) for column in columns])
@@ -0,0 +1,139 @@
+"""
+Rank recipes by how much of them a pantry covers.
+
+Every recipe is a row of bits over a dictionary of ingredient ids, taken from the
+flattened ingredient set in recipe_nutrition, so ingredients pulled in through
+sub-recipes count. Scoring a pantry is one AND and a popcount over the whole
+matrix, however many recipes there are. app.recipe_index keeps it in step with
+the database.
+"""
+
+import uuid
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from app.models import RecipeNutrition
+from app.recipe_index import RecipeIndex, RecipeIndexSnapshot
+from app.recipe_visibility import RecipeVisibility
+
+WORD_BITS = 64
+
+
+@dataclass(frozen=True)
+class PantryMatch:
+    recipe_id: uuid.UUID
+    covered_count: int
+    ingredient_count: int
+    missing_ingredient_ids: list[uuid.UUID]
+
+    @property
+    def coverage(self) -> float:
+        return self.covered_count / self.ingredient_count
+
+
+@dataclass(frozen=True)
+class PantrySnapshot(RecipeIndexSnapshot):
+    ingredient_ids: list[uuid.UUID] = field(default_factory=list)
+    ingredient_bits: dict[uuid.UUID, int] = field(default_factory=dict)
+    bitsets: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, 1), dtype=np.uint64)
+    )
+    ingredient_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+
+    def with_recipes(self, rows: Sequence[Any]) -> "PantrySnapshot":
+        """rows carry id, is_hidden, owner_id and ingredient_ids."""
+        fields, changed_rows = self._recipe_fields(rows)
+        ingredient_ids = list(self.ingredient_ids)
+        ingredient_bits = dict(self.ingredient_bits)
+        set_rows = []
+        set_bits = []
+        for index, row in zip(changed_rows, rows):
+            for ingredient_id in row.ingredient_ids or ():
+                bit = ingredient_bits.setdefault(ingredient_id, len(ingredient_ids))
+                if bit == len(ingredient_ids):
+                    ingredient_ids.append(ingredient_id)
+                set_rows.append(index)
+                set_bits.append(bit)
+
+        words = max(1, -(-len(ingredient_ids) // WORD_BITS))
+        bitsets = np.zeros((len(fields["recipe_ids"]), words), dtype=np.uint64)
+        old_rows, old_words = self.bitsets.shape
+        bitsets[:old_rows, :old_words] = self.bitsets
+        bitsets[changed_rows] = 0
+        bits = np.array(set_bits, dtype=np.uint64)
+        np.bitwise_or.at(
+            bitsets,
+            (np.array(set_rows, dtype=np.int64), (bits // WORD_BITS).astype(np.int64)),
+            np.left_shift(np.uint64(1), bits % np.uint64(WORD_BITS)),
+        )
+        return PantrySnapshot(
+            **fields,
+            ingredient_ids=ingredient_ids,
+            ingredient_bits=ingredient_bits,
+            bitsets=bitsets,
+            ingredient_counts=np.bitwise_count(bitsets).sum(axis=1, dtype=np.int64),
+        )
+
+    def rank(
+        self,
+        pantry_ids: Iterable[uuid.UUID],
+        visibility: RecipeVisibility,
+        *,
+        skip: int = 0,
+        limit: int = 20,
+        min_coverage: float = 0,
+    ) -> tuple[list[PantryMatch], int]:
+        """
+        Visible recipes by covered share of their ingredients, then fewest missing
+        and most covered.
+
+        Recipes without ingredients are left out. Returns one page of matches and
+        the number of matches in total.
+        """
+        pantry = np.zeros(self.bitsets.shape[1], dtype=np.uint64)
+        for ingredient_id in pantry_ids:
+            bit = self.ingredient_bits.get(ingredient_id)
+            if bit is not None:
+                pantry[bit // WORD_BITS] |= np.uint64(1) << np.uint64(bit % WORD_BITS)
+
+        covered = np.bitwise_count(self.bitsets & pantry).sum(axis=1, dtype=np.int64)
+        counts = self.ingredient_counts
+        coverage = covered / np.maximum(counts, 1)
+        candidates = np.flatnonzero(
+            self.visible_mask(visibility) & (counts > 0) & (coverage >= min_coverage)
+        )
+        # lexsort sorts by the last key first; row order breaks remaining ties.
+        order = candidates[
+            np.lexsort(
+                (
+                    candidates,
+                    -covered[candidates],
+                    counts[candidates] - covered[candidates],
+                    -coverage[candidates],
+                )
+            )
+        ]
+        page = order[skip : skip + limit]
+
+        missing = (self.bitsets[page] & ~pantry).astype("<u8").view(np.uint8)
+        missing_bits = np.unpackbits(missing, axis=1, bitorder="little")
+        matches = [
+            PantryMatch(
+                recipe_id=self.recipe_ids[index],
+                covered_count=int(covered[index]),
+                ingredient_count=int(counts[index]),
+                missing_ingredient_ids=[
+                    self.ingredient_ids[bit] for bit in np.flatnonzero(row_bits)
+                ],
+            )
+            for index, row_bits in zip(page.tolist(), missing_bits)
+        ]
+        return matches, len(order)
+
+
+pantry_index = RecipeIndex(PantrySnapshot, [RecipeNutrition.ingredient_ids])
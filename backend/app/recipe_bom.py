@@ -0,0 +1,187 @@
+"""
+Bill of materials for sub-recipe DAGs.
+
+This module is pure: callers load the graph (app.recipe_nutrition.load_recipe_graph
+does it in one query) and get back flat lines, so it can be unit-tested and
+benchmarked without a database or FastAPI.
+
+Each recipe is flattened once per RecipeBom and memoized unscaled, keyed by
+(source recipe, ingredient, unit). A parent reuses the memo of every sub-recipe
+and only multiplies it by the link's scale factor, so a shared "base sauce" costs
+the same whether one or fifty paths lead to it. Walking every path instead grows
+exponentially with the number of stacked diamonds.
+"""
+
+import uuid
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+
+
+def normalize_amount(amount: float, unit: str) -> tuple[float, str]:
+    """Convert kg and L to g and ml so amounts in either unit add up."""
+    if unit == "kg":
+        return amount * 1000, "g"
+    if unit == "L":
+        return amount * 1000, "ml"
+    return amount, unit
+
+
+@dataclass(frozen=True)
+class IngredientLine:
+    """One ingredient link of a recipe, with the ingredient's nutrition per 100 g."""
+
+    ingredient_id: uuid.UUID
+    ingredient_title: str
+    calories: float
+    carbohydrates: float
+    fat: float
+    protein: float
+    weight_per_piece: float
+    amount: float
+    consumed_amount: float | None
+    unit: str
+
+
+@dataclass
+class RecipeNode:
+    id: uuid.UUID
+    title: str
+    ingredients: list[IngredientLine] = field(default_factory=list)
+    # (sub_recipe_id, scale_factor) for every sub-recipe link.
+    sub_recipes: list[tuple[uuid.UUID, float]] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class BomLine:
+    """
+    Everything a root recipe needs of one ingredient from one source recipe.
+
+    Fields mirror the rows app.recipe_nutrition.load_recipe_dag used to return:
+    amounts are already scaled (scale is always 1) and normalized to g, ml or pcs.
+    A root without any ingredients gets a single line whose ingredient fields are
+    None, so every root shows up in the result.
+    """
+
+    root_id: uuid.UUID
+    recipe_id: uuid.UUID
+    recipe_title: str
+    scale: float = 1.0
+    amount: float | None = None
+    consumed_amount: float | None = None
+    unit: str | None = None
+    ingredient_id: uuid.UUID | None = None
+    ingredient_title: str | None = None
+    calories: float | None = None
+    carbohydrates: float | None = None
+    fat: float | None = None
+    protein: float | None = None
+    weight_per_piece: float | None = None
+
+
+@dataclass
+class _Part:
+    source: RecipeNode
+    line: IngredientLine
+    unit: str
+    amount: float
+    consumed_amount: float
+
+
+_PartKey = tuple[uuid.UUID, uuid.UUID, str]
+
+
+class RecipeBom:
+    """Flatten recipes from one loaded graph, reusing every sub-recipe's result."""
+
+    def __init__(self, recipes: Mapping[uuid.UUID, RecipeNode]) -> None:
+        self.recipes = recipes
+        self._memo: dict[uuid.UUID, dict[_PartKey, _Part]] = {}
+
+    def flatten(self, recipe_id: uuid.UUID) -> dict[_PartKey, _Part]:
+        """Unscaled parts of a recipe and all of its sub-recipes, by source recipe."""
+        return self._flatten(recipe_id, set())
+
+    def _flatten(
+        self, recipe_id: uuid.UUID, on_path: set[uuid.UUID]
+    ) -> dict[_PartKey, _Part]:
+        parts = self._memo.get(recipe_id)
+        if parts is not None:
+            return parts
+
+        node = self.recipes[recipe_id]
+        parts = {}
+        for line in node.ingredients:
+            consumed_amount = (
+                line.amount if line.consumed_amount is None else line.consumed_amount
+            )
+            amount, unit = normalize_amount(line.amount, line.unit)
+            consumed_amount, _ = normalize_amount(consumed_amount, line.unit)
+            self._add(parts, node, line, unit, amount, consumed_amount)
+
+        on_path.add(recipe_id)
+        for sub_recipe_id, scale_factor in node.sub_recipes:
+            # Writes reject cycles; never re-entering a recipe keeps a bad row finite.
+            if sub_recipe_id in on_path or sub_recipe_id not in self.recipes:
+                continue
+            for part in self._flatten(sub_recipe_id, on_path).values():
+                self._add(
+                    parts,
+                    part.source,
+                    part.line,
+                    part.unit,
+                    part.amount * scale_factor,
+                    part.consumed_amount * scale_factor,
+                )
+        on_path.discard(recipe_id)
+
+        self._memo[recipe_id] = parts
+        return parts
+
+    @staticmethod
+    def _add(
+        parts: dict[_PartKey, _Part],
+        source: RecipeNode,
+        line: IngredientLine,
+        unit: str,
+        amount: float,
+        consumed_amount: float,
+    ) -> None:
+        key = (source.id, line.ingredient_id, unit)
+        existing = parts.get(key)
+        if existing is None:
+            parts[key] = _Part(source, line, unit, amount, consumed_amount)
+            return
+        existing.amount += amount
+        existing.consumed_amount += consumed_amount
+
+    def lines(self, root_ids: Iterable[uuid.UUID]) -> list[BomLine]:
+        """Flat bill of materials for every root present in the graph."""
+        lines: list[BomLine] = []
+        for root_id in dict.fromkeys(root_ids):
+            root = self.recipes.get(root_id)
+            if root is None:
+                continue
+            parts = self.flatten(root_id)
+            if not parts:
+                lines.append(
+                    BomLine(root_id=root_id, recipe_id=root_id, recipe_title=root.title)
+                )
+            for part in parts.values():
+                lines.append(
+                    BomLine(
+                        root_id=root_id,
+                        recipe_id=part.source.id,
+                        recipe_title=part.source.title,
+                        amount=part.amount,
+                        consumed_amount=part.consumed_amount,
+                        unit=part.unit,
+                        ingredient_id=part.line.ingredient_id,
+                        ingredient_title=part.line.ingredient_title,
+                        calories=part.line.calories,
+                        carbohydrates=part.line.carbohydrates,
+                        fat=part.line.fat,
+                        protein=part.line.protein,
+                        weight_per_piece=part.line.weight_per_piece,
+                    )
+                )
+        return lines
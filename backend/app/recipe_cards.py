@@ -0,0 +1,114 @@
+"""
+Maintenance of the recipe_card projection.
+
+Cards are rewritten wherever stored nutrition is (app.recipe_nutrition calls
+upsert_recipe_cards with the nutrition it just computed), which covers recipe,
+link and ingredient writes. The two columns that change without touching
+nutrition, a recipe's image and its owner's name, have their own updates here.
+"""
+
+import uuid
+from collections.abc import Mapping
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.models import Recipe, RecipeCard, User
+from app.recipe_graph import get_ancestor_recipe_ids
+
+
+def upsert_recipe_cards(
+    session: Session,
+    nutrition_by_recipe: Mapping[uuid.UUID, Mapping[str, float | None]],
+) -> None:
+    """
+    Rewrite the cards of these recipes from their rows and nutrition.
+
+    nutrition_by_recipe maps each recipe to its calories_per_serving and
+    protein_per_serving.
+    """
+    if not nutrition_by_recipe:
+        return
+    rows = session.exec(
+        select(
+            Recipe.id,
+            Recipe.title,
+            Recipe.image,
+            Recipe.owner_id,
+            Recipe.is_hidden,
+            Recipe.created_at,
+            User.full_name,
+        )
+        .join(User, User.id == Recipe.owner_id)
+        .where(Recipe.id.in_(nutrition_by_recipe))
+    ).all()
+    if not rows:
+        return
+
+    values = []
+    for row in rows:
+        nutrition = nutrition_by_recipe[row.id]
+        values.append(
+            {
+                "id": row.id,
+                "title": row.title,
+                "image": row.image,
+                "owner_id": row.owner_id,
+                "owner_name": row.full_name,
+                "is_hidden": row.is_hidden,
+                "created_at": row.created_at,
+                "calories_per_serving": nutrition["calories_per_serving"],
+                "protein_per_serving": nutrition["protein_per_serving"],
+            }
+        )
+    statement = insert(RecipeCard).values(values)
+    session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                column: statement.excluded[column]
+                for column in values[0]
+                if column != "id"
+            },
+        )
+    )
+
+
+def sync_recipe_image(session: Session, recipe: Recipe) -> None:
+    """
+    Call after changing a recipe's image without refreshing its nutrition.
+
+    Recipes that include it show its image with the sub-recipe, so they get a
+    new updated_at and with it new ETags; its card picks up the new image.
+    """
+    session.exec(
+        update(Recipe)
+        .where(Recipe.id.in_(get_ancestor_recipe_ids(session, [recipe.id])))
+        .values(updated_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    session.exec(
+        update(RecipeCard).where(RecipeCard.id == recipe.id).values(image=recipe.image)
+    )
+
+
+def sync_recipe_owner(session: Session, owner: User) -> None:
+    """
+    Call after changing any field of a user that UserPublic shows.
+
+    Recipes embed their owner, so the owner's recipes get a new updated_at and
+    with it new ETags; their cards pick up the new name.
+    """
+    session.exec(
+        update(Recipe)
+        .where(Recipe.owner_id == owner.id)
+        .values(updated_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    session.exec(
+        update(RecipeCard)
+        .where(RecipeCard.owner_id == owner.id)
+        .values(owner_name=owner.full_name)
+    )
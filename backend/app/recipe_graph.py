@@ -0,0 +1,196 @@
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import and_, delete, exists, func, literal, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.models import (
+    Recipe,
+    RecipeClosure,
+    RecipeIngredientLink,
+    RecipeSubRecipeLink,
+)
+
+
+def _connected_pairs(parent_recipe_id: uuid.UUID, sub_recipe_id: uuid.UUID):
+    """
+    Every (ancestor, descendant, path_count) pair a parent -> sub link contributes.
+
+    Paths through the link are any path ending at the parent (or the parent itself)
+    followed by any path starting at the sub-recipe (or the sub-recipe itself).
+    """
+    ancestors = (
+        select(
+            RecipeClosure.ancestor_id.label("recipe_id"),
+            RecipeClosure.path_count.label("path_count"),
+        )
+        .where(RecipeClosure.descendant_id == parent_recipe_id)
+        .union_all(
+            select(
+                literal(parent_recipe_id).label("recipe_id"),
+                literal(1).label("path_count"),
+            )
+        )
+        .subquery("ancestors")
+    )
+    descendants = (
+        select(
+            RecipeClosure.descendant_id.label("recipe_id"),
+            RecipeClosure.path_count.label("path_count"),
+        )
+        .where(RecipeClosure.ancestor_id == sub_recipe_id)
+        .union_all(
+            select(
+                literal(sub_recipe_id).label("recipe_id"),
+                literal(1).label("path_count"),
+            )
+        )
+        .subquery("descendants")
+    )
+    return select(
+        ancestors.c.recipe_id.label("ancestor_id"),
+        descendants.c.recipe_id.label("descendant_id"),
+        (ancestors.c.path_count * descendants.c.path_count).label("path_count"),
+    ).join(descendants, literal(True))
+
+
+def add_sub_recipe_edge(
+    session: Session, parent_recipe_id: uuid.UUID, sub_recipe_id: uuid.UUID
+) -> None:
+    """Record a new parent -> sub link in the closure table."""
+    pairs = _connected_pairs(parent_recipe_id, sub_recipe_id)
+    statement = insert(RecipeClosure).from_select(
+        ["ancestor_id", "descendant_id", "path_count"], pairs
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["ancestor_id", "descendant_id"],
+        set_={"path_count": RecipeClosure.path_count + statement.excluded.path_count},
+    )
+    session.exec(statement)
+
+
+def remove_sub_recipe_edge(
+    session: Session, parent_recipe_id: uuid.UUID, sub_recipe_id: uuid.UUID
+) -> None:
+    """Forget a parent -> sub link, dropping pairs no other chain still connects."""
+    pairs = _connected_pairs(parent_recipe_id, sub_recipe_id).subquery("pairs")
+    session.exec(
+        update(RecipeClosure)
+        .where(
+            RecipeClosure.ancestor_id == pairs.c.ancestor_id,
+            RecipeClosure.descendant_id == pairs.c.descendant_id,
+        )
+        .values(path_count=RecipeClosure.path_count - pairs.c.path_count)
+    )
+    session.exec(delete(RecipeClosure).where(RecipeClosure.path_count <= 0))
+
+
+def remove_recipe_edges(session: Session, recipe_id: uuid.UUID) -> None:
+    """Forget every link into and out of a recipe that is about to be deleted."""
+    links = session.exec(
+        select(
+            RecipeSubRecipeLink.parent_recipe_id, RecipeSubRecipeLink.sub_recipe_id
+        ).where(
+            (RecipeSubRecipeLink.parent_recipe_id == recipe_id)
+            | (RecipeSubRecipeLink.sub_recipe_id == recipe_id)
+        )
+    ).all()
+    for parent_recipe_id, sub_recipe_id in links:
+        remove_sub_recipe_edge(session, parent_recipe_id, sub_recipe_id)
+
+
+def creates_cycle(
+    session: Session,
+    parent_recipe_id: uuid.UUID,
+    sub_recipe_ids: Iterable[uuid.UUID],
+) -> bool:
+    """Whether linking any of the sub-recipes under the parent would close a cycle."""
+    sub_recipe_ids = set(sub_recipe_ids)
+    if not sub_recipe_ids:
+        return False
+    if parent_recipe_id in sub_recipe_ids:
+        return True
+    return session.exec(
+        select(
+            exists().where(
+                RecipeClosure.ancestor_id.in_(sub_recipe_ids),
+                RecipeClosure.descendant_id == parent_recipe_id,
+            )
+        )
+    ).one()
+
+
+def get_ancestor_recipe_ids(
+    session: Session, recipe_ids: Iterable[uuid.UUID]
+) -> set[uuid.UUID]:
+    """Every recipe that includes one of these recipes, at any depth."""
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return set()
+    return set(
+        session.exec(
+            select(RecipeClosure.ancestor_id)
+            .where(RecipeClosure.descendant_id.in_(recipe_ids))
+            .distinct()
+        ).all()
+    )
+
+
+def recipes_using_ingredient(ingredient_id: uuid.UUID):
+    """
+    (recipe_id, direct) for every recipe that needs an ingredient.
+
+    The recipes linking it come from ix_recipeingredientlink_ingredient_id, every
+    recipe including one of those from the closure table, so neither side scans.
+    """
+    linking_recipe_ids = select(RecipeIngredientLink.recipe_id).where(
+        RecipeIngredientLink.ingredient_id == ingredient_id
+    )
+    usages = union_all(
+        select(
+            RecipeIngredientLink.recipe_id.label("recipe_id"),
+            literal(True).label("direct"),
+        ).where(RecipeIngredientLink.ingredient_id == ingredient_id),
+        select(
+            RecipeClosure.ancestor_id.label("recipe_id"),
+            literal(False).label("direct"),
+        ).where(RecipeClosure.descendant_id.in_(linking_recipe_ids)),
+    ).subquery("usages")
+    return select(
+        usages.c.recipe_id, func.bool_or(usages.c.direct).label("direct")
+    ).group_by(usages.c.recipe_id)
+
+
+def recipes_using_recipe(recipe_id: uuid.UUID):
+    """(recipe_id, direct) for every recipe that includes a recipe, at any depth."""
+    return (
+        select(
+            RecipeClosure.ancestor_id.label("recipe_id"),
+            RecipeSubRecipeLink.parent_recipe_id.is_not(None).label("direct"),
+        )
+        .outerjoin(
+            RecipeSubRecipeLink,
+            and_(
+                RecipeSubRecipeLink.parent_recipe_id == RecipeClosure.ancestor_id,
+                RecipeSubRecipeLink.sub_recipe_id == recipe_id,
+            ),
+        )
+        .where(RecipeClosure.descendant_id == recipe_id)
+    )
+
+
+def select_recipe_usages(usages, visible_clause=None):
+    """Join recipes_using_* results to the recipe columns of RecipeUsagePublic."""
+    usages = usages.subquery("usages")
+    statement = select(
+        Recipe.id,
+        Recipe.title,
+        Recipe.image,
+        Recipe.is_hidden,
+        Recipe.created_at,
+        usages.c.direct,
+    ).join(usages, usages.c.recipe_id == Recipe.id)
+    if visible_clause is not None:
+        statement = statement.where(visible_clause)
+    return statement
@@ -0,0 +1,172 @@
+"""
+In-memory indexes over every recipe, kept in step with the database.
+
+Each worker keeps its own copy. Before it is used, sync reads max(updated_at) of
+recipe, which refresh_recipe_nutrition moves on every write, and the newest
+recipe_deletion row, which delete_recipe adds through record_recipe_deletion.
+Both are single index lookups. When only updated_at moved, recipes updated since
+the last sync are reloaded; a new deletion rebuilds the index. It is also rebuilt
+every REBUILD_INTERVAL, so a write that committed with an older timestamp than
+one already seen is picked up eventually.
+
+Indexes are immutable snapshots: syncing builds a new one and swaps it in, so a
+request keeps scoring the snapshot it started with.
+"""
+
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Any, Generic, Self, TypeVar
+
+import numpy as np
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from app.models import Recipe, RecipeDeletion, RecipeNutrition
+from app.recipe_visibility import RecipeVisibility
+
+REBUILD_INTERVAL = timedelta(minutes=10)
+# updated_at is stamped before commit, so each sync rereads this much history.
+SYNC_OVERLAP = timedelta(seconds=30)
+# Only the newest deletion is compared; older rows are kept this long.
+DELETION_RETENTION = timedelta(days=1)
+
+
+def record_recipe_deletion(session: Session, recipe_id: uuid.UUID) -> None:
+    """Call when deleting a recipe, so every index drops it on its next sync."""
+    deleted_at = datetime.now(timezone.utc)
+    session.exec(
+        delete(RecipeDeletion).where(
+            RecipeDeletion.deleted_at < deleted_at - DELETION_RETENTION
+        )
+    )
+    session.add(RecipeDeletion(recipe_id=recipe_id, deleted_at=deleted_at))
+
+
+@dataclass(frozen=True)
+class RecipeIndexSnapshot(ABC):
+    """Row numbering and visibility columns shared by every recipe index."""
+
+    recipe_ids: list[uuid.UUID] = field(default_factory=list)
+    recipe_rows: dict[uuid.UUID, int] = field(default_factory=dict)
+    owner_codes: dict[uuid.UUID, int] = field(default_factory=dict)
+    is_hidden: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))
+    owners: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    @abstractmethod
+    def with_recipes(self, rows: Sequence[Any]) -> Self:
+        """A copy with these recipes added or replaced."""
+
+    def _recipe_fields(self, rows: Sequence[Any]) -> tuple[dict[str, Any], list[int]]:
+        """
+        Base fields for a copy with these recipes added or replaced.
+
+        Returns the fields and the row number of each recipe in rows, in order.
+        Rows that already existed keep their number.
+        """
+        recipe_ids = list(self.recipe_ids)
+        recipe_rows = dict(self.recipe_rows)
+        owner_codes = dict(self.owner_codes)
+        changed_rows = []
+        for row in rows:
+            index = recipe_rows.setdefault(row.id, len(recipe_ids))
+            if index == len(recipe_ids):
+                recipe_ids.append(row.id)
+            changed_rows.append(index)
+
+        old_rows = len(self.recipe_ids)
+        is_hidden = np.zeros(len(recipe_ids), dtype=bool)
+        is_hidden[:old_rows] = self.is_hidden
+        owners = np.zeros(len(recipe_ids), dtype=np.int64)
+        owners[:old_rows] = self.owners
+        for index, row in zip(changed_rows, rows):
+            is_hidden[index] = row.is_hidden
+            owners[index] = owner_codes.setdefault(row.owner_id, len(owner_codes))
+        fields = {
+            "recipe_ids": recipe_ids,
+            "recipe_rows": recipe_rows,
+            "owner_codes": owner_codes,
+            "is_hidden": is_hidden,
+            "owners": owners,
+        }
+        return fields, changed_rows
+
+    def visible_mask(self, visibility: RecipeVisibility) -> np.ndarray:
+        """RecipeVisibility.clause as a boolean mask over the rows."""
+        if visibility.sees_all_hidden:
+            return np.ones(len(self.recipe_ids), dtype=bool)
+        visible = ~self.is_hidden
+        owner_code = self.owner_codes.get(visibility.user_id)
+        if owner_code is not None:
+            visible |= self.owners == owner_code
+        viewer_rows = [
+            self.recipe_rows[recipe_id]
+            for recipe_id in visibility.viewer_recipe_ids
+            if recipe_id in self.recipe_rows
+        ]
+        visible[viewer_rows] = True
+        return visible
+
+
+S = TypeVar("S", bound=RecipeIndexSnapshot)
+
+
+class RecipeIndex(Generic[S]):
+    """
+    The per-process copy of one index, brought up to date by sync.
+
+    columns are the RecipeNutrition columns the snapshot needs; they are None
+    for recipes without a stored nutrition row yet.
+    """
+
+    def __init__(self, empty: Callable[[], S], columns: Sequence[Any]) -> None:
+        self._empty = empty
+        self._columns = columns
+        self._lock = Lock()
+        self._snapshot = empty()
+        self._version: tuple[Any, Any] | None = None
+        self._built_at = float("-inf")
+
+    def _rows(self, session: Session, where: Iterable[Any] = ()) -> list[Any]:
+        return session.exec(
+            select(Recipe.id, Recipe.is_hidden, Recipe.owner_id, *self._columns)
+            .outerjoin(RecipeNutrition, RecipeNutrition.recipe_id == Recipe.id)
+            .where(*where)
+        ).all()
+
+    def sync(self, session: Session) -> S:
+        version = tuple(
+            session.exec(
+                select(
+                    select(func.max(Recipe.updated_at)).scalar_subquery(),
+                    select(func.max(RecipeDeletion.deleted_at)).scalar_subquery(),
+                )
+            ).one()
+        )
+        with self._lock:
+            expired = (
+                time.monotonic() - self._built_at > REBUILD_INTERVAL.total_seconds()
+            )
+            if version == self._version and not expired:
+                return self._snapshot
+
+            if (
+                expired
+                or self._version is None
+                or self._version[0] is None
+                or version[1] != self._version[1]
+            ):
+                snapshot = self._empty().with_recipes(self._rows(session))
+                self._built_at = time.monotonic()
+            else:
+                since = self._version[0] - SYNC_OVERLAP
+                snapshot = self._snapshot.with_recipes(
+                    self._rows(session, [Recipe.updated_at >= since])
+                )
+            self._snapshot = snapshot
+            self._version = version
+            return snapshot
@@ -0,0 +1,516 @@
+import uuid
+from collections.abc import Callable, Hashable, Iterable, Mapping, Sequence
+from datetime import datetime, timezone
+from itertools import batched
+
+import numpy as np
+from sqlalchemy import Float, Uuid, cast, null, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.cache import LRUCache
+from app.models import (
+    RECIPE_MACRO_FIELDS,
+    Ingredient,
+    Recipe,
+    RecipeClosure,
+    RecipeIngredientLink,
+    RecipeIngredientSourcePublic,
+    RecipeIngredientTotalPublic,
+    RecipeNutrition,
+    RecipeSubRecipeLink,
+)
+from app.nutrition_engine import (
+    TOTAL_COLUMNS,
+    calculate_nutrition_rows,
+    calculate_totals_matrix,
+    derive_nutrition_fields,
+)
+from app.recipe_bom import (
+    BomLine,
+    IngredientLine,
+    RecipeBom,
+    RecipeNode,
+    normalize_amount,
+)
+from app.recipe_cards import upsert_recipe_cards
+from app.recipe_graph import get_ancestor_recipe_ids
+
+_bom_cache: LRUCache[list[BomLine]] = LRUCache(maxsize=512)
+# Recipes per UPDATE/INSERT statement when refreshing stored nutrition.
+REFRESH_BATCH_SIZE = 1000
+
+
+def _to_grams(amount: float, unit: str, ingredient: Ingredient) -> float:
+    if unit == "pcs":
+        return amount * ingredient.weight_per_piece
+    # Keep a 1:1 conversion for g/ml in current nutrition model.
+    return amount
+
+
+def _add_ingredient_total(
+    totals: dict[tuple[uuid.UUID, str], RecipeIngredientTotalPublic],
+    source_totals: dict[
+        tuple[uuid.UUID, str], dict[uuid.UUID, RecipeIngredientSourcePublic]
+    ],
+    ingredient: Ingredient,
+    amount: float,
+    consumed_amount: float | None,
+    unit: str,
+    source_recipe: Recipe,
+    is_main_recipe: bool,
+) -> None:
+    normalized_amount, normalized_unit = normalize_amount(amount, unit)
+    effective_consumed_amount = amount if consumed_amount is None else consumed_amount
+    normalized_consumed_amount, _ = normalize_amount(effective_consumed_amount, unit)
+    grams_contribution = _to_grams(
+        normalized_consumed_amount, normalized_unit, ingredient
+    )
+    calories_contribution = (ingredient.calories * grams_contribution) / 100
+    carbohydrates_contribution = (ingredient.carbohydrates * grams_contribution) / 100
+    fat_contribution = (ingredient.fat * grams_contribution) / 100
+    protein_contribution = (ingredient.protein * grams_contribution) / 100
+
+    key = (ingredient.id, normalized_unit)
+    existing = totals.get(key)
+    if existing:
+        existing.amount += normalized_amount
+        existing.consumed_amount += normalized_consumed_amount
+        existing.grams += grams_contribution
+        existing.calories += calories_contribution
+        existing.carbohydrates += carbohydrates_contribution
+        existing.fat += fat_contribution
+        existing.protein += protein_contribution
+    else:
+        totals[key] = RecipeIngredientTotalPublic(
+            ingredient_id=ingredient.id,
+            title=ingredient.title,
+            amount=normalized_amount,
+            consumed_amount=normalized_consumed_amount,
+            unit=normalized_unit,
+            grams=grams_contribution,
+            calories=calories_contribution,
+            carbohydrates=carbohydrates_contribution,
+            fat=fat_contribution,
+            protein=protein_contribution,
+            sources=[],
+        )
+
+    per_ingredient_sources = source_totals.setdefault(key, {})
+    existing_source = per_ingredient_sources.get(source_recipe.id)
+    if existing_source:
+        existing_source.amount += normalized_amount
+        existing_source.consumed_amount += normalized_consumed_amount
+        return
+
+    per_ingredient_sources[source_recipe.id] = RecipeIngredientSourcePublic(
+        recipe_id=source_recipe.id,
+        recipe_title=source_recipe.title,
+        amount=normalized_amount,
+        consumed_amount=normalized_consumed_amount,
+        unit=normalized_unit,
+        is_main_recipe=is_main_recipe,
+    )
+
+
+def load_recipe_graph(
+    session: Session, recipe_ids: Iterable[uuid.UUID]
+) -> dict[uuid.UUID, RecipeNode]:
+    """
+    Load the roots and every recipe below them, each exactly once, in one query.
+
+    The closure table names the descendants, so the query touches each recipe's
+    ingredient and sub-recipe links once no matter how many paths lead to it.
+    """
+    root_ids = set(recipe_ids)
+    if not root_ids:
+        return {}
+
+    reachable = (
+        select(Recipe.id.label("recipe_id"))
+        .where(Recipe.id.in_(root_ids))
+        .union(
+            select(RecipeClosure.descendant_id).where(
+                RecipeClosure.ancestor_id.in_(root_ids)
+            )
+        )
+        .cte("reachable_recipes")
+    )
+    ingredient_rows = (
+        select(
+            Recipe.id.label("recipe_id"),
+            Recipe.title.label("recipe_title"),
+            cast(null(), Uuid).label("sub_recipe_id"),
+            cast(null(), Float).label("scale_factor"),
+            RecipeIngredientLink.amount,
+            RecipeIngredientLink.consumed_amount,
+            RecipeIngredientLink.unit,
+            Ingredient.id.label("ingredient_id"),
+            Ingredient.title.label("ingredient_title"),
+            Ingredient.calories,
+            Ingredient.carbohydrates,
+            Ingredient.fat,
+            Ingredient.protein,
+            Ingredient.weight_per_piece,
+        )
+        .join(reachable, reachable.c.recipe_id == Recipe.id)
+        .outerjoin(RecipeIngredientLink, RecipeIngredientLink.recipe_id == Recipe.id)
+        .outerjoin(Ingredient, Ingredient.id == RecipeIngredientLink.ingredient_id)
+    )
+    sub_recipe_rows = select(
+        RecipeSubRecipeLink.parent_recipe_id,
+        null(),
+        RecipeSubRecipeLink.sub_recipe_id,
+        RecipeSubRecipeLink.scale_factor,
+        *(null() for _ in range(10)),
+    ).join(reachable, reachable.c.recipe_id == RecipeSubRecipeLink.parent_recipe_id)
+
+    recipes: dict[uuid.UUID, RecipeNode] = {}
+    sub_recipe_links = []
+    for row in session.exec(ingredient_rows.union_all(sub_recipe_rows)).all():
+        if row.sub_recipe_id is not None:
+            sub_recipe_links.append(row)
+            continue
+        node = recipes.get(row.recipe_id)
+        if node is None:
+            node = recipes[row.recipe_id] = RecipeNode(
+                id=row.recipe_id, title=row.recipe_title
+            )
+        if row.ingredient_id is not None:
+            node.ingredients.append(
+                IngredientLine(
+                    ingredient_id=row.ingredient_id,
+                    ingredient_title=row.ingredient_title,
+                    calories=row.calories,
+                    carbohydrates=row.carbohydrates,
+                    fat=row.fat,
+                    protein=row.protein,
+                    weight_per_piece=row.weight_per_piece,
+                    amount=row.amount,
+                    consumed_amount=row.consumed_amount,
+                    unit=row.unit,
+                )
+            )
+    for link in sub_recipe_links:
+        recipes[link.recipe_id].sub_recipes.append(
+            (link.sub_recipe_id, link.scale_factor)
+        )
+    return recipes
+
+
+def load_recipe_dag(session: Session, recipe_ids: Iterable[uuid.UUID]) -> list[BomLine]:
+    """
+    Flatten the sub-recipe DAGs of many root recipes into bill-of-materials lines.
+
+    Every root gets one line per (source recipe, ingredient, unit) with amounts
+    already scaled along all paths to that source. A root without any ingredients
+    still yields one line with null ingredient fields.
+    """
+    recipe_ids = list(recipe_ids)
+    return RecipeBom(load_recipe_graph(session, recipe_ids)).lines(recipe_ids)
+
+
+def _finalize_totals(
+    totals: dict[tuple[uuid.UUID, str], RecipeIngredientTotalPublic],
+    source_totals: dict[
+        tuple[uuid.UUID, str], dict[uuid.UUID, RecipeIngredientSourcePublic]
+    ],
+) -> list[RecipeIngredientTotalPublic]:
+    result: list[RecipeIngredientTotalPublic] = []
+    for key, item in totals.items():
+        sources = list(source_totals.get(key, {}).values())
+        for source in sources:
+            source.amount = round(source.amount, 2)
+            source.consumed_amount = round(source.consumed_amount, 2)
+        sources.sort(
+            key=lambda source: (not source.is_main_recipe, source.recipe_title.lower())
+        )
+        item.sources = sources
+        item.amount = round(item.amount, 2)
+        item.consumed_amount = round(item.consumed_amount, 2)
+        item.grams = round(item.grams, 2)
+        item.calories = round(item.calories, 2)
+        item.carbohydrates = round(item.carbohydrates, 2)
+        item.fat = round(item.fat, 2)
+        item.protein = round(item.protein, 2)
+        result.append(item)
+
+    result.sort(
+        key=lambda item: (not item.has_overlap, item.title.lower(), item.unit.lower())
+    )
+    return result
+
+
+def _aggregate_lines(
+    lines: Iterable[BomLine],
+    *,
+    group: Callable[[BomLine], Hashable],
+    factor: Callable[[BomLine], float],
+    is_main_recipe: Callable[[BomLine], bool],
+) -> dict[Hashable, list[RecipeIngredientTotalPublic]]:
+    totals: dict[
+        Hashable, dict[tuple[uuid.UUID, str], RecipeIngredientTotalPublic]
+    ] = {}
+    source_totals: dict[
+        Hashable,
+        dict[tuple[uuid.UUID, str], dict[uuid.UUID, RecipeIngredientSourcePublic]],
+    ] = {}
+    ingredients: dict[uuid.UUID, Ingredient] = {}
+    source_recipes: dict[uuid.UUID, Recipe] = {}
+
+    for row in lines:
+        root_totals = totals.setdefault(group(row), {})
+        root_source_totals = source_totals.setdefault(group(row), {})
+        if row.ingredient_id is None:
+            continue
+
+        ingredient = ingredients.get(row.ingredient_id)
+        if ingredient is None:
+            ingredient = ingredients[row.ingredient_id] = Ingredient(
+                id=row.ingredient_id,
+                title=row.ingredient_title,
+                calories=row.calories,
+                carbohydrates=row.carbohydrates,
+                fat=row.fat,
+                protein=row.protein,
+                weight_per_piece=row.weight_per_piece,
+            )
+        source_recipe = source_recipes.get(row.recipe_id)
+        if source_recipe is None:
+            source_recipe = source_recipes[row.recipe_id] = Recipe(
+                id=row.recipe_id, title=row.recipe_title
+            )
+
+        _add_ingredient_total(
+            root_totals,
+            root_source_totals,
+            ingredient,
+            row.amount * row.scale * factor(row),
+            (
+                row.consumed_amount * row.scale * factor(row)
+                if row.consumed_amount is not None
+                else None
+            ),
+            row.unit,
+            source_recipe=source_recipe,
+            is_main_recipe=is_main_recipe(row),
+        )
+
+    return {
+        key: _finalize_totals(group_totals, source_totals[key])
+        for key, group_totals in totals.items()
+    }
+
+
+def aggregate_total_ingredients(
+    lines: Iterable[BomLine], factor: float = 1.0
+) -> dict[uuid.UUID, list[RecipeIngredientTotalPublic]]:
+    """Aggregate bill-of-materials lines into per-root totals, scaled by factor."""
+    return _aggregate_lines(
+        lines,
+        group=lambda row: row.root_id,
+        factor=lambda row: factor,
+        is_main_recipe=lambda row: row.recipe_id == row.root_id,
+    )
+
+
+def merge_total_ingredients(
+    lines: Iterable[BomLine], factors: Mapping[uuid.UUID, float]
+) -> list[RecipeIngredientTotalPublic]:
+    """
+    Merge the lines of several roots into one list, scaling each root by its factor.
+
+    Ingredients still merge per (ingredient, normalized unit), and every requested
+    root counts as a main recipe in the sources.
+    """
+    merged = _aggregate_lines(
+        lines,
+        group=lambda row: None,
+        factor=lambda row: factors[row.root_id],
+        is_main_recipe=lambda row: row.recipe_id in factors,
+    )
+    return merged.get(None, [])
+
+
+def calculate_total_ingredients(
+    session: Session, recipe_ids: Iterable[uuid.UUID]
+) -> dict[uuid.UUID, list[RecipeIngredientTotalPublic]]:
+    """Calculate aggregated totals for many recipes from a single graph query."""
+    return aggregate_total_ingredients(load_recipe_dag(session, recipe_ids))
+
+
+def load_recipe_bom(session: Session, recipe: Recipe) -> list[BomLine]:
+    """
+    The flattened bill of materials of one recipe, cached per recipe version.
+
+    Every change that affects a recipe's totals moves its updated_at (see
+    refresh_recipe_nutrition), so (id, updated_at) never serves stale lines.
+    The lines are unscaled and unrounded, so any scale factor can reuse them.
+    """
+    key = (recipe.id, recipe.updated_at)
+    lines = _bom_cache.get(key)
+    if lines is None:
+        lines = load_recipe_dag(session, [recipe.id])
+        _bom_cache.put(key, lines)
+    return lines
+
+
+def get_recipe_ids_using_ingredient(
+    session: Session, ingredient_id: uuid.UUID
+) -> set[uuid.UUID]:
+    return set(
+        session.exec(
+            select(RecipeIngredientLink.recipe_id).where(
+                RecipeIngredientLink.ingredient_id == ingredient_id
+            )
+        ).all()
+    )
+
+
+def refresh_recipe_nutrition(session: Session, recipe_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Recompute the stored totals and cards of the given recipes and every recipe
+    including them, and bump their updated_at.
+
+    Call this inside the write transaction after a recipe, its links, a sub-recipe
+    or an ingredient changed. Recipes that no longer exist are skipped. The
+    numbers come from the vectorised engine in app.nutrition_engine, and rows are
+    written REFRESH_BATCH_SIZE recipes per statement.
+    """
+    changed_ids = set(recipe_ids)
+    if not changed_ids:
+        return
+
+    session.flush()
+    affected_ids = changed_ids | get_ancestor_recipe_ids(session, changed_ids)
+    lines = load_recipe_dag(session, affected_ids)
+    ingredient_ids_by_recipe: dict[uuid.UUID, set[uuid.UUID]] = {}
+    for line in lines:
+        ingredient_ids = ingredient_ids_by_recipe.setdefault(line.root_id, set())
+        if line.ingredient_id is not None:
+            ingredient_ids.add(line.ingredient_id)
+    if not ingredient_ids_by_recipe:
+        return
+    order, totals, breakdowns = calculate_nutrition_rows(
+        lines, ingredient_ids_by_recipe
+    )
+
+    updated_at = datetime.now(timezone.utc)
+    # Totals are part of every affected recipe's representation, so move its version.
+    servings_by_recipe: dict[uuid.UUID, int] = {}
+    for batch in batched(order, REFRESH_BATCH_SIZE):
+        servings_by_recipe.update(
+            session.exec(
+                update(Recipe)
+                .where(Recipe.id.in_(batch))
+                .values(updated_at=updated_at)
+                .returning(Recipe.id, Recipe.servings)
+                .execution_options(synchronize_session=False)
+            ).all()
+        )
+    derived = {
+        field: values.tolist()
+        for field, values in derive_nutrition_fields(
+            totals, [servings_by_recipe[recipe_id] for recipe_id in order]
+        ).items()
+    }
+    rows = [
+        {
+            "recipe_id": recipe_id,
+            "total_ingredients": breakdown,
+            **dict(zip(TOTAL_COLUMNS, recipe_totals)),
+            **{field: derived[field][index] for field in RECIPE_MACRO_FIELDS},
+            "ingredient_ids": sorted(ingredient_ids_by_recipe[recipe_id]),
+            "updated_at": updated_at,
+        }
+        for index, (recipe_id, recipe_totals, breakdown) in enumerate(
+            zip(order, totals.tolist(), breakdowns)
+        )
+    ]
+    for batch in batched(rows, REFRESH_BATCH_SIZE):
+        statement = insert(RecipeNutrition).values(batch)
+        session.exec(
+            statement.on_conflict_do_update(
+                index_elements=["recipe_id"],
+                set_={
+                    column: statement.excluded[column]
+                    for column in batch[0]
+                    if column != "recipe_id"
+                },
+            )
+        )
+        upsert_recipe_cards(
+            session,
+            {
+                row["recipe_id"]: {
+                    "calories_per_serving": row["calories_per_serving"],
+                    "protein_per_serving": row["protein_per_serving"],
+                }
+                for row in batch
+            },
+        )
+
+
+def load_total_ingredients(
+    session: Session, recipes: Sequence[Recipe]
+) -> dict[uuid.UUID, list[RecipeIngredientTotalPublic]]:
+    """
+    Read stored totals for the given recipes in one query.
+
+    Recipes without a stored row (for example ones created before totals were
+    persisted) are calculated on the fly; run `app-cli refresh-nutrition` to
+    backfill them.
+    """
+    if not recipes:
+        return {}
+
+    stored_rows = session.exec(
+        select(RecipeNutrition).where(
+            RecipeNutrition.recipe_id.in_([recipe.id for recipe in recipes])
+        )
+    ).all()
+    totals_by_recipe = {
+        row.recipe_id: [
+            RecipeIngredientTotalPublic.model_validate(item)
+            for item in row.total_ingredients
+        ]
+        for row in stored_rows
+    }
+
+    missing_ids = [recipe.id for recipe in recipes if recipe.id not in totals_by_recipe]
+    if missing_ids:
+        totals_by_recipe.update(calculate_total_ingredients(session, missing_ids))
+
+    return totals_by_recipe
+
+
+def load_nutrition_totals(
+    session: Session, recipe_ids: Sequence[uuid.UUID]
+) -> np.ndarray:
+    """
+    Read stored recipe-level totals without their per-ingredient breakdown.
+
+    Returns one row of nutrition_engine.TOTAL_COLUMNS per recipe id, in the given
+    order. Recipes without a stored row are calculated on the fly.
+    """
+    totals = np.zeros((len(recipe_ids), len(TOTAL_COLUMNS)))
+    if not recipe_ids:
+        return totals
+
+    rows = session.exec(
+        select(
+            RecipeNutrition.recipe_id,
+            *(getattr(RecipeNutrition, column) for column in TOTAL_COLUMNS),
+        ).where(RecipeNutrition.recipe_id.in_(recipe_ids))
+    ).all()
+    stored = {row[0]: row[1:] for row in rows}
+    missing_ids = [recipe_id for recipe_id in recipe_ids if recipe_id not in stored]
+    if missing_ids:
+        calculated_ids, calculated = calculate_totals_matrix(
+            load_recipe_dag(session, missing_ids), missing_ids
+        )
+        stored.update(zip(calculated_ids, calculated))
+
+    for index, recipe_id in enumerate(recipe_ids):
+        totals[index] = stored[recipe_id]
+    return totals
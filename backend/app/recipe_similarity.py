@@ -0,0 +1,176 @@
+"""
+Recipes that resemble each other in what goes into them and in their macros.
+
+Each recipe gets two unit vectors: its grams per ingredient, taken from the
+flattened totals in recipe_nutrition (sub-recipes included), and its
+carbohydrate/fat/protein profile. Similarity is a weighted sum of the two
+cosines. app.recipe_index keeps the vectors in step with the database.
+
+A dense recipes x ingredients matrix would be mostly zeros, so ingredient
+vectors are stored column-major (CSC): one query reads only the columns of the
+ingredients its recipe uses and sums them with a single bincount.
+"""
+
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from app.models import RecipeNutrition
+from app.recipe_index import RecipeIndex, RecipeIndexSnapshot
+from app.recipe_visibility import RecipeVisibility
+
+INGREDIENT_WEIGHT = 0.75
+MACRO_WEIGHT = 1 - INGREDIENT_WEIGHT
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+@dataclass(frozen=True)
+class SimilaritySnapshot(RecipeIndexSnapshot):
+    # Keyed by the ingredient id string stored in total_ingredients.
+    ingredient_columns: dict[str, int] = field(default_factory=dict)
+    # Nonzero entries of the row-normalized grams matrix, sorted by column.
+    entry_rows: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    entry_columns: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    entry_weights: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    # column_starts[c]:column_starts[c + 1] slices the entries of column c.
+    column_starts: np.ndarray = field(
+        default_factory=lambda: np.zeros(1, dtype=np.int64)
+    )
+    macro_profiles: np.ndarray = field(default_factory=lambda: np.zeros((0, 3)))
+
+    def with_recipes(self, rows: Sequence[Any]) -> "SimilaritySnapshot":
+        """
+        rows carry id, is_hidden, owner_id, total_ingredients and the total
+        carbohydrates, fat and protein.
+        """
+        fields, changed_rows = self._recipe_fields(rows)
+        ingredient_columns = dict(self.ingredient_columns)
+        keep = ~np.isin(self.entry_rows, changed_rows)
+        new_rows = []
+        new_columns = []
+        new_grams = []
+        for index, row in zip(changed_rows, rows):
+            grams: dict[int, float] = {}
+            # One entry per ingredient, whatever units it was listed in.
+            for item in row.total_ingredients or ():
+                column = ingredient_columns.setdefault(
+                    item["ingredient_id"], len(ingredient_columns)
+                )
+                grams[column] = grams.get(column, 0) + item["grams"]
+            new_rows.extend([index] * len(grams))
+            new_columns.extend(grams)
+            new_grams.extend(grams.values())
+        new_rows = np.array(new_rows, dtype=np.int64)
+        new_grams = np.array(new_grams, dtype=np.float64)
+        norms = np.sqrt(
+            np.bincount(
+                new_rows, weights=new_grams**2, minlength=len(fields["recipe_ids"])
+            )
+        )
+        new_weights = np.divide(
+            new_grams,
+            norms[new_rows],
+            out=np.zeros_like(new_grams),
+            where=norms[new_rows] > 0,
+        )
+
+        macro_profiles = np.zeros((len(fields["recipe_ids"]), 3))
+        macro_profiles[: len(self.macro_profiles)] = self.macro_profiles
+        macro_profiles[changed_rows] = _unit_rows(
+            np.array(
+                [
+                    (
+                        row.total_carbohydrates or 0,
+                        row.total_fat or 0,
+                        row.total_protein or 0,
+                    )
+                    for row in rows
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 3)
+        )
+
+        entry_rows = np.concatenate([self.entry_rows[keep], new_rows])
+        entry_columns = np.concatenate(
+            [self.entry_columns[keep], np.array(new_columns, dtype=np.int64)]
+        )
+        entry_weights = np.concatenate([self.entry_weights[keep], new_weights])
+        order = np.argsort(entry_columns, kind="stable")
+        column_starts = np.zeros(len(ingredient_columns) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(entry_columns, minlength=len(ingredient_columns)),
+            out=column_starts[1:],
+        )
+        return SimilaritySnapshot(
+            **fields,
+            ingredient_columns=ingredient_columns,
+            entry_rows=entry_rows[order],
+            entry_columns=entry_columns[order],
+            entry_weights=entry_weights[order],
+            column_starts=column_starts,
+            macro_profiles=macro_profiles,
+        )
+
+    def similar(
+        self, recipe_id: uuid.UUID, visibility: RecipeVisibility, limit: int = 10
+    ) -> list[tuple[uuid.UUID, float]]:
+        """The most similar visible recipes with their scores, best first."""
+        source = self.recipe_rows.get(recipe_id)
+        if source is None:
+            return []
+        source_entries = np.flatnonzero(self.entry_rows == source)
+        if not len(source_entries):
+            return []
+
+        # Cosine of unit vectors is their dot product; only the source's
+        # columns can contribute to it.
+        slices = [
+            np.arange(self.column_starts[column], self.column_starts[column + 1])
+            for column in self.entry_columns[source_entries].tolist()
+        ]
+        entries = np.concatenate(slices)
+        source_weights = np.repeat(
+            self.entry_weights[source_entries], [len(part) for part in slices]
+        )
+        ingredient_scores = np.bincount(
+            self.entry_rows[entries],
+            weights=self.entry_weights[entries] * source_weights,
+            minlength=len(self.recipe_ids),
+        )
+        macro_scores = self.macro_profiles @ self.macro_profiles[source]
+        scores = INGREDIENT_WEIGHT * ingredient_scores + MACRO_WEIGHT * macro_scores
+
+        has_ingredients = np.zeros(len(self.recipe_ids), dtype=bool)
+        has_ingredients[self.entry_rows] = True
+        candidates = self.visible_mask(visibility) & has_ingredients
+        candidates[source] = False
+        candidates = np.flatnonzero(candidates)
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        # Best score first; row order breaks ties.
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [
+            (self.recipe_ids[index], float(scores[index]))
+            for index in candidates.tolist()
+        ]
+
+
+similarity_index = RecipeIndex(
+    SimilaritySnapshot,
+    [
+        RecipeNutrition.total_ingredients,
+        RecipeNutrition.total_carbohydrates,
+        RecipeNutrition.total_fat,
+        RecipeNutrition.total_protein,
+    ],
+)
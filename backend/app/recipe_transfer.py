@@ -0,0 +1,316 @@
+"""
+Bulk export and import of recipes as NDJSON, one RecipeExport per line.
+
+Export streams rows from a server-side cursor, so memory stays flat however many
+recipes there are. Recipes come out with their sub-recipes first, which is the
+order the import needs.
+
+Import works in chunks of lines. Each chunk resolves its ingredients and
+sub-recipes with a few batched queries, inserts recipes and links with one
+statement per table and commits, so a failure costs at most one chunk and no
+single transaction holds locks for the whole file.
+"""
+
+import uuid
+from collections.abc import AsyncIterator, Iterable, Iterator
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlmodel import Session, select
+
+from app.models import (
+    Ingredient,
+    Recipe,
+    RecipeClosure,
+    RecipeExport,
+    RecipeImportError,
+    RecipeImportResult,
+    RecipeIngredientLink,
+    RecipeSubRecipeLink,
+)
+from app.recipe_graph import add_sub_recipe_edge
+from app.recipe_nutrition import refresh_recipe_nutrition
+
+EXPORT_BATCH_SIZE = 500
+IMPORT_CHUNK_SIZE = 500
+# Longer lines are rejected instead of buffered without bound.
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+MAX_IMPORT_ERRORS = 100
+
+
+class ImportLineTooLongError(Exception):
+    pass
+
+
+def _empty_json_array():
+    return literal_column("'[]'::json")
+
+
+def export_statement(visible_clause=None):
+    """Recipes with their ingredient and sub-recipe lines aggregated per row."""
+    ingredients = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "ingredient_title",
+                            Ingredient.title,
+                            "barcode",
+                            Ingredient.barcode,
+                            "amount",
+                            RecipeIngredientLink.amount,
+                            "consumed_amount",
+                            RecipeIngredientLink.consumed_amount,
+                            "unit",
+                            RecipeIngredientLink.unit,
+                        ),
+                        Ingredient.title,
+                    )
+                ),
+                _empty_json_array(),
+            )
+        )
+        .select_from(RecipeIngredientLink)
+        .join(Ingredient, Ingredient.id == RecipeIngredientLink.ingredient_id)
+        .where(RecipeIngredientLink.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+    sub_recipes = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "sub_recipe_id",
+                            RecipeSubRecipeLink.sub_recipe_id,
+                            "scale_factor",
+                            RecipeSubRecipeLink.scale_factor,
+                        ),
+                        RecipeSubRecipeLink.sub_recipe_id,
+                    )
+                ),
+                _empty_json_array(),
+            )
+        )
+        .where(RecipeSubRecipeLink.parent_recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+    # A recipe always has strictly more descendants than any of its sub-recipes,
+    # so ordering by descendant count puts every sub-recipe before its parents.
+    descendant_count = (
+        select(func.count())
+        .where(RecipeClosure.ancestor_id == Recipe.id)
+        .scalar_subquery()
+    )
+    statement = select(
+        Recipe.id,
+        Recipe.title,
+        Recipe.instructions,
+        Recipe.servings,
+        Recipe.image,
+        Recipe.is_hidden,
+        Recipe.created_at,
+        ingredients.label("ingredients"),
+        sub_recipes.label("sub_recipes"),
+    ).order_by(descendant_count, Recipe.created_at, Recipe.id)
+    if visible_clause is not None:
+        statement = statement.where(visible_clause)
+    return statement
+
+
+def iter_recipe_export(session: Session, visible_clause=None) -> Iterator[str]:
+    """NDJSON lines for every visible recipe, fetched in batches from one cursor."""
+    rows = session.exec(
+        export_statement(visible_clause).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for row in rows:
+        yield RecipeExport.model_validate(row._mapping).model_dump_json() + "\n"
+
+
+async def iter_ndjson_chunks(
+    stream: AsyncIterator[bytes], chunk_size: int = IMPORT_CHUNK_SIZE
+) -> AsyncIterator[list[tuple[int, bytes]]]:
+    """Split a byte stream into chunks of (line number, line), skipping blank lines."""
+    buffer = b""
+    line_number = 0
+    chunk: list[tuple[int, bytes]] = []
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_IMPORT_LINE_BYTES:
+            raise ImportLineTooLongError
+        for line in lines:
+            line_number += 1
+            if len(line) > MAX_IMPORT_LINE_BYTES:
+                raise ImportLineTooLongError
+            if line.strip():
+                chunk.append((line_number, line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if buffer.strip():
+        chunk.append((line_number + 1, buffer))
+    if chunk:
+        yield chunk
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+def _resolve_ingredients(
+    session: Session, recipes: Iterable[RecipeExport]
+) -> tuple[dict[str, uuid.UUID], dict[str, uuid.UUID]]:
+    """Ingredient ids by barcode and by title for every line in a chunk."""
+    barcodes: set[str] = set()
+    titles: set[str] = set()
+    for recipe in recipes:
+        for ingredient in recipe.ingredients:
+            if ingredient.barcode:
+                barcodes.add(ingredient.barcode)
+            titles.add(ingredient.ingredient_title)
+
+    by_barcode: dict[str, uuid.UUID] = {}
+    if barcodes:
+        by_barcode = {
+            barcode: ingredient_id
+            for ingredient_id, barcode in session.exec(
+                select(Ingredient.id, Ingredient.barcode).where(
+                    Ingredient.barcode.in_(barcodes)
+                )
+            )
+        }
+    by_title: dict[str, uuid.UUID] = {}
+    if titles:
+        # Titles are not unique; the ix_ingredient_title_id order picks the same
+        # ingredient every time.
+        for ingredient_id, title in session.exec(
+            select(Ingredient.id, Ingredient.title)
+            .where(Ingredient.title.in_(titles))
+            .order_by(Ingredient.title, Ingredient.id)
+        ):
+            by_title.setdefault(title, ingredient_id)
+    return by_barcode, by_title
+
+
+def import_recipe_chunk(
+    session: Session,
+    lines: list[tuple[int, bytes]],
+    owner_id: uuid.UUID,
+    result: RecipeImportResult,
+) -> None:
+    """Insert one chunk of NDJSON lines in a single transaction, updating result."""
+
+    def _fail(line_number: int, detail: str) -> None:
+        result.failed += 1
+        if len(result.errors) < MAX_IMPORT_ERRORS:
+            result.errors.append(RecipeImportError(line=line_number, detail=detail))
+
+    parsed: list[tuple[int, RecipeExport]] = []
+    for line_number, line in lines:
+        try:
+            parsed.append((line_number, RecipeExport.model_validate_json(line)))
+        except ValidationError as exc:
+            _fail(line_number, _validation_detail(exc))
+    if not parsed:
+        return
+
+    referenced_ids = {recipe.id for _, recipe in parsed} | {
+        link.sub_recipe_id for _, recipe in parsed for link in recipe.sub_recipes
+    }
+    existing_ids = set(
+        session.exec(select(Recipe.id).where(Recipe.id.in_(referenced_ids))).all()
+    )
+    by_barcode, by_title = _resolve_ingredients(
+        session, (recipe for _, recipe in parsed)
+    )
+
+    now = datetime.now(timezone.utc)
+    recipe_rows: list[dict] = []
+    ingredient_rows: list[dict] = []
+    sub_recipe_rows: list[dict] = []
+    # Recipes already in the database plus those accepted from earlier lines.
+    known_ids = set(existing_ids)
+    for line_number, recipe in parsed:
+        if recipe.id in known_ids:
+            result.skipped += 1
+            continue
+
+        links: dict[uuid.UUID, dict] = {}
+        error = None
+        for ingredient in recipe.ingredients:
+            ingredient_id = by_barcode.get(ingredient.barcode) or by_title.get(
+                ingredient.ingredient_title
+            )
+            if ingredient_id is None:
+                error = f"Ingredient not found: {ingredient.ingredient_title}"
+                break
+            if ingredient_id in links:
+                error = f"Duplicate ingredient: {ingredient.ingredient_title}"
+                break
+            links[ingredient_id] = {
+                "recipe_id": recipe.id,
+                "ingredient_id": ingredient_id,
+                "amount": ingredient.amount,
+                "consumed_amount": ingredient.consumed_amount,
+                "unit": ingredient.unit,
+            }
+        sub_recipe_ids = [link.sub_recipe_id for link in recipe.sub_recipes]
+        if error is None and len(sub_recipe_ids) != len(set(sub_recipe_ids)):
+            error = "Duplicate sub-recipe"
+        if error is None:
+            # Only earlier recipes may be referenced, which also rules out cycles.
+            missing_ids = [
+                sub_recipe_id
+                for sub_recipe_id in sub_recipe_ids
+                if sub_recipe_id not in known_ids
+            ]
+            if missing_ids:
+                error = f"Sub-recipe not found: {missing_ids[0]}"
+        if error is not None:
+            _fail(line_number, error)
+            continue
+
+        known_ids.add(recipe.id)
+        recipe_rows.append(
+            {
+                "id": recipe.id,
+                "title": recipe.title,
+                "instructions": recipe.instructions,
+                "servings": recipe.servings,
+                "image": recipe.image,
+                "is_hidden": recipe.is_hidden,
+                "owner_id": owner_id,
+                "created_at": recipe.created_at or now,
+                "updated_at": now,
+            }
+        )
+        ingredient_rows.extend(links.values())
+        sub_recipe_rows.extend(
+            {
+                "parent_recipe_id": recipe.id,
+                "sub_recipe_id": link.sub_recipe_id,
+                "scale_factor": link.scale_factor,
+            }
+            for link in recipe.sub_recipes
+        )
+
+    if not recipe_rows:
+        return
+    # Lists of parameters are batched into multi-row INSERTs by SQLAlchemy.
+    session.exec(insert(Recipe), params=recipe_rows)
+    if ingredient_rows:
+        session.exec(insert(RecipeIngredientLink), params=ingredient_rows)
+    if sub_recipe_rows:
+        session.exec(insert(RecipeSubRecipeLink), params=sub_recipe_rows)
+        # In line order, so every sub-recipe's own closure rows are already there.
+        for row in sub_recipe_rows:
+            add_sub_recipe_edge(session, row["parent_recipe_id"], row["sub_recipe_id"])
+    refresh_recipe_nutrition(session, [row["id"] for row in recipe_rows])
+    session.commit()
+    result.created += len(recipe_rows)
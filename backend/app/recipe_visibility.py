@@ -0,0 +1,97 @@
+"""
+Who may see which hidden recipes.
+
+A hidden recipe is visible to its owner, to users listed as its viewers and to
+anyone holding recipes:read_hidden. RecipeVisibility answers those questions for
+one request with attribute checks and set membership: scopes are resolved once,
+and the user's viewer grants come from a cache keyed by
+User.visibility_version, which every viewer-link change bumps.
+"""
+
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+
+from app.cache import LRUCache
+from app.models import Recipe, RecipeCard, RecipeViewerLink, User
+from app.permissions import get_user_effective_scopes
+
+_viewer_grants: LRUCache[frozenset[uuid.UUID]] = LRUCache(maxsize=4096)
+
+
+@dataclass(frozen=True)
+class RecipeVisibility:
+    user_id: uuid.UUID | None = None
+    sees_all_hidden: bool = False
+    # Hidden recipes the user was added to as a viewer.
+    viewer_recipe_ids: frozenset[uuid.UUID] = frozenset()
+
+    def can_view(self, recipe: Recipe) -> bool:
+        return (
+            not recipe.is_hidden
+            or self.sees_all_hidden
+            or recipe.owner_id == self.user_id
+            or recipe.id in self.viewer_recipe_ids
+        )
+
+    def can_see_viewer_ids(self, recipe: Recipe) -> bool:
+        """Viewer lists are shown to the owner and to hidden-recipe moderators."""
+        return self.user_id is not None and (
+            self.sees_all_hidden or recipe.owner_id == self.user_id
+        )
+
+    def clause(self, model: type[Recipe] | type[RecipeCard] = Recipe):
+        """
+        Filter a query down to what the user may see, or None for everything.
+
+        model is Recipe or a projection keyed by recipe id with the same is_hidden
+        and owner_id columns, such as RecipeCard.
+        """
+        if self.sees_all_hidden:
+            return None
+        if self.user_id is None:
+            return ~model.is_hidden
+        conditions = [~model.is_hidden, model.owner_id == self.user_id]
+        if self.viewer_recipe_ids:
+            conditions.append(model.id.in_(self.viewer_recipe_ids))
+        return or_(*conditions)
+
+
+def get_recipe_visibility(session: Session, user: User | None) -> RecipeVisibility:
+    if user is None:
+        return RecipeVisibility()
+    # Scopes come from the user's roles on every request, so role changes apply
+    # immediately and need no invalidation here.
+    if user.is_superuser or "recipes:read_hidden" in get_user_effective_scopes(user):
+        return RecipeVisibility(user_id=user.id, sees_all_hidden=True)
+
+    key = (user.id, user.visibility_version)
+    viewer_recipe_ids = _viewer_grants.get(key)
+    if viewer_recipe_ids is None:
+        viewer_recipe_ids = frozenset(
+            session.exec(
+                select(RecipeViewerLink.recipe_id).where(
+                    RecipeViewerLink.user_id == user.id
+                )
+            ).all()
+        )
+        _viewer_grants.put(key, viewer_recipe_ids)
+    return RecipeVisibility(user_id=user.id, viewer_recipe_ids=viewer_recipe_ids)
+
+
+def invalidate_recipe_visibility(
+    session: Session, user_ids: Iterable[uuid.UUID]
+) -> None:
+    """Call after adding or removing viewer links for these users."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    session.exec(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(visibility_version=User.visibility_version + 1)
+        .execution_options(synchronize_session="fetch")
+    )
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, Response
 from fastapi import HTTPException, Security
 from fastapi.responses import StreamingResponse
-from sqlmodel import select, desc
+from sqlmodel import select
 from app.deps import SessionDep, get_current_user
 from typing import Annotated
 import asyncio
@@ -26,6 +26,12 @@ from app.models import (
     GamePlayerDrinkLinkCreate,
     User,
 )
+from app.pagination import (
+    NEXT_CURSOR_HEADER,
+    InvalidCursorError,
+    paginate,
+    split_page,
+)
 from app.permissions import get_user_effective_scopes
 
 # Store active SSE connections for each game session
@@ -55,19 +61,39 @@ async def broadcast_game_update(game_session_id: str, event_type: str):
 
 router = APIRouter(prefix="/game", tags=["game"])
 
+# Sort key of the game session list, backed by ix_gamesession_created_at_id.
+GAME_SESSION_PAGE_KEY = (GameSession.created_at, GameSession.id)
+
 
 @router.get("/", response_model=list[GameSessionPublic])
-def get_game_sessions(session: SessionDep, skip: int = 0, limit: int = 100):
+def get_game_sessions(
+    session: SessionDep,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+):
     """
-    Retrieve game sessions.
+    Retrieve game sessions, newest first.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
     """
-    statement = (
-        select(GameSession)
-        .order_by(desc(GameSession.created_at))
-        .offset(skip)
-        .limit(limit)
+    try:
+        statement = paginate(
+            select(GameSession),
+            GAME_SESSION_PAGE_KEY,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            descending=True,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    game_sessions, next_cursor = split_page(
+        session.exec(statement).all(), GAME_SESSION_PAGE_KEY, limit
     )
-    game_sessions = session.exec(statement).all()
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
     return game_sessions
 
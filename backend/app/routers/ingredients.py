@@ -1,17 +1,36 @@
-from fastapi import APIRouter
-from fastapi import HTTPException, Security, status
-from sqlalchemy.exc import IntegrityError
-from sqlmodel import select
-from app.deps import SessionDep, get_current_user
+from fastapi import APIRouter, Response
+from fastapi import Header, HTTPException, Query, Security, status
+from psycopg.errors import QueryCanceled
+from sqlalchemy import delete, literal, or_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import func, select
+from app.config import settings
+from app.deps import SessionDep, get_current_user, get_current_user_optional
 
 # from app.models import Recipe, RecipeCreate, RecipePublic
 from app.models import (
     Ingredient,
+    IngredientAutocompletePublic,
     IngredientCreate,
     IngredientPublic,
     OpenFoodFactsProductPublic,
+    Recipe,
     User,
     RecipeIngredientLink,
+    RecipeUsagePublic,
+)
+from app.recipe_nutrition import (
+    get_recipe_ids_using_ingredient,
+    refresh_recipe_nutrition,
+)
+from app.recipe_graph import recipes_using_ingredient, select_recipe_usages
+from app.recipe_visibility import get_recipe_visibility
+from app.etags import etag_matches, make_etag, not_modified
+from app.pagination import (
+    NEXT_CURSOR_HEADER,
+    InvalidCursorError,
+    paginate,
+    split_page,
 )
 from app.openfoodfacts import (
     OpenFoodFactsUnavailableError,
@@ -22,19 +41,125 @@ from app.openfoodfacts import (
 
 router = APIRouter(prefix="/ingredients", tags=["ingredients"])
 
+# Fields that feed into stored recipe totals (titles are shown per ingredient).
+NUTRITION_FIELDS = {
+    "title",
+    "calories",
+    "carbohydrates",
+    "fat",
+    "protein",
+    "weight_per_piece",
+}
+
+# Sort key of the ingredient list, backed by ix_ingredient_title_id.
+INGREDIENT_PAGE_KEY = (Ingredient.title, Ingredient.id)
+
+# Sort key of "where used" lists, the same newest-first order as the recipe list.
+USAGE_PAGE_KEY = (Recipe.created_at, Recipe.id)
+
 
 @router.get("/", response_model=list[IngredientPublic])
-def get_ingredients(session: SessionDep, skip: int = 0, limit: int = 100):
+def get_ingredients(
+    session: SessionDep,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    if_none_match: str | None = Header(default=None),
+):
     """
-    Retrieve ingredients.
+    Retrieve ingredients, ordered by title.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    Send the ETag back in If-None-Match to get 304 Not Modified for unchanged lists.
     """
 
-    statement = select(Ingredient).offset(skip).limit(limit)
-    ingredients = session.exec(statement).all()
+    try:
+        statement = paginate(
+            select(Ingredient),
+            INGREDIENT_PAGE_KEY,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    ingredients, next_cursor = split_page(
+        session.exec(statement).all(), INGREDIENT_PAGE_KEY, limit
+    )
+
+    # The page itself versions the response: edits move updated_at, and inserts
+    # or deletes around it change which ids it holds.
+    etag = make_etag(
+        "ingredients",
+        next_cursor,
+        *((ingredient.id, ingredient.updated_at) for ingredient in ingredients),
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
     return ingredients
 
 
+@router.get("/autocomplete", response_model=list[IngredientAutocompletePublic])
+def autocomplete_ingredients(
+    session: SessionDep,
+    prefix: str = Query(min_length=1, max_length=255),
+    limit: int = Query(default=10, ge=1, le=25),
+):
+    """
+    Suggest ingredients for a partially typed title.
+
+    Titles starting with the prefix come first, then fuzzy word matches (typos,
+    later words) by trigram similarity. Both are served by the trigram index.
+    """
+    prefix = prefix.strip()
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    starts_with = Ingredient.title.ilike(f"{escaped}%", escape="\\")
+    statement = (
+        select(
+            Ingredient.id,
+            Ingredient.title,
+            Ingredient.calories,
+            Ingredient.weight_per_piece,
+        )
+        .where(or_(starts_with, literal(prefix).op("<%")(Ingredient.title)))
+        .order_by(
+            starts_with.desc(),
+            func.word_similarity(prefix, Ingredient.title).desc(),
+            Ingredient.title,
+        )
+        .limit(limit)
+    )
+
+    # Scoped to this request's transaction, so slow lookups fail fast instead of
+    # piling up behind the user's next keystroke.
+    session.exec(
+        select(
+            func.set_config(
+                "statement_timeout",
+                f"{settings.INGREDIENT_AUTOCOMPLETE_TIMEOUT_MS}ms",
+                True,
+            )
+        )
+    )
+    try:
+        rows = session.exec(statement).all()
+    except OperationalError as exc:
+        if not isinstance(exc.orig, QueryCanceled):
+            raise
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ingredient autocomplete timed out",
+        ) from exc
+
+    return [IngredientAutocompletePublic.model_validate(row._mapping) for row in rows]
+
+
 @router.get("/barcode/{barcode}", response_model=OpenFoodFactsProductPublic)
 def get_ingredient_by_barcode(
     session: SessionDep,
@@ -71,7 +196,12 @@ def get_ingredient_by_barcode(
 
 
 @router.get("/{ingredient_id}", response_model=IngredientPublic)
-def get_ingredient(session: SessionDep, ingredient_id: str):
+def get_ingredient(
+    session: SessionDep,
+    response: Response,
+    ingredient_id: str,
+    if_none_match: str | None = Header(default=None),
+):
     """
     Retrieve a ingredient.
     """
@@ -86,9 +216,54 @@ def get_ingredient(session: SessionDep, ingredient_id: str):
     if not ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
 
+    etag = make_etag("ingredient", ingredient.id, ingredient.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
     return ingredient
 
 
+@router.get("/{ingredient_id}/used-in", response_model=list[RecipeUsagePublic])
+def get_ingredient_used_in(
+    session: SessionDep,
+    response: Response,
+    ingredient_id: str,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = None,
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Recipes that use an ingredient, directly or through a sub-recipe, newest first.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    try:
+        ingredient = session.get(Ingredient, ingredient_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid UUID")
+    if not ingredient:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+
+    visible_clause = get_recipe_visibility(session, current_user).clause()
+    try:
+        statement = paginate(
+            select_recipe_usages(
+                recipes_using_ingredient(ingredient.id), visible_clause
+            ),
+            USAGE_PAGE_KEY,
+            cursor=cursor,
+            limit=limit,
+            descending=True,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    rows, next_cursor = split_page(session.exec(statement).all(), USAGE_PAGE_KEY, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [RecipeUsagePublic.model_validate(row._mapping) for row in rows]
+
+
 @router.post("/", response_model=IngredientPublic)
 def create_ingredient(
     session: SessionDep,
@@ -126,20 +301,17 @@ def delete_ingredient(
     if not ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
 
-    # Check if the ingredient is used in any recipes
-    recipe_links = session.exec(
-        select(RecipeIngredientLink).where(
-            RecipeIngredientLink.ingredient_id == ingredient_id
-        )
-    ).all()
-
-    if recipe_links:
-        # Delete all recipe ingredient links first
-        for link in recipe_links:
-            session.delete(link)
-        session.flush()  # Ensure links are deleted before deleting the ingredient
+    # One set-based delete of the links, served by the ingredient_id index.
+    recipe_ids = set(
+        session.exec(
+            delete(RecipeIngredientLink)
+            .where(RecipeIngredientLink.ingredient_id == ingredient.id)
+            .returning(RecipeIngredientLink.recipe_id)
+        ).scalars()
+    )
 
     session.delete(ingredient)
+    refresh_recipe_nutrition(session, recipe_ids)
     session.commit()
 
     return ingredient
@@ -160,9 +332,18 @@ def update_ingredient(
         raise HTTPException(status_code=404, detail="Ingredient not found")
 
     ingredient_data = ingredient_in.model_dump(exclude_unset=True)
+    nutrition_changed = any(
+        getattr(ingredient, field) != value
+        for field, value in ingredient_data.items()
+        if field in NUTRITION_FIELDS
+    )
     ingredient.sqlmodel_update(ingredient_data)
     session.add(ingredient)
     try:
+        if nutrition_changed:
+            refresh_recipe_nutrition(
+                session, get_recipe_ids_using_ingredient(session, ingredient.id)
+            )
         session.commit()
     except IntegrityError as exc:
         session.rollback()
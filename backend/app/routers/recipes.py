@@ -1,25 +1,101 @@
 import uuid
-from fastapi import APIRouter, UploadFile, File
-from fastapi import HTTPException, Security
-from sqlmodel import select, desc
-from sqlalchemy import or_
-import cloudinary
-import cloudinary.uploader
+from collections.abc import Sequence
+from dataclasses import astuple, dataclass
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi import Header, HTTPException, Query, Security
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlalchemy import Float, cast, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
+from starlette.datastructures import UploadFile
 from app.config import get_settings
 from app.deps import SessionDep, get_current_user, get_current_user_optional
 from app.models import (
+    RECIPE_MACRO_FIELDS,
+    RECIPE_SEARCH_VECTOR,
+    ImageAsset,
+    ImageUploadTicketPublic,
+    PantryMatchCreate,
+    PantryMatchPublic,
+    PantryMissingIngredientPublic,
     Recipe,
+    RecipeCard,
+    RecipeCardPublic,
     RecipeCreate,
+    RecipeImportResult,
+    RecipeImageAttach,
     RecipeIngredientLink,
-    RecipeIngredientSourcePublic,
-    RecipeIngredientTotalPublic,
+    RecipeNutrition,
+    RecipeNutritionSummary,
     RecipeSubRecipeLink,
     RecipePublic,
+    RecipeScaledPublic,
+    RecipeSimilarPublic,
+    RecipeSummaryPublic,
+    RecipeUsagePublic,
     RecipeViewerLink,
     Ingredient,
+    ShoppingListCreate,
+    ShoppingListPublic,
     User,
 )
+from app.etags import etag_matches, make_etag, not_modified
+from app.image_storage import (
+    CloudinaryImageStorage,
+    ImageStorage,
+    ImageStorageUnavailableError,
+    ImageTooLargeError,
+    InvalidUploadError,
+    MULTIPART_OVERHEAD,
+    capped_request,
+    get_image_storage,
+    image_content_type,
+    read_upload,
+)
+from app.nutrition_engine import derive_nutrition_fields
+from app.pantry_index import pantry_index
+from app.pagination import (
+    NEXT_CURSOR_HEADER,
+    InvalidCursorError,
+    paginate,
+    split_page,
+)
 from app.permissions import get_user_effective_scopes
+from app.recipe_graph import (
+    add_sub_recipe_edge,
+    creates_cycle,
+    get_ancestor_recipe_ids,
+    recipes_using_recipe,
+    remove_recipe_edges,
+    remove_sub_recipe_edge,
+    select_recipe_usages,
+)
+from app.recipe_nutrition import (
+    aggregate_total_ingredients,
+    load_nutrition_totals,
+    load_recipe_bom,
+    load_recipe_dag,
+    load_total_ingredients,
+    merge_total_ingredients,
+    refresh_recipe_nutrition,
+)
+from app.recipe_cards import sync_recipe_image
+from app.recipe_index import record_recipe_deletion
+from app.recipe_similarity import similarity_index
+from app.recipe_transfer import (
+    ImportLineTooLongError,
+    import_recipe_chunk,
+    iter_ndjson_chunks,
+    iter_recipe_export,
+)
+from app.recipe_visibility import (
+    RecipeVisibility,
+    get_recipe_visibility,
+    invalidate_recipe_visibility,
+)
 
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
@@ -33,9 +109,13 @@ def _validate_ingredients(session: SessionDep, recipe_in: RecipeCreate) -> None:
             detail="Each ingredient can only appear once in a recipe",
         )
 
-    for ingredient_id in ingredient_ids:
-        if not session.get(Ingredient, ingredient_id):
-            raise HTTPException(status_code=404, detail="Ingredient not found")
+    if not ingredient_ids:
+        return
+    existing_ids = set(
+        session.exec(select(Ingredient.id).where(Ingredient.id.in_(ingredient_ids)))
+    )
+    if len(existing_ids) != len(ingredient_ids):
+        raise HTTPException(status_code=404, detail="Ingredient not found")
 
 
 def _validate_unique_sub_recipe_ids(recipe_in: RecipeCreate) -> None:
@@ -52,317 +132,145 @@ def _validate_sub_recipes_exist(
     recipe_in: RecipeCreate,
     parent_recipe_id: uuid.UUID | None = None,
 ) -> None:
-    for sub_recipe_link in recipe_in.sub_recipes:
-        if parent_recipe_id and sub_recipe_link.sub_recipe_id == parent_recipe_id:
-            raise HTTPException(
-                status_code=400,
-                detail="A recipe can not reference itself as a sub-recipe",
-            )
+    sub_recipe_ids = [link.sub_recipe_id for link in recipe_in.sub_recipes]
+    if parent_recipe_id and parent_recipe_id in sub_recipe_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="A recipe can not reference itself as a sub-recipe",
+        )
+    if not sub_recipe_ids:
+        return
 
-        if not session.get(Recipe, sub_recipe_link.sub_recipe_id):
+    existing_ids = set(
+        session.exec(select(Recipe.id).where(Recipe.id.in_(sub_recipe_ids)))
+    )
+    for sub_recipe_id in sub_recipe_ids:
+        if sub_recipe_id not in existing_ids:
             raise HTTPException(
                 status_code=404,
-                detail=f"Sub-recipe not found: {sub_recipe_link.sub_recipe_id}",
+                detail=f"Sub-recipe not found: {sub_recipe_id}",
             )
 
 
-def _build_recipe_graph(
-    session: SessionDep, excluded_parent_recipe_id: uuid.UUID | None = None
-) -> dict[uuid.UUID, set[uuid.UUID]]:
-    links = session.exec(select(RecipeSubRecipeLink)).all()
-    graph: dict[uuid.UUID, set[uuid.UUID]] = {}
-
-    for link in links:
-        if (
-            excluded_parent_recipe_id
-            and link.parent_recipe_id == excluded_parent_recipe_id
-        ):
-            continue
-        if not link.parent_recipe_id or not link.sub_recipe_id:
-            continue
-        graph.setdefault(link.parent_recipe_id, set()).add(link.sub_recipe_id)
-
-    return graph
-
-
-def _path_exists(
-    graph: dict[uuid.UUID, set[uuid.UUID]], start: uuid.UUID, target: uuid.UUID
-) -> bool:
-    to_visit = [start]
-    visited: set[uuid.UUID] = set()
-
-    while to_visit:
-        node = to_visit.pop()
-        if node == target:
-            return True
-        if node in visited:
-            continue
-        visited.add(node)
-        to_visit.extend(graph.get(node, set()))
-    return False
-
-
 def _validate_no_sub_recipe_cycles(
     session: SessionDep, parent_recipe_id: uuid.UUID, sub_recipe_ids: list[uuid.UUID]
 ) -> None:
-    graph = _build_recipe_graph(session, excluded_parent_recipe_id=parent_recipe_id)
+    if parent_recipe_id in sub_recipe_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="A recipe can not reference itself as a sub-recipe",
+        )
+    if creates_cycle(session, parent_recipe_id, sub_recipe_ids):
+        raise HTTPException(
+            status_code=400,
+            detail="Sub-recipe linkage creates a cycle",
+        )
 
-    for sub_recipe_id in sub_recipe_ids:
-        if sub_recipe_id == parent_recipe_id:
-            raise HTTPException(
-                status_code=400,
-                detail="A recipe can not reference itself as a sub-recipe",
-            )
-        if _path_exists(graph, sub_recipe_id, parent_recipe_id):
-            raise HTTPException(
-                status_code=400,
-                detail="Sub-recipe linkage creates a cycle",
-            )
-        graph.setdefault(parent_recipe_id, set()).add(sub_recipe_id)
-
-
-def _normalize_total_amount(amount: float, unit: str) -> tuple[float, str]:
-    if unit == "kg":
-        return amount * 1000, "g"
-    if unit == "L":
-        return amount * 1000, "ml"
-    return amount, unit
-
-
-def _to_grams(amount: float, unit: str, ingredient: Ingredient) -> float:
-    if unit == "pcs":
-        return amount * ingredient.weight_per_piece
-    # Keep a 1:1 conversion for g/ml in current nutrition model.
-    return amount
-
-
-def _add_ingredient_total(
-    totals: dict[tuple[uuid.UUID, str], RecipeIngredientTotalPublic],
-    source_totals: dict[
-        tuple[uuid.UUID, str], dict[uuid.UUID, RecipeIngredientSourcePublic]
-    ],
-    ingredient: Ingredient,
-    amount: float,
-    consumed_amount: float | None,
-    unit: str,
-    source_recipe: Recipe,
-    is_main_recipe: bool,
-) -> None:
-    normalized_amount, normalized_unit = _normalize_total_amount(amount, unit)
-    effective_consumed_amount = amount if consumed_amount is None else consumed_amount
-    normalized_consumed_amount, _ = _normalize_total_amount(
-        effective_consumed_amount, unit
-    )
-    grams_contribution = _to_grams(
-        normalized_consumed_amount, normalized_unit, ingredient
-    )
-    calories_contribution = (ingredient.calories * grams_contribution) / 100
-    carbohydrates_contribution = (ingredient.carbohydrates * grams_contribution) / 100
-    fat_contribution = (ingredient.fat * grams_contribution) / 100
-    protein_contribution = (ingredient.protein * grams_contribution) / 100
-
-    key = (ingredient.id, normalized_unit)
-    existing = totals.get(key)
-    if existing:
-        existing.amount += normalized_amount
-        existing.consumed_amount += normalized_consumed_amount
-        existing.grams += grams_contribution
-        existing.calories += calories_contribution
-        existing.carbohydrates += carbohydrates_contribution
-        existing.fat += fat_contribution
-        existing.protein += protein_contribution
-    else:
-        totals[key] = RecipeIngredientTotalPublic(
-            ingredient_id=ingredient.id,
-            title=ingredient.title,
-            amount=normalized_amount,
-            consumed_amount=normalized_consumed_amount,
-            unit=normalized_unit,
-            grams=grams_contribution,
-            calories=calories_contribution,
-            carbohydrates=carbohydrates_contribution,
-            fat=fat_contribution,
-            protein=protein_contribution,
-            sources=[],
-        )
-
-    per_ingredient_sources = source_totals.setdefault(key, {})
-    existing_source = per_ingredient_sources.get(source_recipe.id)
-    if existing_source:
-        existing_source.amount += normalized_amount
-        existing_source.consumed_amount += normalized_consumed_amount
-        return
 
-    per_ingredient_sources[source_recipe.id] = RecipeIngredientSourcePublic(
-        recipe_id=source_recipe.id,
-        recipe_title=source_recipe.title,
-        amount=normalized_amount,
-        consumed_amount=normalized_consumed_amount,
-        unit=normalized_unit,
-        is_main_recipe=is_main_recipe,
-    )
+# Sort key of the recipe list, backed by ix_recipe_created_at_id.
+_RECIPE_PAGE_KEY = (Recipe.created_at, Recipe.id)
 
+# Fields GET /recipes can sort on; `-field` sorts descending.
+_RECIPE_SORT_PATTERN = "^-?({})$".format("|".join(("created_at", *RECIPE_MACRO_FIELDS)))
 
-def _collect_total_ingredients(
-    session: SessionDep,
-    recipe: Recipe,
-    scale: float,
-    root_recipe_id: uuid.UUID,
-    totals: dict[tuple[uuid.UUID, str], RecipeIngredientTotalPublic],
-    source_totals: dict[
-        tuple[uuid.UUID, str], dict[uuid.UUID, RecipeIngredientSourcePublic]
-    ],
-    stack: set[uuid.UUID],
-) -> None:
-    for ingredient_link in recipe.ingredient_links:
-        ingredient = ingredient_link.ingredient
-        if not ingredient:
-            continue
-        _add_ingredient_total(
-            totals,
-            source_totals,
-            ingredient,
-            ingredient_link.amount * scale,
-            (
-                ingredient_link.consumed_amount * scale
-                if ingredient_link.consumed_amount is not None
-                else None
-            ),
-            ingredient_link.unit,
-            source_recipe=recipe,
-            is_main_recipe=recipe.id == root_recipe_id,
-        )
-
-    for sub_recipe_link in recipe.sub_recipe_links:
-        sub_recipe_id = sub_recipe_link.sub_recipe_id
-        if not sub_recipe_id or sub_recipe_id in stack:
-            continue
-
-        sub_recipe = session.get(Recipe, sub_recipe_id)
-        if not sub_recipe:
-            continue
-
-        stack.add(sub_recipe_id)
-        _collect_total_ingredients(
-            session,
-            sub_recipe,
-            scale * sub_recipe_link.scale_factor,
-            root_recipe_id,
-            totals,
-            source_totals,
-            stack,
-        )
-        stack.remove(sub_recipe_id)
-
-
-def _calculate_total_ingredients(
-    session: SessionDep, recipe: Recipe
-) -> list[RecipeIngredientTotalPublic]:
-    totals: dict[tuple[uuid.UUID, str], RecipeIngredientTotalPublic] = {}
-    source_totals: dict[
-        tuple[uuid.UUID, str], dict[uuid.UUID, RecipeIngredientSourcePublic]
-    ] = {}
-    _collect_total_ingredients(
-        session,
-        recipe,
-        1.0,
-        recipe.id,
-        totals,
-        source_totals,
-        {recipe.id},
-    )
-
-    result: list[RecipeIngredientTotalPublic] = []
-    for key, item in totals.items():
-        sources = list(source_totals.get(key, {}).values())
-        for source in sources:
-            source.amount = round(source.amount, 2)
-            source.consumed_amount = round(source.consumed_amount, 2)
-        sources.sort(
-            key=lambda source: (not source.is_main_recipe, source.recipe_title.lower())
-        )
-        item.sources = sources
-        item.amount = round(item.amount, 2)
-        item.consumed_amount = round(item.consumed_amount, 2)
-        item.grams = round(item.grams, 2)
-        item.calories = round(item.calories, 2)
-        item.carbohydrates = round(item.carbohydrates, 2)
-        item.fat = round(item.fat, 2)
-        item.protein = round(item.protein, 2)
-        result.append(item)
-
-    result.sort(
-        key=lambda item: (not item.has_overlap, item.title.lower(), item.unit.lower())
-    )
-    return result
+# Same order for cards, backed by the covering ix_recipe_card_* indexes.
+_RECIPE_CARD_PAGE_KEY = (RecipeCard.created_at, RecipeCard.id)
 
+# Everything _build_recipe_publics reads, so a page never lazy-loads per recipe.
+_RECIPE_PAGE_OPTIONS = (
+    selectinload(Recipe.owner),
+    selectinload(Recipe.ingredient_links).selectinload(RecipeIngredientLink.ingredient),
+    selectinload(Recipe.sub_recipe_links).selectinload(RecipeSubRecipeLink.sub_recipe),
+)
 
-def _build_recipe_public(
-    session: SessionDep, recipe: Recipe, current_user: User | None = None
-) -> RecipePublic:
-    viewer_ids = None
-    if _should_include_viewer_ids(current_user, recipe):
-        viewer_ids = _get_viewer_ids(session, recipe.id)
-
-    # Build full response payload including required aggregate fields.
-    return RecipePublic.model_validate(
-        {
-            "id": recipe.id,
-            "title": recipe.title,
-            "instructions": recipe.instructions,
-            "servings": recipe.servings,
-            "image": recipe.image,
-            "is_hidden": recipe.is_hidden,
-            "owner": recipe.owner,
-            "created_at": recipe.created_at,
-            "ingredient_links": recipe.ingredient_links,
-            "sub_recipe_links": recipe.sub_recipe_links,
-            "total_ingredients": _calculate_total_ingredients(session, recipe),
-            "viewer_ids": viewer_ids,
-        }
-    )
 
+RecipeView = Literal["full", "summary"]
 
-def _can_view_all_hidden(current_user: User | None) -> bool:
-    if not current_user:
-        return False
-    if current_user.is_superuser:
-        return True
-    return "recipes:read_hidden" in get_user_effective_scopes(current_user)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 
-def _is_allowed_viewer(
-    session: SessionDep, recipe_id: uuid.UUID, user_id: uuid.UUID
-) -> bool:
-    viewer_link = session.exec(
-        select(RecipeViewerLink).where(
-            RecipeViewerLink.recipe_id == recipe_id,
-            RecipeViewerLink.user_id == user_id,
-        )
-    ).first()
-    return viewer_link is not None
+def _recipe_view_options(view: RecipeView) -> tuple:
+    # Summaries only read columns of the recipe row itself.
+    return _RECIPE_PAGE_OPTIONS if view == "full" else ()
 
 
-def _can_view_recipe(
-    session: SessionDep, recipe: Recipe, current_user: User | None
-) -> bool:
-    if not recipe.is_hidden:
-        return True
-    if not current_user:
-        return False
-    if recipe.owner_id == current_user.id:
-        return True
-    if _can_view_all_hidden(current_user):
-        return True
-    return _is_allowed_viewer(session, recipe.id, current_user.id)
+def _build_recipe_publics(
+    session: SessionDep, recipes: Sequence[Recipe], visibility: RecipeVisibility
+) -> list[RecipePublic]:
+    """Build public payloads for many recipes with a fixed number of queries."""
+    if not recipes:
+        return []
 
+    totals_by_recipe = load_total_ingredients(session, recipes)
 
-def _should_include_viewer_ids(current_user: User | None, recipe: Recipe) -> bool:
-    if not current_user:
-        return False
-    if current_user.is_superuser or recipe.owner_id == current_user.id:
-        return True
-    return "recipes:read_hidden" in get_user_effective_scopes(current_user)
+    viewer_ids_by_recipe: dict[uuid.UUID, list[uuid.UUID]] = {}
+    viewer_recipe_ids = [
+        recipe.id for recipe in recipes if visibility.can_see_viewer_ids(recipe)
+    ]
+    if viewer_recipe_ids:
+        viewer_ids_by_recipe = {recipe_id: [] for recipe_id in viewer_recipe_ids}
+        viewer_links = session.exec(
+            select(RecipeViewerLink).where(
+                RecipeViewerLink.recipe_id.in_(viewer_recipe_ids)
+            )
+        ).all()
+        for link in viewer_links:
+            viewer_ids_by_recipe[link.recipe_id].append(link.user_id)
+
+    # Build full response payloads including required aggregate fields.
+    recipe_publics: list[RecipePublic] = []
+    for recipe in recipes:
+        total_ingredients = totals_by_recipe[recipe.id]
+        recipe_public = RecipePublic.model_validate(
+            {
+                "id": recipe.id,
+                "title": recipe.title,
+                "instructions": recipe.instructions,
+                "servings": recipe.servings,
+                "image": recipe.image,
+                "is_hidden": recipe.is_hidden,
+                "owner": recipe.owner,
+                "created_at": recipe.created_at,
+                "ingredient_links": recipe.ingredient_links,
+                "sub_recipe_links": recipe.sub_recipe_links,
+                "total_ingredients": total_ingredients,
+                "viewer_ids": viewer_ids_by_recipe.get(recipe.id),
+            }
+        )
+        # The nutrition computed fields all read this one summary.
+        recipe_public._nutrition = RecipeNutritionSummary.from_total_ingredients(
+            total_ingredients, recipe.servings
+        )
+        recipe_publics.append(recipe_public)
+    return recipe_publics
+
+
+def _build_recipe_public(
+    session: SessionDep, recipe: Recipe, visibility: RecipeVisibility
+) -> RecipePublic:
+    return _build_recipe_publics(session, [recipe], visibility)[0]
+
+
+def _build_recipe_summaries(
+    session: SessionDep, recipes: Sequence[Recipe]
+) -> list[RecipeSummaryPublic]:
+    """Build summary payloads from recipe rows and their stored totals only."""
+    totals = load_nutrition_totals(session, [recipe.id for recipe in recipes])
+    fields = derive_nutrition_fields(totals, [recipe.servings for recipe in recipes])
+    columns = {name: values.tolist() for name, values in fields.items()}
+
+    return [
+        RecipeSummaryPublic(
+            id=recipe.id,
+            title=recipe.title,
+            image=recipe.image,
+            servings=recipe.servings,
+            is_hidden=recipe.is_hidden,
+            created_at=recipe.created_at,
+            **{name: values[index] for name, values in columns.items()},
+        )
+        for index, recipe in enumerate(recipes)
+    ]
 
 
 def _can_edit_recipe(current_user: User, recipe: Recipe) -> bool:
@@ -381,10 +289,87 @@ def _can_delete_recipe(current_user: User, recipe: Recipe) -> bool:
     return "recipes:delete" in get_user_effective_scopes(current_user)
 
 
-def _get_viewer_ids(session: SessionDep, recipe_id: uuid.UUID) -> list[uuid.UUID]:
-    return session.exec(
-        select(RecipeViewerLink.user_id).where(RecipeViewerLink.recipe_id == recipe_id)
+def _sync_ingredient_links(
+    session: SessionDep, recipe_id: uuid.UUID, recipe_in: RecipeCreate
+) -> None:
+    """Replace a recipe's ingredient links with one delete and one upsert."""
+    ingredient_ids = [link.ingredient_id for link in recipe_in.ingredients]
+    session.exec(
+        delete(RecipeIngredientLink).where(
+            RecipeIngredientLink.recipe_id == recipe_id,
+            RecipeIngredientLink.ingredient_id.not_in(ingredient_ids),
+        )
+    )
+    if not ingredient_ids:
+        return
+
+    statement = insert(RecipeIngredientLink).values(
+        [
+            {
+                "recipe_id": recipe_id,
+                "ingredient_id": link.ingredient_id,
+                "amount": link.amount,
+                "consumed_amount": link.consumed_amount,
+                "unit": link.unit,
+            }
+            for link in recipe_in.ingredients
+        ]
+    )
+    session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["recipe_id", "ingredient_id"],
+            set_={
+                "amount": statement.excluded.amount,
+                "consumed_amount": statement.excluded.consumed_amount,
+                "unit": statement.excluded.unit,
+            },
+        )
+    )
+
+
+def _sync_sub_recipe_links(
+    session: SessionDep, recipe_id: uuid.UUID, recipe_in: RecipeCreate
+) -> None:
+    """Replace a recipe's sub-recipe links and keep the closure table in step."""
+    sub_recipe_ids = {link.sub_recipe_id for link in recipe_in.sub_recipes}
+    removed_ids = session.exec(
+        delete(RecipeSubRecipeLink)
+        .where(
+            RecipeSubRecipeLink.parent_recipe_id == recipe_id,
+            RecipeSubRecipeLink.sub_recipe_id.not_in(sub_recipe_ids),
+        )
+        .returning(RecipeSubRecipeLink.sub_recipe_id)
     ).all()
+    for (sub_recipe_id,) in removed_ids:
+        remove_sub_recipe_edge(session, recipe_id, sub_recipe_id)
+    if not sub_recipe_ids:
+        return
+
+    existing_ids = set(
+        session.exec(
+            select(RecipeSubRecipeLink.sub_recipe_id).where(
+                RecipeSubRecipeLink.parent_recipe_id == recipe_id
+            )
+        )
+    )
+    statement = insert(RecipeSubRecipeLink).values(
+        [
+            {
+                "parent_recipe_id": recipe_id,
+                "sub_recipe_id": link.sub_recipe_id,
+                "scale_factor": link.scale_factor,
+            }
+            for link in recipe_in.sub_recipes
+        ]
+    )
+    session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["parent_recipe_id", "sub_recipe_id"],
+            set_={"scale_factor": statement.excluded.scale_factor},
+        )
+    )
+    for sub_recipe_id in sub_recipe_ids - existing_ids:
+        add_sub_recipe_edge(session, recipe_id, sub_recipe_id)
 
 
 def _validate_viewer_ids(
@@ -412,92 +397,451 @@ def _sync_recipe_viewers(
     viewer_ids.discard(recipe.owner_id)
     viewer_ids = _validate_viewer_ids(session, viewer_ids)
 
-    existing_links = session.exec(
-        select(RecipeViewerLink).where(RecipeViewerLink.recipe_id == recipe.id)
-    ).all()
-    existing_ids = {link.user_id for link in existing_links if link.user_id}
-
-    to_remove = existing_ids - viewer_ids
+    to_remove = set(
+        session.exec(
+            delete(RecipeViewerLink)
+            .where(
+                RecipeViewerLink.recipe_id == recipe.id,
+                RecipeViewerLink.user_id.not_in(viewer_ids),
+            )
+            .returning(RecipeViewerLink.user_id)
+        ).scalars()
+    )
+    existing_ids = set(
+        session.exec(
+            select(RecipeViewerLink.user_id).where(
+                RecipeViewerLink.recipe_id == recipe.id
+            )
+        ).all()
+    )
     to_add = viewer_ids - existing_ids
 
-    for link in existing_links:
-        if link.user_id in to_remove:
-            session.delete(link)
-
     for viewer_id in to_add:
         session.add(RecipeViewerLink(recipe_id=recipe.id, user_id=viewer_id))
 
-
-@router.post("/upload-image")
-def upload_recipe_image(
-    file: UploadFile = File(...),
+    invalidate_recipe_visibility(session, to_remove | to_add)
+
+
+@router.post(
+    "/upload-image",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_recipe_image(
+    request: Request,
+    session: SessionDep,
+    storage: ImageStorage = Depends(get_image_storage),
     current_user: User = Security(get_current_user, scopes=["recipes:create"]),
 ):
     """
-    Upload an image for a recipe.
+    Upload an image for a recipe as the file field of a multipart form.
+
+    Images are stored by content hash, so uploading the same picture twice returns
+    the existing URL without storing it again. Only JPEG, PNG, GIF and WebP are
+    accepted, recognised by their bytes rather than the declared type. The body is
+    parsed here rather than by FastAPI so that an oversized upload is refused
+    before it is spooled.
     """
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
+    max_bytes = get_settings().RECIPE_IMAGE_MAX_BYTES
+    try:
+        async with capped_request(request, max_bytes + MULTIPART_OVERHEAD).form(
+            max_files=1
+        ) as form:
+            file = form.get("file")
+            if not isinstance(file, UploadFile):
+                raise HTTPException(status_code=422, detail="Missing file field")
+            if not file.content_type or not file.content_type.startswith("image/"):
+                raise HTTPException(status_code=400, detail="File must be an image")
+            content, digest = await read_upload(file, max_bytes)
+    except ImageTooLargeError as exc:
+        raise HTTPException(
+            status_code=413, detail=f"Image must be at most {max_bytes} bytes"
+        ) from exc
+    try:
+        content_type = image_content_type(content)
+    except InvalidUploadError as exc:
+        raise HTTPException(status_code=415, detail=str(exc)) from exc
+
+    # Database work stays off the event loop, like every sync route.
+    asset = await run_in_threadpool(session.get, ImageAsset, digest)
+    if asset:
+        return {"url": asset.url}
 
-    settings = get_settings()
-    cloudinary.config(
-        cloud_name=settings.CLOUDINARY_CLOUD_NAME,
-        api_key=settings.CLOUDINARY_API_KEY,
-        api_secret=settings.CLOUDINARY_API_SECRET,
-        secure=True,
+    try:
+        url = await storage.save(content, key=digest, content_type=content_type)
+    except ImageStorageUnavailableError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Image storage is temporarily unavailable. Please try again.",
+        ) from exc
+
+    await run_in_threadpool(
+        _record_image_asset,
+        session,
+        ImageAsset(
+            sha256=digest,
+            url=url,
+            content_type=content_type,
+            size_bytes=len(content),
+        ),
     )
+    return {"url": url}
+
+
+@router.post("/{recipe_id}/upload-ticket", response_model=ImageUploadTicketPublic)
+def create_recipe_image_upload_ticket(
+    session: SessionDep,
+    recipe_id: str,
+    storage: ImageStorage = Depends(get_image_storage),
+    current_user: User = Security(get_current_user),
+):
+    """
+    Issue signed parameters for uploading an image of a recipe straight to
+    Cloudinary.
+
+    The image bytes never pass through the API. Attach the uploaded image with
+    PUT /recipes/{recipe_id}/image; it cannot be attached to another recipe.
+    """
+    db_recipe = session.get(Recipe, recipe_id)
+    if not db_recipe:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if not _can_edit_recipe(current_user, db_recipe):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if not isinstance(storage, CloudinaryImageStorage):
+        raise HTTPException(
+            status_code=400, detail="Direct uploads require Cloudinary storage"
+        )
+    return storage.upload_ticket(db_recipe.id)
 
-    # Upload the file to Cloudinary
-    # Use the environment to segregate uploads (e.g. "local/recipes", "production/recipes")
-    folder_path = f"{settings.ENVIRONMENT}/recipes"
-    upload_result = cloudinary.uploader.upload(file.file, folder=folder_path)
 
-    return {"url": upload_result.get("secure_url")}
+def _record_image_asset(session: SessionDep, asset: ImageAsset) -> None:
+    # A concurrent upload of the same bytes may have won; its URL is just as good.
+    session.exec(
+        insert(ImageAsset)
+        .values(asset.model_dump())
+        .on_conflict_do_nothing(index_elements=["sha256"])
+    )
+    session.commit()
 
 
-@router.get("/", response_model=list[RecipePublic])
+_MacroBound = Annotated[float | None, Query(ge=0)]
+
+
+@dataclass
+class RecipeMacroFilters:
+    """Inclusive bounds on the stored macro columns, as GET /recipes query params."""
+
+    min_calories_per_serving: _MacroBound = None
+    max_calories_per_serving: _MacroBound = None
+    min_carbohydrates_per_serving: _MacroBound = None
+    max_carbohydrates_per_serving: _MacroBound = None
+    min_fat_per_serving: _MacroBound = None
+    max_fat_per_serving: _MacroBound = None
+    min_protein_per_serving: _MacroBound = None
+    max_protein_per_serving: _MacroBound = None
+    min_calories_per_100g: _MacroBound = None
+    max_calories_per_100g: _MacroBound = None
+    min_carbohydrates_per_100g: _MacroBound = None
+    max_carbohydrates_per_100g: _MacroBound = None
+    min_fat_per_100g: _MacroBound = None
+    max_fat_per_100g: _MacroBound = None
+    min_protein_per_100g: _MacroBound = None
+    max_protein_per_100g: _MacroBound = None
+
+
+def _macro_filter_clauses(filters: RecipeMacroFilters) -> list:
+    clauses = []
+    for field in RECIPE_MACRO_FIELDS:
+        column = getattr(RecipeNutrition, field)
+        minimum = getattr(filters, f"min_{field}")
+        maximum = getattr(filters, f"max_{field}")
+        if minimum is not None:
+            clauses.append(column >= minimum)
+        if maximum is not None:
+            clauses.append(column <= maximum)
+    return clauses
+
+
+@router.get("/", response_model=list[RecipePublic] | list[RecipeSummaryPublic])
 def get_recipes(
     session: SessionDep,
+    response: Response,
+    macros: Annotated[RecipeMacroFilters, Depends()],
     skip: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
+    view: RecipeView = "full",
+    sort: str = Query(default="-created_at", pattern=_RECIPE_SORT_PATTERN),
+    if_none_match: str | None = Header(default=None),
     current_user: User | None = Security(get_current_user_optional),
 ):
     """
-    Retrieve recipes.
+    Retrieve recipes, newest first.
+
+    `min_*`/`max_*` filter on per-serving and per-100g macros (inclusive), and
+    `sort` orders by created_at or any of them; prefix it with `-` for descending.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    Send the ETag back in If-None-Match to get 304 Not Modified for unchanged lists.
+    `view=summary` returns RecipeSummaryPublic cards without links or breakdowns.
     """
+    descending = sort.startswith("-")
+    sort_field = sort.removeprefix("-")
+    conditions = _macro_filter_clauses(macros)
+    # Macro filters and sorts read the stored nutrition row of each recipe.
+    join_nutrition = bool(conditions) or sort_field != "created_at"
+    visibility = get_recipe_visibility(session, current_user)
+    visible_clause = visibility.clause()
+    if visible_clause is not None:
+        conditions.append(visible_clause)
+
+    def _filtered(statement):
+        if join_nutrition:
+            statement = statement.join(
+                RecipeNutrition, RecipeNutrition.recipe_id == Recipe.id
+            )
+        return statement.where(*conditions)
 
+    if sort_field == "created_at":
+        page_key = _RECIPE_PAGE_KEY
+    else:
+        # Page over the (macro, recipe_id) index.
+        page_key = (getattr(RecipeNutrition, sort_field), RecipeNutrition.recipe_id)
+    try:
+        statement = paginate(
+            _filtered(select(*page_key, Recipe.updated_at).select_from(Recipe)),
+            page_key,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            descending=descending,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    rows, next_cursor = split_page(session.exec(statement).all(), page_key, limit)
+    page_ids = [getattr(row, page_key[-1].key) for row in rows]
+
+    # Every change that shows in a recipe moves its updated_at, and inserts or
+    # deletes around the page change which ids it holds, so the page rows
+    # version the response without scanning the rest of the list.
+    etag = make_etag(
+        "recipes",
+        current_user.id if current_user else None,
+        # Moderators see viewer lists on recipes they do not own.
+        visibility.sees_all_hidden,
+        view,
+        sort,
+        *(value for value in astuple(macros) if value is not None),
+        next_cursor,
+        *((row_id, row.updated_at) for row_id, row in zip(page_ids, rows)),
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    recipes_by_id = {
+        recipe.id: recipe
+        for recipe in session.exec(
+            select(Recipe)
+            .where(Recipe.id.in_(page_ids))
+            .options(*_recipe_view_options(view))
+        )
+    }
+    recipes = [recipes_by_id[recipe_id] for recipe_id in page_ids]
+
+    if view == "summary":
+        return _build_recipe_summaries(session, recipes)
+    return _build_recipe_publics(session, recipes, visibility)
+
+
+@router.get("/search", response_model=list[RecipePublic] | list[RecipeSummaryPublic])
+def search_recipes(
+    session: SessionDep,
+    response: Response,
+    q: str = Query(min_length=1, max_length=255),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    view: RecipeView = "full",
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Full-text search over recipe titles and instructions, best match first.
+
+    `q` accepts web search syntax ("quoted phrases", -excluded, or). Pass the
+    X-Next-Cursor response header back as `cursor` to fetch the next page.
+    `view=summary` returns RecipeSummaryPublic cards without links or breakdowns.
+    """
+    query = func.websearch_to_tsquery("simple", q)
+    # ts_rank returns real; widen it so the cursor round-trips the exact value.
+    rank = cast(func.ts_rank(RECIPE_SEARCH_VECTOR, query), Float).label("rank")
+    search_key = (rank, Recipe.id)
+
+    statement = select(Recipe.id, rank).where(RECIPE_SEARCH_VECTOR.bool_op("@@")(query))
+    visibility = get_recipe_visibility(session, current_user)
+    visible_clause = visibility.clause()
+    if visible_clause is not None:
+        statement = statement.where(visible_clause)
+    try:
+        statement = paginate(
+            statement, search_key, cursor=cursor, limit=limit, descending=True
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    matches, next_cursor = split_page(session.exec(statement).all(), search_key, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    recipes_by_id = {
+        recipe.id: recipe
+        for recipe in session.exec(
+            select(Recipe)
+            .where(Recipe.id.in_([match.id for match in matches]))
+            .options(*_recipe_view_options(view))
+        )
+    }
+    recipes = [recipes_by_id[match.id] for match in matches]
+    if view == "summary":
+        return _build_recipe_summaries(session, recipes)
+    return _build_recipe_publics(session, recipes, visibility)
+
+
+@router.get(
+    "/by-ingredients", response_model=list[RecipePublic] | list[RecipeSummaryPublic]
+)
+def get_recipes_by_ingredients(
+    session: SessionDep,
+    response: Response,
+    include: list[uuid.UUID] = Query(min_length=1, max_length=100),
+    exclude: list[uuid.UUID] = Query(default=[], max_length=100),
+    match: Literal["all", "any"] = "all",
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    view: RecipeView = "full",
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Recipes made with the given ingredients, newest first.
+
+    Ingredients pulled in through sub-recipes count. `match=all` requires every
+    `include` ingredient and `match=any` at least one; recipes using any `exclude`
+    ingredient are left out. Pass the X-Next-Cursor response header back as
+    `cursor` to fetch the next page.
+    """
+    # The GIN index on the stored ingredient set answers @> and && directly.
+    ingredient_ids = RecipeNutrition.ingredient_ids
     statement = (
-        select(Recipe).order_by(desc(Recipe.created_at)).offset(skip).limit(limit)
-    )
-    if not current_user:
-        statement = statement.where(Recipe.is_hidden.is_(False))
-    elif not _can_view_all_hidden(current_user):
-        viewer_subquery = select(RecipeViewerLink.recipe_id).where(
-            RecipeViewerLink.user_id == current_user.id
-        )
-        statement = statement.where(
-            or_(
-                Recipe.is_hidden.is_(False),
-                Recipe.owner_id == current_user.id,
-                Recipe.id.in_(viewer_subquery),
-            )
+        select(Recipe)
+        .join(RecipeNutrition, RecipeNutrition.recipe_id == Recipe.id)
+        .where(
+            ingredient_ids.contains(include)
+            if match == "all"
+            else ingredient_ids.overlap(include)
         )
-    recipes = session.exec(statement).all()
+        .options(*_recipe_view_options(view))
+    )
+    if exclude:
+        statement = statement.where(~ingredient_ids.overlap(exclude))
+    visibility = get_recipe_visibility(session, current_user)
+    visible_clause = visibility.clause()
+    if visible_clause is not None:
+        statement = statement.where(visible_clause)
+    try:
+        statement = paginate(
+            statement, _RECIPE_PAGE_KEY, cursor=cursor, limit=limit, descending=True
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    recipes, next_cursor = split_page(
+        session.exec(statement).all(), _RECIPE_PAGE_KEY, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-    return [_build_recipe_public(session, recipe, current_user) for recipe in recipes]
+    if view == "summary":
+        return _build_recipe_summaries(session, recipes)
+    return _build_recipe_publics(session, recipes, visibility)
 
 
-@router.get("/{recipe_id}", response_model=RecipePublic)
-def get_recipe(
+@router.get("/cards", response_model=list[RecipeCardPublic])
+def get_recipe_cards(
     session: SessionDep,
-    recipe_id: str,
+    response: Response,
+    limit: int = Query(default=24, ge=1, le=100),
+    cursor: str | None = None,
     current_user: User | None = Security(get_current_user_optional),
 ):
     """
-    Retrieve a recipe.
+    Recipe cards for browsing, newest first.
+
+    Reads only the recipe_card table. Pass the X-Next-Cursor response header back
+    as `cursor` to fetch the next page.
     """
-    # check valid uuid
+    statement = select(
+        RecipeCard.id,
+        RecipeCard.title,
+        RecipeCard.image,
+        RecipeCard.owner_name,
+        RecipeCard.calories_per_serving,
+        RecipeCard.protein_per_serving,
+        RecipeCard.created_at,
+    )
+    visible_clause = get_recipe_visibility(session, current_user).clause(RecipeCard)
+    if visible_clause is not None:
+        statement = statement.where(visible_clause)
+    try:
+        statement = paginate(
+            statement,
+            _RECIPE_CARD_PAGE_KEY,
+            cursor=cursor,
+            limit=limit,
+            descending=True,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    rows, next_cursor = split_page(
+        session.exec(statement).all(), _RECIPE_CARD_PAGE_KEY, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [RecipeCardPublic.model_validate(row._mapping) for row in rows]
 
+
+@router.get("/export", response_class=StreamingResponse)
+def export_recipes(
+    session: SessionDep,
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Stream every visible recipe as NDJSON, one RecipeExport per line.
+
+    Sub-recipes come before the recipes that include them, so the output can be
+    sent to POST /recipes/import as is.
+    """
+    visible_clause = get_recipe_visibility(session, current_user).clause()
+    return StreamingResponse(
+        iter_recipe_export(session, visible_clause),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="recipes.ndjson"'},
+    )
+
+
+def _get_visible_recipe(
+    session: SessionDep, recipe_id: str, visibility: RecipeVisibility
+) -> Recipe:
+    # check valid uuid
     try:
         recipe = session.get(Recipe, recipe_id)
     except Exception:
@@ -507,10 +851,306 @@ def get_recipe(
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
-    if not _can_view_recipe(session, recipe, current_user):
+    if not visibility.can_view(recipe):
         raise HTTPException(status_code=404, detail="Recipe not found")
+    return recipe
+
+
+@router.get("/{recipe_id}", response_model=RecipePublic)
+def get_recipe(
+    session: SessionDep,
+    response: Response,
+    recipe_id: str,
+    if_none_match: str | None = Header(default=None),
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Retrieve a recipe.
+
+    Send the ETag back in If-None-Match to get 304 Not Modified for an unchanged
+    recipe.
+    """
+    visibility = get_recipe_visibility(session, current_user)
+    recipe = _get_visible_recipe(session, recipe_id, visibility)
+
+    etag = make_etag(
+        "recipe",
+        recipe.id,
+        recipe.updated_at,
+        visibility.can_see_viewer_ids(recipe),
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    recipe = session.get(
+        Recipe, recipe.id, options=_RECIPE_PAGE_OPTIONS, populate_existing=True
+    )
+    return _build_recipe_public(session, recipe, visibility)
+
+
+@router.get("/{recipe_id}/scaled", response_model=RecipeScaledPublic)
+def get_scaled_recipe(
+    session: SessionDep,
+    recipe_id: str,
+    servings: int | None = Query(default=None, ge=1),
+    factor: float | None = Query(default=None, gt=0, le=1000),
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Scale a recipe's aggregated ingredients and nutrition.
+
+    Pass either servings (scale to that many servings) or factor (multiply by it).
+    Sub-recipe amounts and their per-source breakdown are scaled along with the
+    recipe's own ingredients.
+    """
+    if (servings is None) == (factor is None):
+        raise HTTPException(
+            status_code=400, detail="Provide exactly one of servings or factor"
+        )
+    recipe = _get_visible_recipe(
+        session, recipe_id, get_recipe_visibility(session, current_user)
+    )
+    if servings is not None:
+        factor = servings / recipe.servings
+    scaled_servings = servings if servings is not None else recipe.servings * factor
+
+    total_ingredients = aggregate_total_ingredients(
+        load_recipe_bom(session, recipe), factor
+    )[recipe.id]
+    nutrition = RecipeNutritionSummary.from_total_ingredients(
+        total_ingredients, scaled_servings
+    )
+    return RecipeScaledPublic(
+        id=recipe.id,
+        title=recipe.title,
+        factor=factor,
+        servings=scaled_servings,
+        total_ingredients=total_ingredients,
+        **nutrition.model_dump(),
+    )
 
-    return _build_recipe_public(session, recipe, current_user)
+
+@router.get("/{recipe_id}/used-in", response_model=list[RecipeUsagePublic])
+def get_recipe_used_in(
+    session: SessionDep,
+    response: Response,
+    recipe_id: str,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = None,
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Recipes that include this recipe as a sub-recipe, at any depth, newest first.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    visibility = get_recipe_visibility(session, current_user)
+    recipe = _get_visible_recipe(session, recipe_id, visibility)
+    try:
+        statement = paginate(
+            select_recipe_usages(recipes_using_recipe(recipe.id), visibility.clause()),
+            _RECIPE_PAGE_KEY,
+            cursor=cursor,
+            limit=limit,
+            descending=True,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    rows, next_cursor = split_page(
+        session.exec(statement).all(), _RECIPE_PAGE_KEY, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [RecipeUsagePublic.model_validate(row._mapping) for row in rows]
+
+
+@router.get("/{recipe_id}/similar", response_model=list[RecipeSimilarPublic])
+def get_similar_recipes(
+    session: SessionDep,
+    recipe_id: str,
+    limit: int = Query(default=10, ge=1, le=50),
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    The visible recipes most similar to this one, best first.
+
+    Similarity mixes the cosine of the ingredient gram vectors, sub-recipes
+    included, with the cosine of the carbohydrate/fat/protein profiles.
+    """
+    visibility = get_recipe_visibility(session, current_user)
+    recipe = _get_visible_recipe(session, recipe_id, visibility)
+    similar = similarity_index.sync(session).similar(recipe.id, visibility, limit)
+    if not similar:
+        return []
+
+    recipes = {
+        row.id: row
+        for row in session.exec(
+            select(Recipe.id, Recipe.title, Recipe.image).where(
+                Recipe.id.in_([similar_id for similar_id, _ in similar])
+            )
+        )
+    }
+    return [
+        RecipeSimilarPublic(
+            id=similar_id,
+            title=recipes[similar_id].title,
+            image=recipes[similar_id].image,
+            similarity=round(score, 4),
+        )
+        for similar_id, score in similar
+        if similar_id in recipes
+    ]
+
+
+@router.post("/shopping-list", response_model=ShoppingListPublic)
+def create_shopping_list(
+    session: SessionDep,
+    shopping_list_in: ShoppingListCreate,
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Merge the ingredients of several recipes, each scaled to its servings.
+
+    Listing a recipe twice adds both quantities. All recipes and their sub-recipes
+    are loaded together, so the cost does not grow with one fetch per recipe.
+    """
+    recipe_ids = {item.recipe_id for item in shopping_list_in.items}
+    statement = select(Recipe.id, Recipe.servings).where(Recipe.id.in_(recipe_ids))
+    visible_clause = get_recipe_visibility(session, current_user).clause()
+    if visible_clause is not None:
+        statement = statement.where(visible_clause)
+    servings_by_recipe = dict(session.exec(statement).all())
+
+    missing_ids = recipe_ids - servings_by_recipe.keys()
+    if missing_ids:
+        missing_str = ", ".join(sorted(str(recipe_id) for recipe_id in missing_ids))
+        raise HTTPException(
+            status_code=404, detail=f"Recipe(s) not found: {missing_str}"
+        )
+
+    factors: dict[uuid.UUID, float] = {}
+    for item in shopping_list_in.items:
+        factors[item.recipe_id] = (
+            factors.get(item.recipe_id, 0)
+            + item.servings / servings_by_recipe[item.recipe_id]
+        )
+    return ShoppingListPublic(
+        total_ingredients=merge_total_ingredients(
+            load_recipe_dag(session, factors), factors
+        )
+    )
+
+
+@router.post("/pantry-matches", response_model=list[PantryMatchPublic])
+def rank_pantry_matches(
+    session: SessionDep,
+    response: Response,
+    pantry_in: PantryMatchCreate,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+    min_coverage: float = Query(default=0, ge=0, le=1),
+    current_user: User | None = Security(get_current_user_optional),
+):
+    """
+    Rank visible recipes by the share of their ingredients the pantry covers.
+
+    Ingredients pulled in through sub-recipes count, and each match lists what is
+    still missing. Ties go to fewer missing, then more covered ingredients. The
+    X-Total-Count response header holds the number of matches across all pages.
+    """
+    matches, total = pantry_index.sync(session).rank(
+        pantry_in.ingredient_ids,
+        get_recipe_visibility(session, current_user),
+        skip=skip,
+        limit=limit,
+        min_coverage=min_coverage,
+    )
+    response.headers["X-Total-Count"] = str(total)
+    if not matches:
+        return []
+
+    recipes = {
+        row.id: row
+        for row in session.exec(
+            select(Recipe.id, Recipe.title, Recipe.image).where(
+                Recipe.id.in_([match.recipe_id for match in matches])
+            )
+        )
+    }
+    missing_ids = {
+        ingredient_id
+        for match in matches
+        for ingredient_id in match.missing_ingredient_ids
+    }
+    ingredient_titles = (
+        dict(
+            session.exec(
+                select(Ingredient.id, Ingredient.title).where(
+                    Ingredient.id.in_(missing_ids)
+                )
+            ).all()
+        )
+        if missing_ids
+        else {}
+    )
+    return [
+        PantryMatchPublic(
+            id=match.recipe_id,
+            title=recipes[match.recipe_id].title,
+            image=recipes[match.recipe_id].image,
+            coverage=match.coverage,
+            covered_count=match.covered_count,
+            ingredient_count=match.ingredient_count,
+            missing_ingredients=sorted(
+                (
+                    PantryMissingIngredientPublic(
+                        id=ingredient_id, title=ingredient_titles[ingredient_id]
+                    )
+                    for ingredient_id in match.missing_ingredient_ids
+                    # The snapshot may predate an ingredient's deletion.
+                    if ingredient_id in ingredient_titles
+                ),
+                key=lambda ingredient: ingredient.title.lower(),
+            ),
+        )
+        for match in matches
+        if match.recipe_id in recipes
+    ]
+
+
+@router.post(
+    "/import",
+    response_model=RecipeImportResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def import_recipes(
+    request: Request,
+    session: SessionDep,
+    current_user: User = Security(get_current_user, scopes=["recipes:create"]),
+):
+    """
+    Import NDJSON in the format of GET /recipes/export, owned by the current user.
+
+    The body is read in chunks and each chunk is committed on its own. Lines whose
+    id already exists are skipped; invalid lines are reported and left out.
+    """
+    owner_id = current_user.id
+    result = RecipeImportResult()
+    try:
+        async for chunk in iter_ndjson_chunks(request.stream()):
+            await run_in_threadpool(
+                import_recipe_chunk, session, chunk, owner_id, result
+            )
+    except ImportLineTooLongError as exc:
+        raise HTTPException(status_code=413, detail="NDJSON line too long") from exc
+    return result
 
 
 @router.post("/", response_model=RecipePublic)
@@ -538,17 +1178,6 @@ def create_recipe(
     session.add(recipe)
     session.flush()
 
-    for ingredient_link in recipe_in.ingredients:
-        # create a new RecipeIngredientLink
-        recipe_ingredient_link = RecipeIngredientLink(
-            ingredient_id=ingredient_link.ingredient_id,
-            recipe_id=recipe.id,  # Now recipe.id is valid
-            amount=ingredient_link.amount,
-            consumed_amount=ingredient_link.consumed_amount,
-            unit=ingredient_link.unit,
-        )
-        session.add(recipe_ingredient_link)
-
     _validate_sub_recipes_exist(session, recipe_in, recipe.id)
     _validate_no_sub_recipe_cycles(
         session,
@@ -556,14 +1185,8 @@ def create_recipe(
         [sub_recipe_link.sub_recipe_id for sub_recipe_link in recipe_in.sub_recipes],
     )
 
-    for sub_recipe_link in recipe_in.sub_recipes:
-        session.add(
-            RecipeSubRecipeLink(
-                parent_recipe_id=recipe.id,
-                sub_recipe_id=sub_recipe_link.sub_recipe_id,
-                scale_factor=sub_recipe_link.scale_factor,
-            )
-        )
+    _sync_ingredient_links(session, recipe.id, recipe_in)
+    _sync_sub_recipe_links(session, recipe.id, recipe_in)
 
     if recipe_in.viewer_ids is not None:
         viewer_ids = set(recipe_in.viewer_ids)
@@ -571,11 +1194,17 @@ def create_recipe(
         viewer_ids = _validate_viewer_ids(session, viewer_ids)
         for viewer_id in viewer_ids:
             session.add(RecipeViewerLink(recipe_id=recipe.id, user_id=viewer_id))
+        invalidate_recipe_visibility(session, viewer_ids)
 
+    refresh_recipe_nutrition(session, [recipe.id])
     session.commit()
-    session.refresh(recipe)
+    recipe = session.get(
+        Recipe, recipe.id, options=_RECIPE_PAGE_OPTIONS, populate_existing=True
+    )
 
-    return _build_recipe_public(session, recipe, current_user)
+    return _build_recipe_public(
+        session, recipe, get_recipe_visibility(session, current_user)
+    )
 
 
 @router.patch("/{recipe_id}", response_model=RecipePublic)
@@ -605,75 +1234,8 @@ def update_recipe(
         [sub_recipe_link.sub_recipe_id for sub_recipe_link in recipe_in.sub_recipes],
     )
 
-    # Get the new ingredient IDs from the request
-    new_ingredient_ids = {link.ingredient_id for link in recipe_in.ingredients}
-
-    # Get existing ingredient links from database
-    existing_links = session.exec(
-        select(RecipeIngredientLink).where(
-            RecipeIngredientLink.recipe_id == db_recipe.id
-        )
-    ).all()
-
-    # Delete ingredient links that are not in the new list
-    for existing_link in existing_links:
-        if existing_link.ingredient_id not in new_ingredient_ids:
-            session.delete(existing_link)
-
-    # update the ingredient links
-    for ingredient_link in recipe_in.ingredients:
-        existing_link = session.exec(
-            select(RecipeIngredientLink).where(
-                RecipeIngredientLink.recipe_id == db_recipe.id,
-                RecipeIngredientLink.ingredient_id == ingredient_link.ingredient_id,
-            )
-        ).one_or_none()
-
-        if existing_link:
-            # Update existing link
-            existing_link.amount = ingredient_link.amount
-            existing_link.consumed_amount = ingredient_link.consumed_amount
-            existing_link.unit = ingredient_link.unit
-        else:
-            # Create new link
-            new_link = RecipeIngredientLink(
-                recipe_id=db_recipe.id,
-                ingredient_id=ingredient_link.ingredient_id,
-                amount=ingredient_link.amount,
-                consumed_amount=ingredient_link.consumed_amount,
-                unit=ingredient_link.unit,
-            )
-            session.add(new_link)
-
-    new_sub_recipe_ids = {link.sub_recipe_id for link in recipe_in.sub_recipes}
-    existing_sub_recipe_links = session.exec(
-        select(RecipeSubRecipeLink).where(
-            RecipeSubRecipeLink.parent_recipe_id == db_recipe.id
-        )
-    ).all()
-
-    for existing_sub_link in existing_sub_recipe_links:
-        if existing_sub_link.sub_recipe_id not in new_sub_recipe_ids:
-            session.delete(existing_sub_link)
-
-    for sub_recipe_link in recipe_in.sub_recipes:
-        existing_sub_link = session.exec(
-            select(RecipeSubRecipeLink).where(
-                RecipeSubRecipeLink.parent_recipe_id == db_recipe.id,
-                RecipeSubRecipeLink.sub_recipe_id == sub_recipe_link.sub_recipe_id,
-            )
-        ).one_or_none()
-
-        if existing_sub_link:
-            existing_sub_link.scale_factor = sub_recipe_link.scale_factor
-        else:
-            session.add(
-                RecipeSubRecipeLink(
-                    parent_recipe_id=db_recipe.id,
-                    sub_recipe_id=sub_recipe_link.sub_recipe_id,
-                    scale_factor=sub_recipe_link.scale_factor,
-                )
-            )
+    _sync_ingredient_links(session, db_recipe.id, recipe_in)
+    _sync_sub_recipe_links(session, db_recipe.id, recipe_in)
 
     recipe_in_data = recipe_in.model_dump(
         exclude_unset=True, exclude={"ingredients", "sub_recipes", "viewer_ids"}
@@ -684,10 +1246,54 @@ def update_recipe(
     if recipe_in.viewer_ids is not None:
         _sync_recipe_viewers(session, db_recipe, set(recipe_in.viewer_ids))
 
+    refresh_recipe_nutrition(session, [db_recipe.id])
+    session.commit()
+    db_recipe = session.get(
+        Recipe, db_recipe.id, options=_RECIPE_PAGE_OPTIONS, populate_existing=True
+    )
+
+    return _build_recipe_public(
+        session, db_recipe, get_recipe_visibility(session, current_user)
+    )
+
+
+@router.put("/{recipe_id}/image", response_model=RecipePublic)
+def attach_recipe_image(
+    session: SessionDep,
+    recipe_id: str,
+    image_in: RecipeImageAttach,
+    storage: ImageStorage = Depends(get_image_storage),
+    current_user: User = Security(get_current_user),
+):
+    """
+    Set a recipe's image to one uploaded with an upload ticket for it.
+
+    Send public_id, version and signature exactly as Cloudinary returned them.
+    """
+    db_recipe = session.get(Recipe, recipe_id)
+    if not db_recipe:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if not _can_edit_recipe(current_user, db_recipe):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if not isinstance(storage, CloudinaryImageStorage):
+        raise HTTPException(
+            status_code=400, detail="Direct uploads require Cloudinary storage"
+        )
+
+    try:
+        db_recipe.image = storage.uploaded_image_url(image_in, db_recipe.id)
+    except InvalidUploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    session.add(db_recipe)
+    sync_recipe_image(session, db_recipe)
     session.commit()
-    session.refresh(db_recipe)
+    db_recipe = session.get(
+        Recipe, db_recipe.id, options=_RECIPE_PAGE_OPTIONS, populate_existing=True
+    )
 
-    return _build_recipe_public(session, db_recipe, current_user)
+    return _build_recipe_public(
+        session, db_recipe, get_recipe_visibility(session, current_user)
+    )
 
 
 @router.delete("/{recipe_id}", response_model=Recipe)
@@ -710,6 +1316,12 @@ def delete_recipe(
     # for link in recipe.ingredient_links:
     #     session.delete(link)
 
+    # Recipes that included this one lose it as a sub-recipe.
+    affected_recipe_ids = get_ancestor_recipe_ids(session, [recipe.id])
+
+    remove_recipe_edges(session, recipe.id)
     session.delete(recipe)
+    record_recipe_deletion(session, recipe.id)
+    refresh_recipe_nutrition(session, affected_recipe_ids)
     session.commit()
     return recipe
@@ -30,31 +30,46 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
+from app.pagination import InvalidCursorError, paginate, split_page
+from app.recipe_cards import sync_recipe_owner
 from app.permissions import get_user_effective_scopes
 from app.utils import generate_new_account_email, send_email
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Sort key of the user list, backed by ix_user_email_id.
+USER_PAGE_KEY = (User.email, User.id)
+
 
 @router.get("/", response_model=UsersPublic)
 def get_users(
     session: SessionDep,
     skip: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
     current_user: User = Security(get_current_user, scopes=["users:read"]),
 ):
     """
-    Retrieve users.
+    Retrieve users, ordered by email.
+
+    Pass `next_cursor` back as `cursor` to fetch the next page.
     """
 
     count_statement = select(func.count()).select_from(User)
     count = session.exec(count_statement).one()
 
-    statement = select(User).order_by(User.email).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    try:
+        statement = paginate(
+            select(User), USER_PAGE_KEY, cursor=cursor, skip=skip, limit=limit
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    users, next_cursor = split_page(session.exec(statement).all(), USER_PAGE_KEY, limit)
 
     return UsersPublic(
-        data=[UserPublic.model_validate(user) for user in users], count=count
+        data=[UserPublic.model_validate(user) for user in users],
+        count=count,
+        next_cursor=next_cursor,
     )
 
 
@@ -153,6 +168,8 @@ def update_user_me(
     user_data = user_in.model_dump(exclude_unset=True)
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
+    if user_data:
+        sync_recipe_owner(session, current_user)
     session.commit()
     session.refresh(current_user)
     return current_user
@@ -2,11 +2,16 @@ from __future__ import annotations
 
 from typing import TypedDict
 
+from sqlalchemy import delete
 from sqlmodel import Session, select
 
 from app.config import settings
 from app.db import init_db
 from app.models import Ingredient, Recipe, RecipeIngredientLink, User
+from app.recipe_nutrition import (
+    get_recipe_ids_using_ingredient,
+    refresh_recipe_nutrition,
+)
 
 
 class IngredientSeed(TypedDict):
@@ -367,6 +372,7 @@ def seed_ingredients(
     updated = 0
     skipped = 0
 
+    affected_recipe_ids = set()
     for data in INGREDIENT_SEEDS:
         existing = session.exec(
             select(Ingredient).where(Ingredient.title == data["title"])
@@ -380,6 +386,9 @@ def seed_ingredients(
                 existing.protein = data["protein"]
                 existing.weight_per_piece = data["weight_per_piece"]
                 session.add(existing)
+                affected_recipe_ids |= get_recipe_ids_using_ingredient(
+                    session, existing.id
+                )
                 updated += 1
             else:
                 skipped += 1
@@ -389,6 +398,7 @@ def seed_ingredients(
         session.add(ingredient)
         created += 1
 
+    refresh_recipe_nutrition(session, affected_recipe_ids)
     session.commit()
     return created, updated, skipped
 
@@ -437,6 +447,7 @@ def seed_recipes(
     created = 0
     updated = 0
     skipped = 0
+    seeded_recipe_ids = set()
 
     for data in RECIPE_SEEDS:
         existing = session.exec(
@@ -456,15 +467,12 @@ def seed_recipes(
             session.add(existing)
             session.flush()
 
-            existing_links = session.exec(
-                select(RecipeIngredientLink).where(
+            # Remove old link rows before we insert replacements.
+            session.exec(
+                delete(RecipeIngredientLink).where(
                     RecipeIngredientLink.recipe_id == existing.id
                 )
-            ).all()
-            for link in existing_links:
-                session.delete(link)
-            # Ensure old link rows are removed before we insert replacements.
-            session.flush()
+            )
             recipe_obj = existing
             updated += 1
         else:
@@ -488,6 +496,8 @@ def seed_recipes(
                 unit=ingredient_item["unit"],
             )
             session.add(link)
+        seeded_recipe_ids.add(recipe_obj.id)
 
+    refresh_recipe_nutrition(session, seeded_recipe_ids)
     session.commit()
     return created, updated, skipped
@@ -124,6 +124,42 @@ def test_create_get_and_list_ingredient(
     assert created in list_response.json()
 
 
+def test_autocomplete_ingredients_ranks_prefix_matches_first(
+    client: TestClient, db: Session
+) -> None:
+    suffix = uuid.uuid4().hex[:8]
+    for title in (
+        f"Tomato {suffix}",
+        f"Cherry tomato {suffix}",
+        f"Tomatillo {suffix}",
+        f"Potato {suffix}",
+    ):
+        _create_ingredient(db, title=title)
+
+    response = client.get("/ingredients/autocomplete", params={"prefix": "tomat"})
+
+    assert response.status_code == 200, response.text
+    suggestions = [item for item in response.json() if item["title"].endswith(suffix)]
+    assert [item["title"] for item in suggestions[:2]] == [
+        f"Tomatillo {suffix}",
+        f"Tomato {suffix}",
+    ]
+    assert f"Cherry tomato {suffix}" in [item["title"] for item in suggestions]
+    assert f"Potato {suffix}" not in [item["title"] for item in suggestions]
+    assert set(suggestions[0]) == {"id", "title", "calories", "weight_per_piece"}
+
+
+def test_autocomplete_ingredients_treats_like_wildcards_literally(
+    client: TestClient, db: Session
+) -> None:
+    _create_ingredient(db, title="Sugar")
+
+    response = client.get("/ingredients/autocomplete", params={"prefix": "%"})
+
+    assert response.status_code == 200
+    assert "Sugar" not in [item["title"] for item in response.json()]
+
+
 def test_get_ingredient_rejects_invalid_uuid(client: TestClient) -> None:
     response = client.get("/ingredients/not-a-uuid")
 
@@ -165,6 +201,41 @@ def test_update_ingredient(
     assert ingredient.barcode == "9876543210123"
 
 
+def test_get_ingredient_revalidates_with_etag(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _create_ingredient(db)
+
+    response = client.get(f"/ingredients/{ingredient.id}")
+    etag = response.headers["ETag"]
+    list_etag = client.get("/ingredients/").headers["ETag"]
+
+    response = client.get(
+        f"/ingredients/{ingredient.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    response = client.get("/ingredients/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 304
+
+    response = client.patch(
+        f"/ingredients/{ingredient.id}",
+        headers=superuser_token_headers,
+        json=_ingredient_payload(title="Renamed ingredient"),
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        f"/ingredients/{ingredient.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["title"] == "Renamed ingredient"
+    response = client.get("/ingredients/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+
+
 def test_update_ingredient_returns_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
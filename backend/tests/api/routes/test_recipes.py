@@ -1,10 +1,39 @@
+import hashlib
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
 from uuid import UUID, uuid4
 
+import anyio
+import pytest
+from cloudinary.utils import api_sign_request
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlalchemy import event
+from sqlmodel import Session, select
 
 from app import db_crud
-from app.models import Ingredient, User, UserCreate
+from app.config import settings
+from app.db import engine
+from app.image_storage import (
+    CloudinaryImageStorage,
+    LocalImageStorage,
+    get_image_storage,
+)
+from app.main import app
+from app.models import (
+    Ingredient,
+    Recipe,
+    RecipeClosure,
+    RecipeNutrition,
+    User,
+    UserCreate,
+)
+from app.pantry_index import PantrySnapshot, pantry_index
+from app.recipe_nutrition import calculate_total_ingredients
+from app.recipe_transfer import iter_ndjson_chunks
 from tests.utils.user import user_authentication_headers
 from tests.utils.utils import random_email, random_lower_string
 
@@ -81,6 +110,21 @@ def _create_recipe(
     return response.json()
 
 
+@contextmanager
+def _recorded_statements() -> Iterator[list[str]]:
+    """Collect the SQL statements executed inside the block."""
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
 def test_recipe_crud_and_nutrition(
     client: TestClient,
     db: Session,
@@ -180,6 +224,39 @@ def test_hidden_recipe_visibility_and_viewer_id_disclosure(
     assert recipe["id"] in {item["id"] for item in viewer_list}
 
 
+def test_viewer_changes_update_cached_visibility(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    viewer, viewer_headers = _user_and_headers(client, db)
+    payload = _payload(ingredient.id, hidden=True, viewer_ids=[])
+    recipe = _create_recipe(client, superuser_token_headers, payload)
+    url = f"/recipes/{recipe['id']}"
+
+    assert client.get(url, headers=viewer_headers).status_code == 404
+
+    with _recorded_statements() as statements:
+        assert client.get(url, headers=viewer_headers).status_code == 404
+    # The viewer's grants were cached by the first request.
+    assert not [
+        statement for statement in statements if "recipeviewerlink" in statement
+    ]
+
+    payload["viewer_ids"] = [str(viewer.id)]
+    response = client.patch(url, headers=superuser_token_headers, json=payload)
+    assert response.status_code == 200
+    assert client.get(url, headers=viewer_headers).status_code == 200
+    viewer_list = client.get("/recipes/", headers=viewer_headers).json()
+    assert recipe["id"] in {item["id"] for item in viewer_list}
+
+    payload["viewer_ids"] = []
+    response = client.patch(url, headers=superuser_token_headers, json=payload)
+    assert response.status_code == 200
+    assert client.get(url, headers=viewer_headers).status_code == 404
+
+
 def test_unrelated_user_cannot_update_or_delete_recipe(
     client: TestClient,
     db: Session,
@@ -373,6 +450,9 @@ def test_invalid_viewer_and_owner_as_viewer(
     assert invalid_response.status_code == 404
 
 
+PNG_BYTES = b"\x89PNG\r\n\x1a\npng"
+
+
 def test_recipe_image_upload_rejects_non_image(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -383,3 +463,1245 @@ def test_recipe_image_upload_rejects_non_image(
     )
     assert response.status_code == 400
     assert response.json()["detail"] == "File must be an image"
+
+
+@pytest.mark.parametrize(
+    ("content", "content_type"),
+    [
+        (b'<svg xmlns="http://www.w3.org/2000/svg"><script/></svg>', "image/svg+xml"),
+        (b"<html><script>alert(1)</script></html>", "image/png"),
+    ],
+)
+def test_recipe_image_upload_accepts_raster_bytes_only(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    tmp_path: Path,
+    content: bytes,
+    content_type: str,
+) -> None:
+    app.dependency_overrides[get_image_storage] = lambda: LocalImageStorage(
+        tmp_path, "/uploads"
+    )
+    try:
+        response = client.post(
+            "/recipes/upload-image",
+            headers=superuser_token_headers,
+            files={"file": ("image", content, content_type)},
+        )
+    finally:
+        app.dependency_overrides.pop(get_image_storage, None)
+
+    assert response.status_code == 415
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_recipe_image_upload_is_capped_and_deduplicated(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    saved: list[str] = []
+
+    class _RecordingStorage(LocalImageStorage):
+        async def save(self, content: bytes, *, key: str, content_type: str) -> str:
+            saved.append(key)
+            return await super().save(content, key=key, content_type=content_type)
+
+    app.dependency_overrides[get_image_storage] = lambda: _RecordingStorage(
+        tmp_path, "/uploads"
+    )
+    monkeypatch.setattr(settings, "RECIPE_IMAGE_MAX_BYTES", 16)
+    try:
+        responses = [
+            client.post(
+                "/recipes/upload-image",
+                headers=superuser_token_headers,
+                files={"file": (name, PNG_BYTES, "image/png")},
+            )
+            for name in ("first.png", "again.png")
+        ]
+        too_large = client.post(
+            "/recipes/upload-image",
+            headers=superuser_token_headers,
+            files={"file": ("big.png", b"x" * 17, "image/png")},
+        )
+        # Far past the cap the declared length is refused without parsing the form.
+        much_too_large = client.post(
+            "/recipes/upload-image",
+            headers=superuser_token_headers,
+            files={"file": ("huge.png", b"x" * 64 * 1024, "image/png")},
+        )
+        missing_file = client.post(
+            "/recipes/upload-image",
+            headers=superuser_token_headers,
+            data={"image": "png bytes"},
+        )
+    finally:
+        app.dependency_overrides.pop(get_image_storage, None)
+
+    digest = hashlib.sha256(PNG_BYTES).hexdigest()
+    assert [response.json() for response in responses] == [
+        {"url": f"/uploads/{digest}.png"}
+    ] * 2
+    assert saved == [digest]
+    assert (tmp_path / f"{digest}.png").read_bytes() == PNG_BYTES
+    assert too_large.status_code == 413
+    assert much_too_large.status_code == 413
+    assert missing_file.status_code == 422
+
+
+def test_direct_upload_ticket_and_attach(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    storage = CloudinaryImageStorage(
+        cloud_name="demo", api_key="key", api_secret="secret", folder="local/recipes"
+    )
+    app.dependency_overrides[get_image_storage] = lambda: storage
+    try:
+        recipe = _create_recipe(
+            client, superuser_token_headers, _payload(_ingredient(db).id)
+        )
+        parent = _create_recipe(
+            client,
+            superuser_token_headers,
+            _payload(
+                _ingredient(db).id,
+                sub_recipes=[{"sub_recipe_id": recipe["id"], "scale_factor": 1}],
+            ),
+        )
+        parent_etag = client.get(f"/recipes/{parent['id']}").headers["ETag"]
+        response = client.post(
+            f"/recipes/{recipe['id']}/upload-ticket", headers=superuser_token_headers
+        )
+        assert response.status_code == 200, response.text
+        ticket = response.json()
+        signed = {
+            key: ticket[key]
+            for key in ("folder", "overwrite", "public_id", "timestamp")
+        }
+        assert ticket["folder"] == "local/recipes"
+        assert ticket["public_id"].startswith(f"{UUID(recipe['id']).hex}-")
+        assert ticket["signature"] == api_sign_request(signed, "secret")
+        assert (
+            client.post(
+                f"/recipes/{uuid4()}/upload-ticket",
+                headers=superuser_token_headers,
+            ).status_code
+            == 404
+        )
+
+        public_id = f"local/recipes/{ticket['public_id']}"
+
+        def _attach(public_id: str, signature: str, recipe_id: str = recipe["id"]):
+            return client.put(
+                f"/recipes/{recipe_id}/image",
+                headers=superuser_token_headers,
+                json={
+                    "public_id": public_id,
+                    "version": 17,
+                    "signature": signature,
+                    "format": "jpg",
+                },
+            )
+
+        def _response_signature(public_id: str) -> str:
+            return api_sign_request(
+                {"public_id": public_id, "version": 17}, "secret", signature_version=1
+            )
+
+        assert _attach(public_id, "forged").status_code == 400
+        assert (
+            _attach("other/folder/x", _response_signature("other/folder/x")).status_code
+            == 400
+        )
+        # A validly signed upload from another recipe's ticket does not attach.
+        assert (
+            _attach(public_id, _response_signature(public_id), parent["id"]).status_code
+            == 400
+        )
+        response = _attach(public_id, _response_signature(public_id))
+    finally:
+        app.dependency_overrides.pop(get_image_storage, None)
+
+    image = f"https://res.cloudinary.com/demo/image/upload/v17/{public_id}.jpg"
+    assert response.status_code == 200, response.text
+    assert response.json()["image"] == image
+    # The parent shows the sub-recipe's image, so its old ETag no longer matches.
+    response = client.get(
+        f"/recipes/{parent['id']}", headers={"If-None-Match": parent_etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["sub_recipe_links"][0]["sub_recipe"]["image"] == image
+
+
+def test_recipe_list_etag_changes_with_viewer_rights(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    user, headers = _user_and_headers(client, db)
+    recipe = _create_recipe(
+        client, superuser_token_headers, _payload(_ingredient(db).id)
+    )
+
+    response = client.get("/recipes/?limit=1", headers=headers)
+    assert response.json()[0]["id"] == recipe["id"]
+    assert response.json()[0]["viewer_ids"] is None
+    list_etag = response.headers["ETag"]
+
+    user.custom_scopes = ["recipes:read_hidden"]
+    db.add(user)
+    db.commit()
+
+    response = client.get(
+        "/recipes/?limit=1", headers={**headers, "If-None-Match": list_etag}
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["viewer_ids"] == []
+
+
+def _count_queries(client: TestClient, url: str) -> int:
+    with _recorded_statements() as statements:
+        response = client.get(url)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_recipe_list_query_count_does_not_grow_with_page_size(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+
+    def _create_pair(index: int) -> None:
+        child = _create_recipe(
+            client,
+            superuser_token_headers,
+            # Hidden children stay out of the anonymous page, so they load as
+            # sub-recipes of their parents.
+            _payload(ingredient.id, title=f"Child {index}", hidden=True),
+        )
+        _create_recipe(
+            client,
+            superuser_token_headers,
+            _payload(
+                ingredient.id,
+                title=f"Parent {index}",
+                sub_recipes=[{"sub_recipe_id": child["id"], "scale_factor": 2}],
+            ),
+        )
+
+    _create_pair(0)
+    small_page_queries = _count_queries(client, "/recipes/")
+
+    for index in range(1, 6):
+        _create_pair(index)
+    large_page_queries = _count_queries(client, "/recipes/")
+
+    assert large_page_queries == small_page_queries
+
+
+def test_stored_totals_follow_ingredient_and_sub_recipe_changes(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db, calories=100)
+    child_payload = _payload(ingredient.id, title="Child")
+    child = _create_recipe(client, superuser_token_headers, child_payload)
+    parent = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Parent",
+            sub_recipes=[{"sub_recipe_id": child["id"], "scale_factor": 1}],
+        ),
+    )
+    assert parent["total_calories"] == 300
+    stored = db.get(RecipeNutrition, UUID(parent["id"]))
+    assert stored is not None
+    assert stored.total_calories == 300
+
+    child_payload["ingredients"][0]["consumed_amount"] = 200
+    response = client.patch(
+        f"/recipes/{child['id']}", headers=superuser_token_headers, json=child_payload
+    )
+    assert response.status_code == 200, response.text
+    assert client.get(f"/recipes/{parent['id']}").json()["total_calories"] == 350
+
+    response = client.patch(
+        f"/ingredients/{ingredient.id}",
+        headers=superuser_token_headers,
+        json={"title": ingredient.title, "calories": 200},
+    )
+    assert response.status_code == 200, response.text
+    assert client.get(f"/recipes/{parent['id']}").json()["total_calories"] == 700
+
+    response = client.delete(f"/recipes/{child['id']}", headers=superuser_token_headers)
+    assert response.status_code == 200, response.text
+    assert client.get(f"/recipes/{parent['id']}").json()["total_calories"] == 300
+
+
+def test_sub_recipe_dag_totals_come_from_one_query(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    bottom = _create_recipe(
+        client, superuser_token_headers, _payload(ingredient.id, title="Bottom")
+    )
+    left = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Left",
+            sub_recipes=[{"sub_recipe_id": bottom["id"], "scale_factor": 1}],
+        ),
+    )
+    right = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Right",
+            sub_recipes=[{"sub_recipe_id": bottom["id"], "scale_factor": 2}],
+        ),
+    )
+    top = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Top",
+            sub_recipes=[
+                {"sub_recipe_id": left["id"], "scale_factor": 1},
+                {"sub_recipe_id": right["id"], "scale_factor": 2},
+            ],
+        ),
+    )
+    # Bottom is reached through both branches: 1 * 1 via Left and 2 * 2 via Right.
+    assert top["total_calories"] == 525 * (1 + 1 + 2 + 1 + 4)
+
+    with _recorded_statements() as statements:
+        totals = calculate_total_ingredients(
+            db, [UUID(recipe["id"]) for recipe in (top, left, right, bottom)]
+        )
+
+    assert len(statements) == 1
+    assert totals[UUID(top["id"])][0].consumed_amount == 150 * 9
+    assert totals[UUID(bottom["id"])][0].consumed_amount == 150
+
+
+def test_used_in_follows_sub_recipe_chains(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    flour = _ingredient(db)
+    butter = _ingredient(db, title="Butter", calories=717)
+    base = _create_recipe(
+        client, superuser_token_headers, _payload(butter.id, title="Base")
+    )
+    middle = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            flour.id,
+            title="Middle",
+            sub_recipes=[{"sub_recipe_id": base["id"], "scale_factor": 1}],
+        ),
+    )
+    top = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            flour.id,
+            title="Top",
+            sub_recipes=[{"sub_recipe_id": middle["id"], "scale_factor": 2}],
+        ),
+    )
+    hidden = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            flour.id,
+            title="Hidden",
+            hidden=True,
+            sub_recipes=[{"sub_recipe_id": base["id"], "scale_factor": 1}],
+        ),
+    )
+
+    def _used_in(url: str, headers: dict[str, str] | None = None) -> dict:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+        return {item["id"]: item["direct"] for item in response.json()}
+
+    assert _used_in(f"/ingredients/{butter.id}/used-in") == {
+        base["id"]: True,
+        middle["id"]: False,
+        top["id"]: False,
+    }
+    assert _used_in(f"/recipes/{base['id']}/used-in") == {
+        middle["id"]: True,
+        top["id"]: False,
+    }
+    assert _used_in(f"/recipes/{base['id']}/used-in", superuser_token_headers) == {
+        middle["id"]: True,
+        top["id"]: False,
+        hidden["id"]: True,
+    }
+
+    response = client.get(f"/recipes/{base['id']}/used-in?limit=1")
+    assert [item["id"] for item in response.json()] == [top["id"]]
+    response = client.get(
+        f"/recipes/{base['id']}/used-in",
+        params={"limit": 1, "cursor": response.headers["X-Next-Cursor"]},
+    )
+    assert [item["id"] for item in response.json()] == [middle["id"]]
+
+    response = client.delete(
+        f"/ingredients/{butter.id}", headers=superuser_token_headers
+    )
+    assert response.status_code == 200, response.text
+    assert _used_in(f"/recipes/{base['id']}/used-in") == {
+        middle["id"]: True,
+        top["id"]: False,
+    }
+    top_after = client.get(f"/recipes/{top['id']}").json()
+    assert top_after["total_calories"] == 525 * (1 + 2)
+    assert client.get(f"/ingredients/{flour.id}/used-in").json()
+    assert client.get(f"/ingredients/{uuid4()}/used-in").status_code == 404
+
+
+def test_recipe_closure_tracks_link_changes(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    bottom = _create_recipe(
+        client, superuser_token_headers, _payload(ingredient.id, title="Bottom")
+    )
+    middle = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Middle",
+            sub_recipes=[{"sub_recipe_id": bottom["id"], "scale_factor": 1}],
+        ),
+    )
+    top_payload = _payload(
+        ingredient.id,
+        title="Top",
+        sub_recipes=[
+            {"sub_recipe_id": middle["id"], "scale_factor": 1},
+            {"sub_recipe_id": bottom["id"], "scale_factor": 1},
+        ],
+    )
+    top = _create_recipe(client, superuser_token_headers, top_payload)
+
+    def _closure() -> dict[tuple[str, str], int]:
+        rows = db.exec(select(RecipeClosure)).all()
+        return {
+            (str(row.ancestor_id), str(row.descendant_id)): row.path_count
+            for row in rows
+        }
+
+    assert _closure() == {
+        (middle["id"], bottom["id"]): 1,
+        (top["id"], middle["id"]): 1,
+        (top["id"], bottom["id"]): 2,
+    }
+
+    # Top still reaches Bottom through Middle after the direct link goes away.
+    top_payload["sub_recipes"] = top_payload["sub_recipes"][:1]
+    response = client.patch(
+        f"/recipes/{top['id']}", headers=superuser_token_headers, json=top_payload
+    )
+    assert response.status_code == 200, response.text
+    assert _closure()[(top["id"], bottom["id"])] == 1
+
+    response = client.patch(
+        f"/recipes/{bottom['id']}",
+        headers=superuser_token_headers,
+        json=_payload(
+            ingredient.id,
+            title="Bottom",
+            sub_recipes=[{"sub_recipe_id": top["id"], "scale_factor": 1}],
+        ),
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Sub-recipe linkage creates a cycle"
+
+    response = client.delete(
+        f"/recipes/{middle['id']}", headers=superuser_token_headers
+    )
+    assert response.status_code == 200, response.text
+    assert _closure() == {}
+
+
+def test_recipe_list_pages_by_cursor(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    created_ids = [
+        _create_recipe(
+            client, superuser_token_headers, _payload(ingredient.id, title=f"R{index}")
+        )["id"]
+        for index in range(5)
+    ]
+
+    seen_ids: list[str] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = client.get("/recipes/", params=params)
+        assert response.status_code == 200, response.text
+        seen_ids.extend(recipe["id"] for recipe in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params = {"limit": 2, "cursor": next_cursor}
+
+    # Newest first, and every recipe appears exactly once.
+    assert seen_ids == list(reversed(created_ids))
+
+    response = client.get("/recipes/", params={"cursor": "bm9wZQ"})
+    assert response.status_code == 400
+
+
+def test_recipe_write_statement_count_does_not_grow_with_ingredients(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredients = [_ingredient(db, title=f"Ingredient {index}") for index in range(40)]
+    child = _create_recipe(
+        client, superuser_token_headers, _payload(ingredients[0].id, title="Child")
+    )
+    payload = _payload(
+        ingredients[0].id,
+        sub_recipes=[{"sub_recipe_id": child["id"], "scale_factor": 1}],
+    )
+
+    def _save(ingredient_count: int, recipe_id: str) -> int:
+        payload["ingredients"] = [
+            {
+                "ingredient_id": str(ingredient.id),
+                "amount": 100,
+                "consumed_amount": None,
+                "unit": "g",
+            }
+            for ingredient in ingredients[:ingredient_count]
+        ]
+        with _recorded_statements() as statements:
+            response = client.patch(
+                f"/recipes/{recipe_id}", headers=superuser_token_headers, json=payload
+            )
+        assert response.status_code == 200, response.text
+        assert len(response.json()["ingredient_links"]) == ingredient_count
+        return len(statements)
+
+    recipe = _create_recipe(client, superuser_token_headers, payload)
+    small_save = _save(2, recipe["id"])
+    large_save = _save(40, recipe["id"])
+
+    assert large_save == small_save
+
+
+def test_recipe_reads_revalidate_with_etag(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db, calories=100)
+    child = _create_recipe(
+        client, superuser_token_headers, _payload(ingredient.id, title="Child")
+    )
+    parent = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Parent",
+            sub_recipes=[{"sub_recipe_id": child["id"], "scale_factor": 1}],
+        ),
+    )
+
+    etag = client.get(f"/recipes/{parent['id']}").headers["ETag"]
+    list_etag = client.get("/recipes/").headers["ETag"]
+
+    response = client.get(f"/recipes/{parent['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    # Revalidating a page reads that page only, not the whole list.
+    with _recorded_statements() as statements:
+        response = client.get("/recipes/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 304
+    assert not any("count(" in statement for statement in statements)
+
+    # An ingredient used by the sub-recipe changes the parent's totals too.
+    response = client.patch(
+        f"/ingredients/{ingredient.id}",
+        headers=superuser_token_headers,
+        json={"title": ingredient.title, "calories": 200},
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.get(f"/recipes/{parent['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["total_calories"] == 600
+    assert response.headers["ETag"] != etag
+    response = client.get("/recipes/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+
+    # The recipe embeds its owner, so a profile change is a new version too.
+    etag = client.get(f"/recipes/{parent['id']}").headers["ETag"]
+    list_etag = client.get("/recipes/").headers["ETag"]
+    response = client.patch(
+        "/users/me", headers=superuser_token_headers, json={"full_name": "New name"}
+    )
+    assert response.status_code == 200
+    response = client.get(f"/recipes/{parent['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["owner"]["full_name"] == "New name"
+    response = client.get("/recipes/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+
+
+def test_search_recipes_ranks_matches_and_respects_visibility(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    title_match = _create_recipe(
+        client, superuser_token_headers, _payload(ingredient.id, title="Lasagne")
+    )
+    instructions_payload = _payload(ingredient.id, title="Leftovers")
+    instructions_payload["instructions"] = "Reheat the lasagne in the oven."
+    instructions_match = _create_recipe(
+        client, superuser_token_headers, instructions_payload
+    )
+    _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(ingredient.id, title="Secret lasagne", hidden=True),
+    )
+    _create_recipe(client, superuser_token_headers, _payload(ingredient.id))
+
+    response = client.get("/recipes/search", params={"q": "lasagne"})
+    assert response.status_code == 200, response.text
+    # Title hits outrank instruction hits; hidden recipes stay hidden.
+    assert [recipe["id"] for recipe in response.json()] == [
+        title_match["id"],
+        instructions_match["id"],
+    ]
+    assert response.json()[0]["total_ingredients"]
+
+    response = client.get("/recipes/search", params={"q": "lasagne", "limit": 1})
+    assert [recipe["id"] for recipe in response.json()] == [title_match["id"]]
+    response = client.get(
+        "/recipes/search",
+        params={
+            "q": "lasagne",
+            "limit": 1,
+            "cursor": response.headers["X-Next-Cursor"],
+        },
+    )
+    assert [recipe["id"] for recipe in response.json()] == [instructions_match["id"]]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get(
+        "/recipes/search", params={"q": "lasagne"}, headers=superuser_token_headers
+    )
+    assert len(response.json()) == 3
+
+    for limit in (0, -5, 101):
+        response = client.get(
+            "/recipes/search", params={"q": "lasagne", "limit": limit}
+        )
+        assert response.status_code == 422
+
+
+def test_recipe_list_summary_view_matches_full_totals(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    child = _create_recipe(
+        client, superuser_token_headers, _payload(ingredient.id, title="Child")
+    )
+    _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Parent",
+            sub_recipes=[{"sub_recipe_id": child["id"], "scale_factor": 0.5}],
+        ),
+    )
+
+    full = client.get("/recipes/").json()
+    response = client.get("/recipes/", params={"view": "summary"})
+    assert response.status_code == 200, response.text
+    summaries = response.json()
+
+    assert [summary["id"] for summary in summaries] == [recipe["id"] for recipe in full]
+    for summary, recipe in zip(summaries, full):
+        assert "ingredient_links" not in summary
+        assert "total_ingredients" not in summary
+        for key, value in summary.items():
+            assert recipe[key] == value, key
+
+    # Summaries read the page and the stored totals, nothing per recipe.
+    assert _count_queries(client, "/recipes/?view=summary") < _count_queries(
+        client, "/recipes/"
+    )
+    response = client.get("/recipes/search", params={"q": "parent", "view": "summary"})
+    assert [summary["title"] for summary in response.json()] == ["Parent"]
+
+
+def test_scaled_recipe_reuses_cached_bill_of_materials(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    child = _create_recipe(
+        client, superuser_token_headers, _payload(ingredient.id, title="Child")
+    )
+    parent = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            ingredient.id,
+            title="Parent",
+            sub_recipes=[{"sub_recipe_id": child["id"], "scale_factor": 0.5}],
+        ),
+    )
+
+    response = client.get(f"/recipes/{parent['id']}/scaled", params={"servings": 6})
+    assert response.status_code == 200, response.text
+    scaled = response.json()
+    assert scaled["factor"] == 3
+    assert scaled["servings"] == 6
+    assert scaled["total_calories"] == round(525 * 1.5 * 3)
+    assert scaled["calories_per_serving"] == parent["calories_per_serving"]
+    (total,) = scaled["total_ingredients"]
+    assert total["consumed_amount"] == 150 * 1.5 * 3
+    assert {
+        source["recipe_title"]: source["consumed_amount"] for source in total["sources"]
+    } == {"Parent": 450, "Child": 225}
+
+    # Other factors multiply the cached lines instead of loading the graph again.
+    with _recorded_statements() as statements:
+        response = client.get(f"/recipes/{parent['id']}/scaled", params={"factor": 0.5})
+    assert response.status_code == 200, response.text
+    assert response.json()["servings"] == 1
+    assert response.json()["total_ingredients"][0]["amount"] == 300 * 0.5
+    assert not any("reachable_recipes" in statement for statement in statements)
+
+    assert (
+        client.get(
+            f"/recipes/{parent['id']}/scaled", params={"servings": 2, "factor": 1}
+        ).status_code
+        == 400
+    )
+
+
+def test_shopping_list_merges_scaled_recipes(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    flour = _ingredient(db)
+    sugar = _ingredient(db, title="Sugar", calories=400)
+    child = _create_recipe(
+        client, superuser_token_headers, _payload(flour.id, title="Child")
+    )
+    parent = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            sugar.id,
+            title="Parent",
+            sub_recipes=[{"sub_recipe_id": child["id"], "scale_factor": 1}],
+        ),
+    )
+    hidden = _create_recipe(
+        client, superuser_token_headers, _payload(flour.id, hidden=True)
+    )
+
+    with _recorded_statements() as statements:
+        response = client.post(
+            "/recipes/shopping-list",
+            json={
+                "items": [
+                    {"recipe_id": parent["id"], "servings": 4},
+                    {"recipe_id": child["id"], "servings": 1},
+                    {"recipe_id": child["id"], "servings": 1},
+                ]
+            },
+        )
+    assert response.status_code == 200, response.text
+    assert len(statements) == 2
+
+    totals = {total["title"]: total for total in response.json()["total_ingredients"]}
+    # Parent doubles (4 of 2 servings), Child is listed twice at half a batch.
+    assert totals["Sugar"]["amount"] == 400
+    assert totals["Flour"]["amount"] == 400 + 200
+    assert {
+        source["recipe_title"]: (source["amount"], source["is_main_recipe"])
+        for source in totals["Flour"]["sources"]
+    } == {"Child": (600, True)}
+
+    response = client.post(
+        "/recipes/shopping-list",
+        json={"items": [{"recipe_id": hidden["id"], "servings": 1}]},
+    )
+    assert response.status_code == 404
+
+
+def test_export_and_import_round_trip(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    flour = _ingredient(db, title=f"Flour {uuid4()}")
+    base = _create_recipe(
+        client, superuser_token_headers, _payload(flour.id, title="Base")
+    )
+    dish = _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(
+            flour.id,
+            title="Dish",
+            hidden=True,
+            sub_recipes=[{"sub_recipe_id": base["id"], "scale_factor": 2}],
+        ),
+    )
+
+    response = client.get("/recipes/export", headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    exported = {line["id"]: line for line in lines}
+    ids = [line["id"] for line in lines]
+    assert ids.index(base["id"]) < ids.index(dish["id"])
+    assert exported[dish["id"]]["sub_recipes"] == [
+        {"sub_recipe_id": base["id"], "scale_factor": 2.0}
+    ]
+    assert exported[dish["id"]]["ingredients"] == [
+        {
+            "ingredient_title": flour.title,
+            "barcode": None,
+            "amount": 200.0,
+            "consumed_amount": 150.0,
+            "unit": "g",
+        }
+    ]
+    anonymous_ids = [
+        json.loads(line)["id"]
+        for line in client.get("/recipes/export").text.splitlines()
+    ]
+    assert dish["id"] not in anonymous_ids
+
+    # Import both under new ids, as if into another database.
+    new_ids = {base["id"]: str(uuid4()), dish["id"]: str(uuid4())}
+    imported = []
+    for recipe_id in (base["id"], dish["id"]):
+        line = dict(exported[recipe_id], id=new_ids[recipe_id])
+        line["sub_recipes"] = [
+            dict(link, sub_recipe_id=new_ids[link["sub_recipe_id"]])
+            for link in line["sub_recipes"]
+        ]
+        imported.append(json.dumps(line))
+    missing_ingredient = dict(exported[base["id"]], id=str(uuid4()))
+    missing_ingredient["ingredients"] = [
+        dict(missing_ingredient["ingredients"][0], ingredient_title="Unknown")
+    ]
+    body = "\n".join([*imported, "", "{not json", json.dumps(missing_ingredient)])
+
+    response = client.post(
+        "/recipes/import",
+        headers={**superuser_token_headers, "Content-Type": "application/x-ndjson"},
+        content=body,
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["created"], result["skipped"], result["failed"]) == (2, 0, 2)
+    assert [error["line"] for error in result["errors"]] == [4, 5]
+    assert "Ingredient not found: Unknown" in result["errors"][1]["detail"]
+
+    new_dish = client.get(
+        f"/recipes/{new_ids[dish['id']]}", headers=superuser_token_headers
+    ).json()
+    assert new_dish["is_hidden"] is True
+    assert new_dish["total_calories"] == dish["total_calories"]
+    assert new_dish["sub_recipe_links"][0]["sub_recipe"]["id"] == new_ids[base["id"]]
+    used_in = client.get(f"/recipes/{new_ids[base['id']]}/used-in").json()
+    assert used_in == []  # The new dish is hidden.
+
+    response = client.post(
+        "/recipes/import",
+        headers={**superuser_token_headers, "Content-Type": "application/x-ndjson"},
+        content="\n".join(imported),
+    )
+    assert response.json()["skipped"] == 2
+
+
+@pytest.mark.no_db
+def test_ndjson_chunks_join_lines_split_across_reads() -> None:
+    async def _stream():
+        for data in (b'{"a": 1}\n{"b"', b": 2}\n\n", b'{"c": 3}'):
+            yield data
+
+    async def _collect():
+        return [chunk async for chunk in iter_ndjson_chunks(_stream(), chunk_size=2)]
+
+    assert anyio.run(_collect) == [
+        [(1, b'{"a": 1}'), (2, b'{"b": 2}')],
+        [(4, b'{"c": 3}')],
+    ]
+
+
+def test_recipe_cards_follow_recipe_and_owner_changes(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    payload = _payload(ingredient.id, title="Card recipe")
+    recipe = _create_recipe(client, superuser_token_headers, payload)
+    hidden = _create_recipe(
+        client, superuser_token_headers, _payload(ingredient.id, hidden=True)
+    )
+
+    def _cards(headers: dict[str, str] | None = None) -> dict[str, dict]:
+        response = client.get("/recipes/cards?limit=100", headers=headers)
+        assert response.status_code == 200, response.text
+        return {card["id"]: card for card in response.json()}
+
+    card = _cards()[recipe["id"]]
+    assert card["title"] == "Card recipe"
+    assert card["calories_per_serving"] == recipe["calories_per_serving"]
+    assert card["protein_per_serving"] == recipe["protein_per_serving"]
+    assert hidden["id"] not in _cards()
+    assert hidden["id"] in _cards(superuser_token_headers)
+
+    payload["servings"] = 4
+    payload["title"] = "Renamed card"
+    response = client.patch(
+        f"/recipes/{recipe['id']}", headers=superuser_token_headers, json=payload
+    )
+    assert response.status_code == 200
+    card = _cards()[recipe["id"]]
+    assert card["title"] == "Renamed card"
+    assert card["calories_per_serving"] == response.json()["calories_per_serving"]
+
+    response = client.patch(
+        "/users/me", headers=superuser_token_headers, json={"full_name": "Chef"}
+    )
+    assert response.status_code == 200
+    assert _cards()[recipe["id"]]["owner_name"] == "Chef"
+
+    response = client.delete(
+        f"/recipes/{recipe['id']}", headers=superuser_token_headers
+    )
+    assert response.status_code == 200
+    assert recipe["id"] not in _cards()
+
+
+def test_recipe_list_filters_and_sorts_by_stored_macros(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    ingredient = _ingredient(db)
+    recipes = []
+    # 150 g of flour eaten (15 g protein) split over 1, 2 and 4 servings.
+    for servings in (1, 2, 4):
+        payload = _payload(ingredient.id, title=f"Macro {servings}")
+        payload["servings"] = servings
+        recipes.append(_create_recipe(client, superuser_token_headers, payload))
+    ids = {recipe["id"] for recipe in recipes}
+
+    def _list(query: str) -> tuple[list[dict], str | None]:
+        response = client.get(f"/recipes/?view=summary&{query}")
+        assert response.status_code == 200, response.text
+        page = [recipe for recipe in response.json() if recipe["id"] in ids]
+        return page, response.headers.get("X-Next-Cursor")
+
+    page, _ = _list("min_protein_per_serving=5&max_protein_per_serving=20")
+    assert [recipe["title"] for recipe in page] == ["Macro 2", "Macro 1"]
+    assert all(recipe["protein_per_100g"] == 10 for recipe in page)
+    page, _ = _list("min_protein_per_100g=10.5")
+    assert page == []
+
+    page, _ = _list("sort=protein_per_serving&max_protein_per_100g=10")
+    assert [recipe["title"] for recipe in page] == ["Macro 4", "Macro 2", "Macro 1"]
+
+    titles = []
+    cursor = None
+    while True:
+        query = "sort=-protein_per_serving&limit=1&max_protein_per_100g=10"
+        page, cursor = _list(query + (f"&cursor={cursor}" if cursor else ""))
+        titles.extend(recipe["title"] for recipe in page)
+        if cursor is None:
+            break
+    assert [title for title in titles if title.startswith("Macro")] == [
+        "Macro 1",
+        "Macro 2",
+        "Macro 4",
+    ]
+
+    # The stored per-serving values follow a change of servings.
+    payload = _payload(ingredient.id, title="Macro 4")
+    payload["servings"] = 8
+    response = client.patch(
+        f"/recipes/{recipes[2]['id']}", headers=superuser_token_headers, json=payload
+    )
+    assert response.status_code == 200
+    page, _ = _list("max_protein_per_serving=3")
+    assert [recipe["title"] for recipe in page] == ["Macro 4"]
+
+    assert client.get("/recipes/?sort=title").status_code == 422
+    assert client.get("/recipes/?min_calories_per_serving=-1").status_code == 422
+
+
+def test_recipes_by_ingredients_include_sub_recipes(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    flour = _ingredient(db, title="Flour")
+    butter = _ingredient(db, title="Butter")
+    chili = _ingredient(db, title="Chili")
+    sauce = _create_recipe(
+        client, superuser_token_headers, _payload(butter.id, title="Sauce")
+    )
+    pie_payload = _payload(
+        flour.id,
+        title="Pie",
+        sub_recipes=[{"sub_recipe_id": sauce["id"], "scale_factor": 1}],
+    )
+    pie = _create_recipe(client, superuser_token_headers, pie_payload)
+    bread_payload = _payload(flour.id, title="Bread")
+    bread_payload["ingredients"].append({**bread_payload["ingredients"][0]})
+    bread_payload["ingredients"][1]["ingredient_id"] = str(chili.id)
+    _create_recipe(client, superuser_token_headers, bread_payload)
+    _create_recipe(
+        client,
+        superuser_token_headers,
+        _payload(flour.id, title="Secret", hidden=True),
+    )
+
+    def _titles(query: str, headers: dict[str, str] | None = None) -> list[str]:
+        response = client.get(
+            f"/recipes/by-ingredients?view=summary&{query}", headers=headers
+        )
+        assert response.status_code == 200, response.text
+        return [recipe["title"] for recipe in response.json()]
+
+    assert _titles(f"include={flour.id}&include={butter.id}") == ["Pie"]
+    assert _titles(f"include={butter.id}&match=any") == ["Pie", "Sauce"]
+    assert _titles(f"include={flour.id}&exclude={chili.id}") == ["Pie"]
+    assert _titles(f"include={flour.id}&exclude={butter.id}") == ["Bread"]
+    assert _titles(f"include={flour.id}", superuser_token_headers) == [
+        "Secret",
+        "Bread",
+        "Pie",
+    ]
+
+    response = client.get(
+        f"/recipes/by-ingredients?include={flour.id}&limit=1&view=summary"
+    )
+    assert [recipe["title"] for recipe in response.json()] == ["Bread"]
+    cursor = response.headers["X-Next-Cursor"]
+    assert _titles(f"include={flour.id}&limit=1&cursor={cursor}") == ["Pie"]
+
+    # Dropping the sub-recipe drops its ingredients from the stored set.
+    pie_payload["sub_recipes"] = []
+    response = client.patch(
+        f"/recipes/{pie['id']}", headers=superuser_token_headers, json=pie_payload
+    )
+    assert response.status_code == 200
+    assert _titles(f"include={flour.id}&include={butter.id}") == []
+
+    assert client.get("/recipes/by-ingredients").status_code == 422
+
+
+def test_pantry_matches_rank_by_coverage_and_follow_writes(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    flour = _ingredient(db, title="Flour")
+    butter = _ingredient(db, title="Butter")
+    sugar = _ingredient(db, title="Sugar")
+    sauce = _create_recipe(
+        client, superuser_token_headers, _payload(butter.id, title="Butter sauce")
+    )
+    pie_payload = _payload(
+        flour.id,
+        title="Pantry pie",
+        sub_recipes=[{"sub_recipe_id": sauce["id"], "scale_factor": 1}],
+    )
+    pie = _create_recipe(client, superuser_token_headers, pie_payload)
+    _create_recipe(
+        client, superuser_token_headers, _payload(sugar.id, title="Sugar", hidden=True)
+    )
+
+    def _matches(pantry: list, headers: dict[str, str] | None = None) -> list[dict]:
+        response = client.post(
+            "/recipes/pantry-matches?min_coverage=0.01",
+            headers=headers,
+            json={"ingredient_ids": [str(item.id) for item in pantry]},
+        )
+        assert response.status_code == 200, response.text
+        assert response.headers["X-Total-Count"] == str(len(response.json()))
+        return response.json()
+
+    matches = _matches([flour])
+    assert [match["title"] for match in matches] == ["Pantry pie"]
+    assert matches[0]["coverage"] == 0.5
+    assert matches[0]["missing_ingredients"] == [
+        {"id": str(butter.id), "title": "Butter"}
+    ]
+    matches = _matches([flour, butter, sugar])
+    assert [match["title"] for match in matches] == ["Pantry pie", "Butter sauce"]
+    assert all(match["missing_ingredients"] == [] for match in matches)
+    assert "Sugar" in [
+        match["title"]
+        for match in _matches([flour, butter, sugar], superuser_token_headers)
+    ]
+
+    # A write through the API reaches the index without a restart.
+    pie_payload["ingredients"][0]["ingredient_id"] = str(sugar.id)
+    response = client.patch(
+        f"/recipes/{pie['id']}", headers=superuser_token_headers, json=pie_payload
+    )
+    assert response.status_code == 200
+    assert [match["title"] for match in _matches([flour])] == []
+    # A recipe whose write committed late keeps both the count and the newest
+    # updated_at where they were; the deletion must show anyway.
+    bread = _create_recipe(
+        client, superuser_token_headers, _payload(sugar.id, title="Bread")
+    )
+    recipe = db.get(Recipe, UUID(bread["id"]))
+    recipe.updated_at -= timedelta(hours=1)
+    db.add(recipe)
+    db.commit()
+    response = client.delete(f"/recipes/{pie['id']}", headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert [match["title"] for match in _matches([sugar, butter])] == [
+        "Butter sauce",
+        "Bread",
+    ]
+
+
+def test_pantry_matches_skip_ingredients_deleted_since_the_snapshot(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    flour = _ingredient(db, title="Flour")
+    recipe = _create_recipe(client, superuser_token_headers, _payload(flour.id))
+    snapshot = PantrySnapshot().with_recipes(
+        [
+            SimpleNamespace(
+                id=UUID(recipe["id"]),
+                is_hidden=False,
+                owner_id=UUID(recipe["owner"]["id"]),
+                ingredient_ids=[flour.id, uuid4()],
+            )
+        ]
+    )
+    monkeypatch.setattr(pantry_index, "sync", lambda session: snapshot)
+
+    response = client.post(
+        "/recipes/pantry-matches", json={"ingredient_ids": [str(flour.id)]}
+    )
+
+    assert response.status_code == 200, response.text
+    assert [
+        (match["id"], match["coverage"], match["missing_ingredients"])
+        for match in response.json()
+    ] == [(recipe["id"], 0.5, [])]
+
+
+def test_similar_recipes_respect_visibility_and_follow_writes(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    flour = _ingredient(db, title="Flour")
+    butter = _ingredient(db, title="Butter")
+    chili = _ingredient(db, title="Chili")
+
+    def _recipe_payload(title: str, *ingredients, hidden: bool = False) -> dict:
+        payload = _payload(ingredients[0].id, title=title, hidden=hidden)
+        payload["ingredients"] = [
+            {**payload["ingredients"][0], "ingredient_id": str(ingredient.id)}
+            for ingredient in ingredients
+        ]
+        return payload
+
+    shortbread = _create_recipe(
+        client, superuser_token_headers, _recipe_payload("Shortbread", flour, butter)
+    )
+    twin_payload = _recipe_payload("Twin", flour, butter)
+    twin = _create_recipe(client, superuser_token_headers, twin_payload)
+    _create_recipe(client, superuser_token_headers, _recipe_payload("Flatbread", flour))
+    _create_recipe(
+        client,
+        superuser_token_headers,
+        _recipe_payload("Hidden twin", flour, butter, hidden=True),
+    )
+    _, user_headers = _user_and_headers(client, db)
+
+    def _titles(headers: dict[str, str] | None = None) -> list[str]:
+        response = client.get(
+            f"/recipes/{shortbread['id']}/similar?limit=50", headers=headers
+        )
+        assert response.status_code == 200, response.text
+        return [
+            recipe["title"]
+            for recipe in response.json()
+            if recipe["title"] in {"Twin", "Flatbread", "Hidden twin"}
+        ]
+
+    assert _titles(user_headers) == ["Twin", "Flatbread"]
+    assert set(_titles(superuser_token_headers)) == {
+        "Twin",
+        "Flatbread",
+        "Hidden twin",
+    }
+
+    twin_payload["ingredients"][0]["ingredient_id"] = str(chili.id)
+    twin_payload["ingredients"][1]["ingredient_id"] = str(chili.id)
+    twin_payload["ingredients"].pop()
+    response = client.patch(
+        f"/recipes/{twin['id']}", headers=superuser_token_headers, json=twin_payload
+    )
+    assert response.status_code == 200
+    assert _titles(user_headers) == ["Flatbread", "Twin"]
+
+    hidden = _create_recipe(
+        client, superuser_token_headers, _payload(flour.id, hidden=True)
+    )
+    response = client.get(f"/recipes/{hidden['id']}/similar", headers=user_headers)
+    assert response.status_code == 404
@@ -166,6 +166,34 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_retrieve_users_by_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(3):
+        user_in = UserCreate(email=random_email(), password=random_lower_string())
+        db_crud.create_user(session=db, user_create=user_in)
+
+    emails: list[str] = []
+    cursor = None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        r = client.get("/users/", headers=superuser_token_headers, params=params)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        emails.extend(item["email"] for item in page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(emails) == page["count"]
+    assert emails == sorted(emails)
+
+    r = client.get(
+        "/users/", headers=superuser_token_headers, params={"cursor": "not-a-cursor"}
+    )
+    assert r.status_code == 400
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -0,0 +1,126 @@
+import re
+
+import anyio
+import httpx
+import pytest
+from cloudinary.utils import api_sign_request
+from fastapi import Request
+
+from app.image_storage import (
+    CloudinaryImageStorage,
+    ImageStorageUnavailableError,
+    ImageTooLargeError,
+    InvalidUploadError,
+    capped_request,
+    image_content_type,
+)
+
+
+pytestmark = pytest.mark.no_db
+
+
+def _storage(handler) -> CloudinaryImageStorage:
+    return CloudinaryImageStorage(
+        cloud_name="demo",
+        api_key="key",
+        api_secret="secret",
+        folder="local/recipes",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+
+def test_cloudinary_upload_is_signed_and_content_addressed() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/v1_1/demo/image/upload"
+        fields = {
+            name.decode(): value
+            for name, value in re.findall(
+                rb'name="([^"]+)"[^\r]*\r\n(?:[^\r]+\r\n)*\r\n(.*?)\r\n--',
+                request.read(),
+                re.DOTALL,
+            )
+        }
+        assert fields["file"] == b"jpeg bytes"
+        assert fields["public_id"] == b"abc123"
+        params = {
+            name: fields[name].decode()
+            for name in ("folder", "overwrite", "public_id", "timestamp")
+        }
+        assert fields["signature"].decode() == api_sign_request(params, "secret")
+        return httpx.Response(200, json={"secure_url": "https://cdn/abc123.jpg"})
+
+    url = anyio.run(
+        lambda: _storage(handler).save(
+            b"jpeg bytes", key="abc123", content_type="image/jpeg"
+        )
+    )
+
+    assert url == "https://cdn/abc123.jpg"
+
+
+@pytest.mark.parametrize("status_code", [400, 500])
+def test_cloudinary_errors_surface_as_unavailable(status_code: int) -> None:
+    storage = _storage(lambda request: httpx.Response(status_code))
+
+    with pytest.raises(ImageStorageUnavailableError):
+        anyio.run(
+            lambda: storage.save(b"jpeg bytes", key="abc123", content_type="image/jpeg")
+        )
+
+
+def _request(chunks: list[bytes], headers: list[tuple[bytes, bytes]]):
+    received = []
+
+    async def receive():
+        body = chunks[len(received)]
+        received.append(body)
+        return {
+            "type": "http.request",
+            "body": body,
+            "more_body": len(received) < len(chunks),
+        }
+
+    scope = {"type": "http", "method": "POST", "headers": headers}
+    return Request(scope, receive), received
+
+
+def test_capped_request_refuses_a_large_content_length_unread() -> None:
+    request, received = _request([b"x" * 32], [(b"content-length", b"32")])
+
+    with pytest.raises(ImageTooLargeError):
+        capped_request(request, 16)
+    assert received == []
+
+
+def test_capped_request_stops_reading_past_the_cap() -> None:
+    request, received = _request([b"x" * 10] * 5, [])
+
+    async def read_body() -> bytes:
+        return await capped_request(request, 25).body()
+
+    with pytest.raises(ImageTooLargeError):
+        anyio.run(read_body)
+    assert len(received) == 3
+
+
+@pytest.mark.parametrize(
+    ("content", "content_type"),
+    [
+        (b"\xff\xd8\xff\xe0jfif", "image/jpeg"),
+        (b"\x89PNG\r\n\x1a\n", "image/png"),
+        (b"GIF89a", "image/gif"),
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+    ],
+)
+def test_image_content_type_reads_raster_signatures(
+    content: bytes, content_type: str
+) -> None:
+    assert image_content_type(content) == content_type
+
+
+@pytest.mark.parametrize(
+    "content", [b"<svg/>", b"<!DOCTYPE html>", b"RIFF\x00\x00\x00\x00WAVE", b""]
+)
+def test_image_content_type_rejects_everything_else(content: bytes) -> None:
+    with pytest.raises(InvalidUploadError):
+        image_content_type(content)
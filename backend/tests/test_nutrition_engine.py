@@ -0,0 +1,155 @@
+import random
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app import recipe_nutrition
+from app.nutrition_engine import (
+    calculate_nutrition_rows,
+    calculate_totals_matrix,
+    derive_nutrition_fields,
+    round_half_even,
+)
+
+
+pytestmark = pytest.mark.no_db
+
+
+def _dag_rows(seed: int) -> tuple[list[uuid.UUID], list[SimpleNamespace]]:
+    """Random DAG rows shaped like load_recipe_dag, with shared and mixed units."""
+    rng = random.Random(seed)
+    recipes = [(uuid.uuid4(), f"Recipe {index}") for index in range(4)]
+    ingredients = [
+        (
+            uuid.uuid4(),
+            rng.choice(["Flour", "flour", "Oil", "Egg", "Milk"]),
+            rng.randint(0, 900),
+            rng.randint(0, 100),
+            rng.randint(0, 100),
+            rng.randint(0, 100),
+            rng.randint(1, 250),
+        )
+        for _ in range(6)
+    ]
+
+    rows = []
+    for root_id, _ in recipes[:3]:
+        rows.append(_row(root_id, root_id, "Root", 1.0, None))
+        for _ in range(rng.randint(0, 12)):
+            recipe_id, recipe_title = rng.choice(recipes)
+            amount = round(rng.uniform(0.1, 500), rng.randint(0, 3))
+            consumed = rng.choice([None, round(amount * rng.random(), 2)])
+            rows.append(
+                _row(
+                    root_id,
+                    recipe_id,
+                    recipe_title,
+                    rng.choice([1.0, 0.5, 2.0, 1 / 3, 0.125]),
+                    rng.choice(ingredients),
+                    amount=amount,
+                    consumed_amount=consumed,
+                    unit=rng.choice(["g", "kg", "ml", "L", "pcs"]),
+                )
+            )
+    return [recipe_id for recipe_id, _ in recipes[:3]], rows
+
+
+def _row(root_id, recipe_id, recipe_title, scale, ingredient, **link):
+    ingredient_id, title, calories, carbohydrates, fat, protein, weight = (
+        ingredient or (None,) * 7
+    )
+    return SimpleNamespace(
+        root_id=root_id,
+        recipe_id=recipe_id,
+        scale=scale,
+        recipe_title=recipe_title,
+        amount=link.get("amount"),
+        consumed_amount=link.get("consumed_amount"),
+        unit=link.get("unit"),
+        ingredient_id=ingredient_id,
+        ingredient_title=title,
+        calories=calories,
+        carbohydrates=carbohydrates,
+        fat=fat,
+        protein=protein,
+        weight_per_piece=weight,
+    )
+
+
+def test_round_half_even_matches_python_round() -> None:
+    values = [0.5, 1.5, 2.5, -0.5, 2.675, 1.005, 0.125, 0.375, 1234.5, 7.45, 7.55]
+    for decimals in (0, 1, 2):
+        assert round_half_even(np.array(values), decimals).tolist() == [
+            round(value, decimals) for value in values
+        ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_totals_matrix_matches_row_engine(
+    monkeypatch: pytest.MonkeyPatch, seed: int
+) -> None:
+    recipe_ids, rows = _dag_rows(seed)
+    monkeypatch.setattr(recipe_nutrition, "load_recipe_dag", lambda *_: rows)
+
+    expected = []
+    for recipe_id, total_ingredients in recipe_nutrition.calculate_total_ingredients(
+        None, recipe_ids
+    ).items():
+        expected.append(
+            [
+                sum(item.calories for item in total_ingredients),
+                sum(item.carbohydrates for item in total_ingredients),
+                sum(item.fat for item in total_ingredients),
+                sum(item.protein for item in total_ingredients),
+                sum(item.grams for item in total_ingredients),
+            ]
+        )
+
+    order, totals = calculate_totals_matrix(rows, recipe_ids)
+
+    assert order == recipe_ids
+    assert totals.tolist() == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_nutrition_rows_match_row_engine_breakdowns(
+    monkeypatch: pytest.MonkeyPatch, seed: int
+) -> None:
+    recipe_ids, rows = _dag_rows(seed)
+    monkeypatch.setattr(recipe_nutrition, "load_recipe_dag", lambda *_: rows)
+    expected = {
+        recipe_id: [
+            item.model_dump(mode="json", exclude={"source_count", "has_overlap"})
+            for item in total_ingredients
+        ]
+        for recipe_id, total_ingredients in recipe_nutrition.calculate_total_ingredients(
+            None, recipe_ids
+        ).items()
+    }
+
+    order, totals, breakdowns = calculate_nutrition_rows(rows, recipe_ids)
+
+    assert dict(zip(order, breakdowns)) == expected
+    assert totals.tolist() == calculate_totals_matrix(rows, recipe_ids)[1].tolist()
+
+
+def test_derived_fields_match_recipe_public_rounding() -> None:
+    totals = np.array([[1050.5, 141.25, 4.05, 20.15, 300.5], [0, 0, 0, 0, 0]])
+
+    fields = derive_nutrition_fields(totals, [3, 2])
+
+    assert fields["total_calories"].tolist() == [round(1050.5), 0]
+    assert fields["calories_per_serving"].tolist() == [round(round(1050.5) / 3), 0]
+    assert fields["total_fat"].tolist() == [round(4.05, 1), 0]
+    assert fields["protein_per_serving"].tolist() == [round(round(20.15, 1) / 3, 1), 0]
+    assert fields["calculated_weight"].tolist() == [round(300.5), 0]
+    assert fields["calories_per_100g"].tolist() == [
+        round(round(1050.5) / round(300.5) * 100),
+        0,
+    ]
+    assert fields["protein_per_100g"].tolist() == [
+        round(round(20.15, 1) / round(300.5) * 100, 1),
+        0,
+    ]
@@ -0,0 +1,63 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.pantry_index import PantrySnapshot
+from app.recipe_visibility import RecipeVisibility
+
+
+pytestmark = pytest.mark.no_db
+
+
+def _recipe(ingredient_ids, *, is_hidden=False, owner_id=None, recipe_id=None):
+    return SimpleNamespace(
+        id=recipe_id or uuid.uuid4(),
+        is_hidden=is_hidden,
+        owner_id=owner_id or uuid.uuid4(),
+        ingredient_ids=ingredient_ids,
+    )
+
+
+def test_rank_scores_across_words_and_updates_rows() -> None:
+    # More ingredients than fit in one 64-bit word.
+    ingredients = [uuid.uuid4() for _ in range(150)]
+    owner = uuid.uuid4()
+    full = _recipe(ingredients[:3])
+    half = _recipe([ingredients[0], ingredients[140]])
+    wide = _recipe(ingredients[:100])
+    hidden = _recipe(ingredients[:2], is_hidden=True, owner_id=owner)
+    empty = _recipe(None)
+    snapshot = PantrySnapshot().with_recipes([full, half, wide, hidden, empty])
+    pantry = ingredients[:3]
+
+    matches, total = snapshot.rank(pantry, RecipeVisibility())
+    assert [match.recipe_id for match in matches] == [full.id, half.id, wide.id]
+    assert total == 3
+    assert matches[1].missing_ingredient_ids == [ingredients[140]]
+    assert matches[2].missing_ingredient_ids == ingredients[3:100]
+
+    matches, _ = snapshot.rank(pantry, RecipeVisibility(user_id=owner))
+    assert [match.recipe_id for match in matches][:2] == [full.id, hidden.id]
+    matches, _ = snapshot.rank(
+        pantry, RecipeVisibility(viewer_recipe_ids=frozenset({hidden.id}))
+    )
+    assert hidden.id in [match.recipe_id for match in matches]
+    matches, total = snapshot.rank(pantry, RecipeVisibility(), min_coverage=0.5)
+    assert total == 2
+
+    # Replacing a row clears its old bits and may grow the dictionary.
+    extra = uuid.uuid4()
+    updated = snapshot.with_recipes(
+        [_recipe([ingredients[0], extra], recipe_id=full.id)]
+    )
+    matches, _ = updated.rank(pantry, RecipeVisibility(), limit=1)
+    assert matches[0].coverage == 0.5
+    (match,) = [
+        match
+        for match in updated.rank(pantry, RecipeVisibility())[0]
+        if match.recipe_id == full.id
+    ]
+    assert match.coverage == 0.5
+    assert match.missing_ingredient_ids == [extra]
+    assert snapshot.rank(pantry, RecipeVisibility())[0][0].recipe_id == full.id
@@ -0,0 +1,80 @@
+import uuid
+
+import pytest
+
+from app.recipe_bom import IngredientLine, RecipeBom, RecipeNode
+
+
+pytestmark = pytest.mark.no_db
+
+
+def _line(ingredient_id: uuid.UUID, amount: float, unit: str = "g") -> IngredientLine:
+    return IngredientLine(
+        ingredient_id=ingredient_id,
+        ingredient_title="Butter",
+        calories=717,
+        carbohydrates=0,
+        fat=81,
+        protein=1,
+        weight_per_piece=250,
+        amount=amount,
+        consumed_amount=None,
+        unit=unit,
+    )
+
+
+def test_stacked_diamonds_flatten_each_recipe_once() -> None:
+    butter = uuid.uuid4()
+    base = RecipeNode(id=uuid.uuid4(), title="Base", ingredients=[_line(butter, 10)])
+    recipes = {base.id: base}
+    below = base
+    # Each level reaches the one below through two halves, so the top recipe sits
+    # on 2**40 paths to the base and still needs exactly the base amount.
+    for level in range(40):
+        left = RecipeNode(id=uuid.uuid4(), title="Left", sub_recipes=[(below.id, 0.5)])
+        right = RecipeNode(
+            id=uuid.uuid4(), title="Right", sub_recipes=[(below.id, 0.5)]
+        )
+        node = RecipeNode(
+            id=uuid.uuid4(),
+            title=f"Level {level}",
+            sub_recipes=[(left.id, 1), (right.id, 1)],
+        )
+        recipes.update({node.id: node, left.id: left, right.id: right})
+        below = node
+
+    bom = RecipeBom(recipes)
+    (line,) = bom.lines([below.id])
+
+    assert line.recipe_id == base.id
+    assert line.amount == pytest.approx(10)
+    assert line.consumed_amount == pytest.approx(10)
+    assert len(bom._memo) == len(recipes)
+
+
+def test_lines_keep_sources_apart_and_merge_units() -> None:
+    butter = uuid.uuid4()
+    sauce = RecipeNode(
+        id=uuid.uuid4(),
+        title="Sauce",
+        ingredients=[_line(butter, 0.1, "kg")],
+    )
+    dish = RecipeNode(
+        id=uuid.uuid4(),
+        title="Dish",
+        ingredients=[_line(butter, 50)],
+        sub_recipes=[(sauce.id, 3)],
+    )
+    empty = RecipeNode(id=uuid.uuid4(), title="Empty")
+    bom = RecipeBom({recipe.id: recipe for recipe in (sauce, dish, empty)})
+
+    lines = bom.lines([dish.id, empty.id, uuid.uuid4()])
+
+    assert [
+        (line.root_id, line.recipe_id, line.amount, line.unit) for line in lines
+    ] == [
+        (dish.id, dish.id, 50, "g"),
+        (dish.id, sauce.id, 300, "g"),
+        (empty.id, empty.id, None, None),
+    ]
+    assert all(line.scale == 1 for line in lines)
@@ -3,8 +3,14 @@ import uuid
 import pytest
 from pydantic import ValidationError
 
-from app.models import Ingredient, Recipe, RecipeIngredientLinkCreate
-from app.routers.recipes import _add_ingredient_total
+from app.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredientLinkCreate,
+    RecipeNutritionSummary,
+    RecipePublic,
+)
+from app.recipe_nutrition import _add_ingredient_total
 
 
 pytestmark = pytest.mark.no_db
@@ -83,3 +89,51 @@ def test_missing_consumed_amount_defaults_to_full_amount() -> None:
     assert total.amount == 250
     assert total.consumed_amount == 250
     assert total.calories == 2210
+
+
+def test_recipe_public_nutrition_fields_share_one_summary(monkeypatch) -> None:
+    totals = {}
+    source_totals = {}
+    recipe = _recipe()
+    for amount, unit in ((250, "g"), (0.1, "L")):
+        _add_ingredient_total(
+            totals,
+            source_totals,
+            _oil(),
+            amount=amount,
+            consumed_amount=None,
+            unit=unit,
+            source_recipe=recipe,
+            is_main_recipe=True,
+        )
+    recipe_public = RecipePublic.model_validate(
+        {
+            "id": uuid.uuid4(),
+            "title": recipe.title,
+            "instructions": recipe.instructions,
+            "servings": recipe.servings,
+            "owner": {"id": uuid.uuid4(), "email": "cook@example.com"},
+            "created_at": "2024-01-01T00:00:00Z",
+            "ingredient_links": [],
+            "total_ingredients": list(totals.values()),
+        }
+    )
+
+    calls = []
+    original = RecipeNutritionSummary.from_total_ingredients.__func__
+
+    def _counted(cls, total_ingredients, servings):
+        calls.append(servings)
+        return original(cls, total_ingredients, servings)
+
+    monkeypatch.setattr(
+        RecipeNutritionSummary, "from_total_ingredients", classmethod(_counted)
+    )
+    payload = recipe_public.model_dump()
+
+    assert len(calls) == 1
+    assert payload["total_calories"] == 2210 + 884
+    assert payload["calories_per_serving"] == round((2210 + 884) / 4)
+    assert payload["total_fat"] == 350
+    assert payload["calculated_weight"] == 350
+    assert payload["calories_per_100g"] == round((2210 + 884) / 350 * 100)
@@ -0,0 +1,66 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.recipe_similarity import SimilaritySnapshot
+from app.recipe_visibility import RecipeVisibility
+
+
+pytestmark = pytest.mark.no_db
+
+
+def _recipe(grams: dict, *, macros=(50, 10, 10), recipe_id=None, is_hidden=False):
+    return SimpleNamespace(
+        id=recipe_id or uuid.uuid4(),
+        is_hidden=is_hidden,
+        owner_id=uuid.uuid4(),
+        total_ingredients=[
+            {"ingredient_id": str(ingredient_id), "grams": amount}
+            for ingredient_id, amount in grams.items()
+        ],
+        total_carbohydrates=macros[0],
+        total_fat=macros[1],
+        total_protein=macros[2],
+    )
+
+
+def test_similar_matches_brute_force_cosine_and_updates_rows() -> None:
+    flour, butter, sugar, egg = (uuid.uuid4() for _ in range(4))
+    source = _recipe({flour: 300, butter: 100})
+    close = _recipe({flour: 290, butter: 110})
+    partial = _recipe({flour: 100, sugar: 200}, macros=(10, 50, 10))
+    unrelated = _recipe({egg: 100}, macros=(0, 10, 12))
+    hidden = _recipe({flour: 300, butter: 100}, is_hidden=True)
+    empty = _recipe({}, macros=(0, 0, 0))
+    snapshot = SimilaritySnapshot().with_recipes(
+        [source, close, partial, unrelated, hidden, empty]
+    )
+
+    similar = snapshot.similar(source.id, RecipeVisibility())
+    assert [recipe_id for recipe_id, _ in similar] == [
+        close.id,
+        partial.id,
+        unrelated.id,
+    ]
+    # 0.75 * ingredient cosine + 0.25 * identical macro profiles.
+    expected = (300 * 290 + 100 * 110) / ((300**2 + 100**2) * (290**2 + 110**2)) ** 0.5
+    assert similar[0][1] == pytest.approx(0.75 * expected + 0.25)
+    assert snapshot.similar(source.id, RecipeVisibility(), limit=1) == similar[:1]
+    assert hidden.id in [
+        recipe_id
+        for recipe_id, _ in snapshot.similar(
+            source.id, RecipeVisibility(sees_all_hidden=True)
+        )
+    ]
+
+    # Replacing a row drops its old entries.
+    updated = snapshot.with_recipes(
+        [_recipe({egg: 50}, macros=(0, 10, 12), recipe_id=close.id)]
+    )
+    similar = updated.similar(source.id, RecipeVisibility())
+    assert [recipe_id for recipe_id, _ in similar][0] == partial.id
+    assert dict(updated.similar(unrelated.id, RecipeVisibility()))[
+        close.id
+    ] == pytest.approx(1)
+    assert updated.similar(empty.id, RecipeVisibility()) == []